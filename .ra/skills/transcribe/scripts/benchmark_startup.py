@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Guard the cold-start latency of transcribe.py's lightweight subcommands.
+
+Each subcommand runs in a fresh interpreter several times. The script
+reports the median wall time and fails if a command is over budget or
+imports a heavy module (torch, pyannote, numpy, faster-whisper) that it
+has no use for. Commands run against an empty temporary speaker database,
+job store and search index, so the real ones are never touched.
+
+Usage:
+    python .ra/skills/transcribe/scripts/benchmark_startup.py
+    python .ra/skills/transcribe/scripts/benchmark_startup.py --runs 10 --budget 0.5
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+
+HEAVY_MODULES = ['torch', 'pyannote.audio', 'numpy', 'faster_whisper', 'ctranslate2', 'tqdm']
+
+# Runs transcribe.main() with the speaker database redirected to a scratch
+# directory, then reports which heavy modules ended up imported
+RUNNER = """
+import sys, json
+from pathlib import Path
+sys.path.insert(0, {script_dir!r})
+import transcribe
+scratch = Path({scratch!r})
+transcribe.SPEAKER_DB_DIR = scratch / 'speaker_profiles'
+transcribe.SPEAKER_INDEX_FILE = transcribe.SPEAKER_DB_DIR / 'index.json'
+transcribe.SPEAKER_DB_FILE = scratch / 'speaker_profiles.json'
+transcribe.CACHE_DIR = scratch / 'cache'
+transcribe.JOBS_DB_FILE = transcribe.CACHE_DIR / 'jobs.sqlite'
+transcribe.TRANSCRIPT_INDEX_FILE = transcribe.CACHE_DIR / 'transcripts.sqlite'
+transcribe.MEETINGS_TRANSCRIPTS_DIR = scratch / 'transcripts'
+sys.argv = ['transcribe.py'] + {argv!r}
+try:
+    transcribe.main()
+except SystemExit:
+    pass
+heavy = [m for m in {heavy!r} if sys.modules.get(m) is not None
+         and type(sys.modules[m]).__name__ != '_LazyModule']
+sys.stderr.write('HEAVY:' + json.dumps(heavy) + '\\n')
+"""
+
+
+def subcommands(scratch: Path) -> dict:
+    """Name -> transcribe.py arguments for every command that should start fast."""
+    empty_dir = scratch / 'audio'
+    empty_dir.mkdir(exist_ok=True)
+    return {
+        '--help': ['--help'],
+        '--list-speakers': ['--list-speakers'],
+        '--rename-speaker': ['--rename-speaker', 'NOBODY', 'SOMEBODY'],
+        '--delete-speaker': ['--delete-speaker', 'NOBODY'],
+        '--jobs': ['--jobs'],
+        '--search': ['--search', 'budget'],
+        'nothing to transcribe': [str(empty_dir)],
+    }
+
+
+def time_command(argv: list, scratch: Path) -> tuple:
+    """Run one cold start. Returns (seconds, heavy_modules_imported)."""
+    code = RUNNER.format(script_dir=str(SCRIPT_DIR), scratch=str(scratch),
+                         argv=argv, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+
+    heavy = []
+    for line in result.stderr.splitlines():
+        if line.startswith('HEAVY:'):
+            heavy = json.loads(line[len('HEAVY:'):])
+    return elapsed, heavy
+
+
+def time_command_baseline() -> float:
+    """Run one bare interpreter start, for comparison."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], capture_output=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transcribe.py cold-start latency.')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Cold starts per subcommand (default: 5)')
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help='Maximum median seconds per subcommand (default: 0.5)')
+    args = parser.parse_args()
+
+    # Baseline: the interpreter itself
+    baseline = statistics.median(time_command_baseline() for _ in range(args.runs))
+    print(f"Python startup baseline: {baseline*1000:.0f} ms\n")
+    print(f"{'Subcommand':<24} {'median':>9} {'max':>9}  heavy imports")
+    print("-" * 60)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = Path(tmp)
+        for name, argv in subcommands(scratch).items():
+            timings = []
+            heavy = set()
+            for _ in range(args.runs):
+                elapsed, imported = time_command(argv, scratch)
+                timings.append(elapsed)
+                heavy.update(imported)
+            median = statistics.median(timings)
+            print(f"{name:<24} {median*1000:>6.0f} ms {max(timings)*1000:>6.0f} ms  "
+                  f"{', '.join(sorted(heavy)) or '-'}")
+
+            if median > args.budget:
+                failures.append(f"{name}: {median:.2f}s exceeds budget of {args.budget:.2f}s")
+            if heavy:
+                failures.append(f"{name}: imported {', '.join(sorted(heavy))}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll subcommands within budget.")
+
+
+if __name__ == "__main__":
+    main()
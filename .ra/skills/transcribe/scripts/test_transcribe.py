@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+"""
+Tests for transcribe.py that run without models, ffmpeg or network access.
+
+Usage:
+    python -m unittest discover -s .ra/skills/transcribe/scripts
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.absolute()))
+import transcribe
+
+
+class ScratchDirTest(unittest.TestCase):
+    """Points every directory transcribe.py writes to at a temporary one."""
+
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.scratch = Path(scratch.name)
+        for name, value in [('CACHE_DIR', self.scratch / 'cache'),
+                            ('MODELS_DIR', self.scratch / 'models'),
+                            ('MODEL_MANIFEST_FILE', self.scratch / 'models' / 'manifest.json'),
+                            ('HOST_PROFILE_FILE', self.scratch / 'cache' / 'host.json'),
+                            ('JOBS_DB_FILE', self.scratch / 'cache' / 'jobs.sqlite'),
+                            ('TRANSCRIPT_INDEX_FILE', self.scratch / 'cache' / 'transcripts.sqlite'),
+                            ('METRICS_FILE', self.scratch / 'metrics.jsonl'),
+                            ('SPEAKER_DB_DIR', self.scratch / 'speakers'),
+                            ('SPEAKER_INDEX_FILE', self.scratch / 'speakers' / 'index.json'),
+                            ('SPEAKER_DB_FILE', self.scratch / 'speaker_profiles.json'),
+                            ('MEETINGS_AUDIO_DIR', self.scratch / 'audio'),
+                            ('MEETINGS_TRANSCRIPTS_DIR', self.scratch / 'transcripts')]:
+            patcher = mock.patch.object(transcribe, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.recording = self.scratch / 'meeting.wav'
+        self.recording.write_bytes(b'RIFF' + os.urandom(64))
+
+
+class TranscriptionEngineTest(ScratchDirTest):
+
+    def test_model_load_failure_raises_model_load_error(self):
+        # faster-whisper missing: the Whisper model can't be loaded
+        with mock.patch.dict(sys.modules, {'faster_whisper': None}), \
+                mock.patch.object(transcribe, '_whisper_models', {}), \
+                mock.patch.object(transcribe, 'decode_audio',
+                                  lambda *args, **kwargs: transcribe.np.zeros(16000, 'float32')), \
+                mock.patch.object(transcribe, 'detect_speech',
+                                  lambda audio: transcribe.np.zeros((0, 2))):
+            engine = transcribe.TranscriptionEngine(enable_diarization=False, use_cache=False)
+            try:
+                with self.assertRaises(transcribe.ModelLoadError) as raised:
+                    asyncio.run(engine.transcribe(self.recording))
+            finally:
+                engine.close()
+        self.assertEqual(raised.exception.file_path, self.recording)
+
+    def test_cascade_model_load_failure_raises_model_load_error(self):
+        segment = mock.Mock(start=0.0, end=2.0, text=' hello', words=None,
+                            avg_logprob=-2.0, compression_ratio=1.0, no_speech_prob=0.0)
+        model = mock.Mock()
+        model.transcribe.return_value = ([segment], mock.Mock(language='en', language_probability=1.0))
+        
+        def get_whisper_model(model_size, *args):
+            if model_size == 'large-v3':
+                raise transcribe.ModelLoadError("Failed to load Whisper model 'large-v3'")
+            return model
+        
+        with mock.patch.object(transcribe, 'get_whisper_model', get_whisper_model):
+            with self.assertRaises(transcribe.ModelLoadError):
+                transcribe.transcribe_audio(self.recording, model_size='tiny',
+                                            audio=transcribe.np.zeros(4 * 16000, 'float32'),
+                                            cascade_model='large-v3')
+    
+    def test_missing_file_raises_transcription_error(self):
+        engine = transcribe.TranscriptionEngine()
+        try:
+            with self.assertRaises(transcribe.TranscriptionError) as raised:
+                asyncio.run(engine.transcribe(self.scratch / 'missing.wav'))
+        finally:
+            engine.close()
+        self.assertNotIsInstance(raised.exception, transcribe.ModelLoadError)
+
+
+def batch_args(input_path: Path) -> argparse.Namespace:
+    """Command-line arguments for a plain run of transcribe_files over input_path."""
+    return argparse.Namespace(
+        input=str(input_path), retry_failed=False, priority=None, model='tiny',
+        language=None, compute_type=None, no_diarization=True, no_recognition=True,
+        concurrent=False, workers=1, multitrack=False, cascade=None, batch_size=None,
+        no_cache=True, diarization_window=transcribe.DIARIZATION_WINDOW_SECONDS,
+        profile=False, asr_threads=None)
+
+
+class ModelLoadFailureBatchTest(ScratchDirTest):
+
+    def test_directory_run_stops_and_keeps_jobs_queued(self):
+        for name in ('standup.wav', 'review.wav'):
+            (self.scratch / name).write_bytes(b'RIFF' + os.urandom(64))
+        args = batch_args(self.scratch)
+        with mock.patch.dict(sys.modules, {'faster_whisper': None}), \
+                mock.patch.object(transcribe, '_whisper_models', {}), \
+                mock.patch.object(transcribe, 'decode_audio',
+                                  lambda *args, **kwargs: transcribe.np.zeros(16000, 'float32')), \
+                mock.patch.object(transcribe, 'detect_speech',
+                                  lambda audio: transcribe.np.zeros((0, 2))):
+            self.assertEqual(transcribe.transcribe_files(args), 1)
+        
+        store = transcribe.JobStore()
+        self.addCleanup(store.close)
+        jobs = store.jobs()
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual({job['status'] for job in jobs}, {'queued'})
+        self.assertEqual({job['attempts'] for job in jobs}, {0})
+
+
+class JobStoreTest(ScratchDirTest):
+
+    def setUp(self):
+        super().setUp()
+        self.store = transcribe.JobStore()
+        self.addCleanup(lambda: self.store.close())
+    
+    def enqueue(self, name: str, priority: int = None, duration: float = None,
+                directory: Path = None) -> str:
+        path = (directory or self.scratch) / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'RIFF' + os.urandom(64))
+        audio_hash = self.store.enqueue(path, priority)
+        self.store.conn.execute("UPDATE jobs SET duration = ? WHERE audio_hash = ?",
+                                (duration, audio_hash))
+        return audio_hash
+    
+    def test_claims_by_priority_then_duration(self):
+        self.enqueue('short.wav', duration=60)
+        self.enqueue('long.wav', duration=3600)
+        self.enqueue('unknown.wav')
+        self.enqueue('urgent.wav', priority=5, duration=30)
+        claimed = []
+        while True:
+            job = self.store.claim()
+            if job is None:
+                break
+            claimed.append(Path(job['path']).name)
+            self.assertEqual((job['status'], job['attempts']), ('running', 1))
+        self.assertEqual(claimed, ['urgent.wav', 'long.wav', 'short.wav', 'unknown.wav'])
+    
+    def test_claim_only_considers_given_hashes(self):
+        self.enqueue('long.wav', duration=3600)
+        short = self.enqueue('short.wav', duration=60)
+        self.assertEqual(self.store.claim([short])['audio_hash'], short)
+        self.assertIsNone(self.store.claim([short]))
+        self.assertIsNone(self.store.claim([]))
+    
+    def test_abandoned_running_jobs_are_queued_again(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        abandoned = self.enqueue('abandoned.wav')
+        live = self.enqueue('live.wav')
+        self.store.claim([abandoned])
+        self.store.claim([live])
+        self.store.conn.execute("UPDATE jobs SET worker = ? WHERE audio_hash = ?",
+                                (f"{socket.gethostname()}:{exited.pid}", abandoned))
+        
+        reopened = transcribe.JobStore()
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get(abandoned)['status'], 'queued')
+        self.assertEqual(reopened.get(live)['status'], 'running')
+        # The interrupted attempt still counts
+        self.assertEqual(reopened.claim([abandoned])['attempts'], 2)
+    
+    def test_directory_run_leaves_other_directories_jobs_queued(self):
+        other = self.enqueue('elsewhere.wav', directory=self.scratch / 'other')
+        directory = self.scratch / 'meetings'
+        self.enqueue('earlier.wav', directory=directory)
+        (directory / 'new.wav').write_bytes(b'RIFF' + os.urandom(64))
+        ran = []
+        
+        def run_job(store, job, options, profile=False):
+            ran.append(Path(job['path']).name)
+            store.finish(job['audio_hash'], True, {})
+            return True, {}
+        
+        with mock.patch.object(transcribe, 'run_job', run_job):
+            self.assertEqual(transcribe.transcribe_files(batch_args(directory)), 0)
+        self.assertEqual(sorted(ran), ['earlier.wav', 'new.wav'])
+        self.assertEqual(self.store.get(other)['status'], 'queued')
+
+
+class NoCacheTest(ScratchDirTest):
+
+    def test_no_cache_skips_checkpoints(self):
+        calls = []
+
+        def transcribe_audio(*args, **kwargs):
+            calls.append(kwargs)
+            return [], 'en', 1.0, []
+
+        with mock.patch.object(transcribe, 'decode_audio',
+                               lambda *args, **kwargs: transcribe.np.zeros(16000, 'float32')), \
+                mock.patch.object(transcribe, 'detect_speech',
+                                  lambda audio: transcribe.np.zeros((0, 2))), \
+                mock.patch.object(transcribe, 'transcribe_audio', transcribe_audio):
+            self.assertTrue(transcribe.process_file(self.recording, enable_diarization=False,
+                                                    use_cache=False))
+        self.assertIsNone(calls[0]['checkpoint'])
+        self.assertFalse((self.scratch / 'cache' / 'checkpoints').exists())
+        self.assertFalse((self.scratch / 'cache' / 'file_hashes.json').exists())
+
+
+class SpeechClipTest(ScratchDirTest):
+
+    def test_sequential_path_packs_regions_into_windows(self):
+        model = mock.Mock()
+        model.transcribe.return_value = ([], mock.Mock(language='en', language_probability=1.0))
+        regions = transcribe.np.array([[1.0, 2.0], [3.0, 4.0], [40.0, 75.0]])
+        with mock.patch.object(transcribe, 'get_whisper_model', lambda *args: model):
+            transcribe.transcribe_audio(self.recording, audio=transcribe.np.zeros(80 * 16000, 'float32'),
+                                        speech_regions=regions)
+        options = model.transcribe.call_args.kwargs
+        self.assertFalse(options['vad_filter'])
+        self.assertEqual(options['clip_timestamps'], [1.0, 4.0, 40.0, 70.0, 70.0, 75.0])
+
+
+class TimelineTest(unittest.TestCase):
+
+    REGIONS = [[1.0, 3.0], [10.0, 12.0], [20.0, 21.0]]
+    
+    def test_turns_map_back_to_the_recording(self):
+        regions = transcribe.np.array(self.REGIONS)
+        turns = [(0.5, 1.5, 'A'), (1.5, 4.5, 'B'), (2.0, 3.0, 'C')]
+        self.assertEqual(transcribe.restore_timeline(turns, regions), [
+            (1.5, 2.5, 'A'),
+            # Split at each join, since the silence in between was never heard
+            (2.5, 3.0, 'B'), (10.0, 12.0, 'B'), (20.0, 20.5, 'B'),
+            (10.0, 11.0, 'C'),
+        ])
+        self.assertEqual(transcribe.restore_timeline([], regions), [])
+    
+    def test_restored_turns_cover_the_same_samples(self):
+        np = transcribe.np
+        rate = transcribe.SAMPLE_RATE
+        audio = np.arange(25 * rate, dtype=np.float32)
+        regions = np.array(self.REGIONS)
+        speech = transcribe.gather_speech(audio, regions)
+        rng = random.Random(6)
+        for _ in range(50):
+            start = rng.randrange(len(speech)) / rate
+            end = start + rng.randrange(1, 3 * rate) / rate
+            pieces = transcribe.restore_timeline([(start, end, 'A')], regions)
+            restored = np.concatenate([audio[round(a * rate):round(b * rate)] for a, b, _ in pieces])
+            self.assertEqual(restored.tolist(), speech[round(start * rate):round(end * rate)].tolist())
+
+
+class CheckpointTest(ScratchDirTest):
+
+    HEADER = {'language': 'de', 'language_probability': 0.9}
+    
+    def write_checkpoint(self, torn: bytes = b'') -> Path:
+        path = self.scratch / 'checkpoint.jsonl'
+        lines = [self.HEADER,
+                 [0.0, 2.0, 'Guten Tag', [[0.0, 1.0, ' Guten'], [1.0, 2.0, ' Tag']], [-0.2, 1.1, 0.01]],
+                 [2.5, 5.0, 'zusammen', [], [-0.4, 1.2, 0.02]]]
+        path.write_bytes(b''.join(json.dumps(line).encode() + b'\n' for line in lines) + torn)
+        return path
+    
+    def read(self, path: Path) -> tuple:
+        segments, scores = [], []
+        words = transcribe.WordColumns.Builder()
+        header = transcribe.read_checkpoint(path, segments, words, scores)
+        return header, segments, words.build(), scores
+    
+    def test_torn_last_line_is_cut_off(self):
+        intact = self.write_checkpoint().read_bytes()
+        for torn in (b'[5.0, 7.5, "und", [[5.0', b'not json\n'):
+            path = self.write_checkpoint(torn)
+            header, segments, words, scores = self.read(path)
+            self.assertEqual(header, self.HEADER)
+            self.assertEqual(segments, [(0.0, 2.0, 'Guten Tag'), (2.5, 5.0, 'zusammen')])
+            self.assertEqual(scores, [(-0.2, 1.1, 0.01), (-0.4, 1.2, 0.02)])
+            # A segment without word timings counts as one word
+            self.assertEqual(words.text, [' Guten', ' Tag', ' zusammen'])
+            self.assertEqual(words.segment.tolist(), [0, 0, 1])
+            self.assertEqual(path.read_bytes(), intact)
+    
+    def test_missing_or_empty_checkpoint(self):
+        self.assertIsNone(self.read(self.scratch / 'missing.jsonl')[0])
+        path = self.scratch / 'torn-header.jsonl'
+        path.write_bytes(b'{"language": "d')
+        self.assertIsNone(self.read(path)[0])
+        self.assertEqual(path.read_bytes(), b'')
+    
+    def test_resumes_mid_region(self):
+        path = self.write_checkpoint(b'[5.0, 7.5, "und')
+        segment = mock.Mock(start=0.5, end=2.5, text=' weiter', words=None,
+                            avg_logprob=-0.3, compression_ratio=1.0, no_speech_prob=0.0)
+        model = mock.Mock()
+        model.transcribe.return_value = ([segment], mock.Mock(language='de', language_probability=0.9))
+        # The checkpoint ends at 5 s, inside the 4-8 s region
+        regions = transcribe.np.array([[1.0, 3.0], [4.0, 8.0], [20.0, 25.0]])
+        with mock.patch.object(transcribe, 'get_whisper_model', lambda *args: model):
+            segments, language, _, words = transcribe.transcribe_audio(
+                self.recording, audio=transcribe.np.zeros(30 * 16000, 'float32'),
+                speech_regions=regions, checkpoint=path)
+        
+        audio, = model.transcribe.call_args.args
+        options = model.transcribe.call_args.kwargs
+        self.assertEqual(len(audio), 25 * 16000)
+        self.assertEqual(options['language'], 'de')
+        self.assertEqual(options['clip_timestamps'], [0.0, 20.0])
+        self.assertEqual(segments[-1], (5.5, 7.5, 'weiter'))
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(language, 'de')
+        self.assertEqual(words.text[-1], ' weiter')
+        # The new segment is appended after the last intact line
+        _, segments, _, scores = self.read(path)
+        self.assertEqual(segments[-1], (5.5, 7.5, 'weiter'))
+        self.assertEqual(scores[-1], (-0.3, 1.0, 0.0))
+
+
+def energy_vad(audio, **kwargs):
+    """Stand-in for faster-whisper's VAD: speech wherever the signal is audible."""
+    np = transcribe.np
+    loud = np.abs(np.asarray(audio)) > 0.05
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], loud.astype(np.int8), [0]))))
+    return [{'start': int(start), 'end': int(end)} for start, end in zip(edges[::2], edges[1::2])]
+
+
+class MultitrackTest(unittest.TestCase):
+
+    def setUp(self):
+        vad = mock.Mock(get_speech_timestamps=energy_vad)
+        patcher = mock.patch.dict(sys.modules, {'faster_whisper': mock.Mock(vad=vad),
+                                                'faster_whisper.vad': vad})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    @staticmethod
+    def tracks(voices: list, bleed: float, seconds: float = 10.0):
+        """Two mics; voices are (track, start, end), heard at bleed on the other track."""
+        np = transcribe.np
+        rate = transcribe.SAMPLE_RATE
+        tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(int(seconds * rate)) / rate)
+        tracks = np.zeros((2, len(tone)), dtype=np.float32)
+        for track, start, end in voices:
+            span = slice(int(start * rate), int(end * rate))
+            tracks[track, span] += tone[span]
+            tracks[1 - track, span] += bleed * tone[span]
+        return tracks
+    
+    def assertTurns(self, segments, expected):
+        self.assertEqual([(round(start, 2), round(end, 2), label) for start, end, label in segments],
+                         expected)
+    
+    def test_loudest_track_speaks(self):
+        # Bleed 14 dB down is ignored; both mics at full level are both speaking
+        tracks = self.tracks([(0, 0.0, 4.0), (1, 3.0, 4.0), (1, 5.0, 9.0)], bleed=0.2)
+        expected = [(0.0, 4.0, 'SPEAKER_00'), (3.0, 4.0, 'SPEAKER_01'), (5.0, 9.0, 'SPEAKER_01')]
+        self.assertTurns(transcribe.diarize_tracks(tracks), expected)
+        # Turns running across VAD blocks come out the same
+        with mock.patch.object(transcribe, 'VAD_BLOCK_SECONDS', 3.0):
+            self.assertTurns(transcribe.diarize_tracks(tracks), expected)
+    
+    def test_bleed_within_dominance_falls_back(self):
+        # 6 dB down is within MULTITRACK_DOMINANCE_DB: every turn is heard on both tracks
+        tracks = self.tracks([(0, 0.0, 4.0), (1, 5.0, 9.0)], bleed=0.5)
+        self.assertIsNone(transcribe.diarize_tracks(tracks))
+    
+    def test_one_speaking_track_falls_back(self):
+        tracks = self.tracks([(0, 0.0, 4.0), (0, 5.0, 9.0)], bleed=0.0)
+        self.assertIsNone(transcribe.diarize_tracks(tracks))
+
+
+class BatchedDecodingTest(unittest.TestCase):
+
+    def test_old_faster_whisper_is_reported(self):
+        with mock.patch('importlib.metadata.version', lambda name: '1.0.3'):
+            self.assertIn('1.1.0', transcribe.batched_decoding_error())
+        with mock.patch('importlib.metadata.version', lambda name: '1.1.1'):
+            self.assertIsNone(transcribe.batched_decoding_error())
+
+
+def brute_force_speakers(words: list, turns: list) -> list:
+    """Reference for assign_word_speakers: compare every word with every turn."""
+    turns = sorted(turns, key=lambda turn: turn[0])
+    labels = sorted(set(turn[2] for turn in turns))
+    speakers = [-1] * len(words)
+    previous = -1
+    for i in sorted(range(len(words)), key=lambda i: words[i][0]):
+        best, best_overlap = previous, 0.0
+        for start, end, label in turns:
+            overlap = min(words[i][1], end) - max(words[i][0], start)
+            if overlap > best_overlap:
+                best, best_overlap = labels.index(label), overlap
+        speakers[i] = previous = best
+    return speakers
+
+
+class WordSpeakerTest(unittest.TestCase):
+
+    @staticmethod
+    def columns(words: list) -> transcribe.WordColumns:
+        builder = transcribe.WordColumns.Builder()
+        for start, end in words:
+            builder.add(0, start, end, ' word')
+        return builder.build()
+    
+    def assign(self, words: list, turns: list) -> list:
+        return transcribe.assign_word_speakers(
+            self.columns(words), transcribe.TurnColumns.from_segments(turns)).tolist()
+    
+    def test_matches_brute_force_on_overlapping_turns(self):
+        rng = random.Random(4)
+        for _ in range(200):
+            turn_starts = [rng.uniform(0, 60) for _ in range(rng.randrange(12))]
+            turns = [(start, start + rng.uniform(0.2, 8), f"SPEAKER_{rng.randrange(3):02d}")
+                     for start in turn_starts]
+            word_starts = [rng.uniform(0, 70) for _ in range(rng.randrange(40))]
+            words = [(start, start + rng.uniform(0.05, 1.5)) for start in word_starts]
+            self.assertEqual(self.assign(words, turns), brute_force_speakers(words, turns))
+    
+    def test_largest_overlap_wins(self):
+        turns = [(0.0, 5.0, 'A'), (4.0, 9.0, 'B')]
+        self.assertEqual(self.assign([(3.5, 4.4), (4.4, 5.5)], turns), [0, 1])
+    
+    def test_words_in_gaps_keep_previous_speaker(self):
+        turns = [(1.0, 2.0, 'B'), (5.0, 6.0, 'A')]
+        # Before any turn: unknown; between turns: the previous word's speaker
+        self.assertEqual(self.assign([(0.0, 0.5), (1.2, 1.8), (3.0, 3.5), (5.5, 5.8)], turns),
+                         [-1, 1, 1, 0])
+    
+    def test_empty_inputs(self):
+        self.assertEqual(self.assign([], [(0.0, 1.0, 'A')]), [])
+        self.assertEqual(self.assign([(0.0, 1.0)], []), [-1])
+        self.assertEqual(len(transcribe.WordColumns.from_segments([])), 0)
+        self.assertEqual(len(transcribe.TurnColumns.from_segments([])), 0)
+    
+    def test_columns_from_segments(self):
+        turns = transcribe.TurnColumns.from_segments([(4.0, 5.0, 'B'), (1.0, 2.0, 'A')])
+        self.assertEqual(turns.start.tolist(), [1.0, 4.0])
+        self.assertEqual([turns.labels[code] for code in turns.speaker.tolist()], ['A', 'B'])
+        
+        builder = transcribe.WordColumns.Builder()
+        word = mock.Mock(start=0.5, end=0.9, word=' Hello')
+        builder.add_segment(0, mock.Mock(words=[word]), offset=10.0)
+        builder.add_segment(1, mock.Mock(start=1.0, end=2.0, text=' no words ', words=None))
+        words = builder.build()
+        self.assertEqual(words.start.tolist(), [10.5, 1.0])
+        self.assertEqual(words.segment.tolist(), [0, 1])
+        self.assertEqual(''.join(words.text), ' Hello no words')
+
+
+class SpeakerMatchTest(ScratchDirTest):
+
+    def test_profiles_are_assigned_one_to_one(self):
+        np = transcribe.np
+        profiles = transcribe.l2_normalize(np.array([[1.0, 0.0, 0.0], [0.8, 0.6, 0.0]], 'float32'))
+        # Both speakers are closest to profile 0; the closer one gets it
+        embeddings = transcribe.l2_normalize(np.array([[0.9, 0.1, 0.0], [1.0, 0.0, 0.0]], 'float32'))
+        assignment, similarity = transcribe.match_speakers(embeddings, profiles, 0.5)
+        self.assertEqual(assignment.tolist(), [1, 0])
+        self.assertAlmostEqual(float(similarity[1]), 1.0, places=6)
+        
+        # Without a second profile above the threshold, the other speaker is unmatched
+        assignment, similarity = transcribe.match_speakers(embeddings, profiles[:1], 0.5)
+        self.assertEqual(assignment.tolist(), [-1, 0])
+        self.assertEqual(float(similarity[0]), 0.0)
+    
+    def test_threshold_is_inclusive(self):
+        np = transcribe.np
+        embeddings = np.array([[1.0, 0.0]], 'float32')
+        profiles = np.array([[0.5, 0.75 ** 0.5]], 'float32')  # similarity exactly 0.5
+        self.assertEqual(transcribe.match_speakers(embeddings, profiles, 0.5)[0].tolist(), [0])
+        self.assertEqual(transcribe.match_speakers(
+            embeddings, profiles, np.nextafter(np.float32(0.5), np.float32(1)))[0].tolist(), [-1])
+    
+    def test_empty_inputs(self):
+        np = transcribe.np
+        assignment, _ = transcribe.match_speakers(np.ones((2, 3), 'float32'),
+                                                  np.zeros((0, 0), 'float32'), 0.5)
+        self.assertEqual(assignment.tolist(), [-1, -1])
+        self.assertEqual(len(transcribe.match_speakers(np.zeros((0, 3), 'float32'),
+                                                       np.ones((1, 3), 'float32'), 0.5)[0]), 0)
+        self.assertEqual(transcribe.recognize_speakers({}, transcribe.EMBEDDING_MODEL), {})
+    
+    def test_unknown_speakers_get_profiles_that_later_match(self):
+        np = transcribe.np
+        space = transcribe.EMBEDDING_MODEL
+        alice = np.array([1.0, 0.0, 0.0], 'float32')
+        bob = np.array([0.0, 1.0, 0.0], 'float32')
+        first = transcribe.recognize_speakers({'SPEAKER_00': alice, 'SPEAKER_01': bob}, space)
+        self.assertEqual(len(set(first.values())), 2)
+        self.assertTrue(all(name.startswith('UNKNOWN_') for name in first.values()))
+        
+        # The same voices again (plus a new one), labelled the other way round
+        carol = np.array([0.0, 0.0, 1.0], 'float32')
+        second = transcribe.recognize_speakers(
+            {'SPEAKER_00': bob, 'SPEAKER_01': alice, 'SPEAKER_02': carol}, space)
+        self.assertEqual(second['SPEAKER_00'], first['SPEAKER_01'])
+        self.assertEqual(second['SPEAKER_01'], first['SPEAKER_00'])
+        self.assertNotIn(second['SPEAKER_02'], first.values())
+        
+        profiles = transcribe.load_speaker_index()
+        self.assertEqual(len(profiles), 3)
+        self.assertEqual(profiles[first['SPEAKER_00']]['sample_count'], 2)
+        
+        # Profiles from another embedding model can't be matched
+        other = transcribe.recognize_speakers({'SPEAKER_00': alice}, transcribe.DIARIZATION_MODEL)
+        self.assertNotIn(other['SPEAKER_00'], second.values())
+    
+    def test_update_profiles_false_leaves_profiles_alone(self):
+        np = transcribe.np
+        space = transcribe.EMBEDDING_MODEL
+        voice = np.array([1.0, 0.0], 'float32')
+        name = transcribe.recognize_speakers({'SPEAKER_00': voice}, space)['SPEAKER_00']
+        mapping = transcribe.recognize_speakers({'SPEAKER_00': np.array([0.9, 0.1], 'float32')},
+                                                space, update_profiles=False)
+        self.assertEqual(mapping, {'SPEAKER_00': name})
+        profile = transcribe.load_speaker_database()[name]
+        self.assertEqual(profile['samples'][space], 1)
+        self.assertEqual(profile['embeddings'][space].tolist(), [1.0, 0.0])
+
+
+class SpeakerDatabaseTest(ScratchDirTest):
+
+    def save(self, **vectors):
+        transcribe.save_speaker_database({
+            name: {'embeddings': {transcribe.EMBEDDING_MODEL: transcribe.np.array(vector, 'float32')},
+                   'samples': {transcribe.EMBEDDING_MODEL: 1},
+                   'description': '', 'sample_count': 1}
+            for name, vector in vectors.items()})
+    
+    def test_migrates_legacy_json(self):
+        transcribe.SPEAKER_DB_FILE.write_text(json.dumps({
+            'Alice': {'embedding': [0.6, 0.8], 'sample_count': 3, 'description': 'PM'}}))
+        speaker_db = transcribe.load_speaker_database()
+        self.assertEqual(list(speaker_db), ['Alice'])
+        alice = speaker_db['Alice']
+        self.assertEqual(alice['embeddings'][transcribe.EMBEDDING_MODEL].tolist(),
+                         transcribe.np.float32([0.6, 0.8]).tolist())
+        self.assertEqual(alice['samples'], {transcribe.EMBEDDING_MODEL: 3})
+        self.assertEqual((alice['description'], alice['sample_count']), ('PM', 3))
+        self.assertFalse(transcribe.SPEAKER_DB_FILE.exists())
+        self.assertTrue(transcribe.SPEAKER_DB_FILE.with_suffix('.json.migrated').exists())
+    
+    def test_rename_keeps_embeddings(self):
+        self.save(UNKNOWN_1=[1.0, 0.0], Bob=[0.0, 1.0])
+        self.assertTrue(transcribe.rename_speaker('UNKNOWN_1', 'Alice'))
+        self.assertFalse(transcribe.rename_speaker('Alice', 'Bob'))
+        self.assertFalse(transcribe.rename_speaker('Carol', 'Dave'))
+        speaker_db = transcribe.load_speaker_database()
+        self.assertEqual(sorted(speaker_db), ['Alice', 'Bob'])
+        self.assertEqual(speaker_db['Alice']['embeddings'][transcribe.EMBEDDING_MODEL].tolist(),
+                         [1.0, 0.0])
+        self.assertEqual(speaker_db['Alice']['description'], 'Renamed from UNKNOWN_1')
+    
+    def test_delete_drops_rows_on_next_write(self):
+        self.save(Alice=[1.0, 0.0], Bob=[0.0, 1.0])
+        self.assertTrue(transcribe.delete_speaker('Alice'))
+        self.assertFalse(transcribe.delete_speaker('Alice'))
+        self.assertEqual(list(transcribe.load_speaker_index()), ['Bob'])
+        
+        with transcribe.update_speaker_database():
+            pass
+        index = json.loads(transcribe.SPEAKER_INDEX_FILE.read_text())
+        matrix_name = index['matrices'][transcribe.EMBEDDING_MODEL]
+        self.assertEqual(transcribe.np.load(transcribe.SPEAKER_DB_DIR / matrix_name).shape, (1, 2))
+        # The replaced matrices are removed
+        self.assertEqual(sorted(p.name for p in transcribe.SPEAKER_DB_DIR.glob('*.npy')),
+                         [matrix_name])
+    
+    def test_concurrent_writers_keep_every_profile(self):
+        # flock locks are per open file, so threads contend like processes do
+        errors = []
+        
+        def writer(prefix):
+            try:
+                for i in range(10):
+                    with transcribe.update_speaker_database() as speaker_db:
+                        speaker_db[f"{prefix}{i}"] = {
+                            'embeddings': {transcribe.EMBEDDING_MODEL: transcribe.np.ones(4, 'float32')},
+                            'samples': {transcribe.EMBEDDING_MODEL: 1},
+                            'description': '', 'sample_count': 1}
+                    # Readers only ever see a complete index and its matrices
+                    self.assertGreater(len(transcribe.load_speaker_database()), i)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=writer, args=(prefix,)) for prefix in 'ab']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(transcribe.load_speaker_index()), 20)
+
+
+class CacheIndexTest(ScratchDirTest):
+
+    def test_index_keeps_newest_entries(self):
+        index_path = self.scratch / 'cache' / 'audio_metadata.json'
+        with mock.patch.object(transcribe, 'CACHE_INDEX_MAX_ENTRIES', 3):
+            for key in 'abcd':
+                transcribe._update_json_index(index_path, key, {'duration': 1.0})
+            transcribe._update_json_index(index_path, 'b', {'duration': 2.0})
+        self.assertEqual(list(transcribe._read_json_index(index_path)), ['c', 'd', 'b'])
+
+    def test_transcript_key_uses_resolved_compute_type(self):
+        key = lambda compute_type: transcribe.transcript_cache_key('abc', 'tiny', None, compute_type)
+        ctranslate2 = mock.Mock(get_cuda_device_count=lambda: 0)
+        with mock.patch.dict(sys.modules, {'ctranslate2': ctranslate2}):
+            self.assertEqual(key('auto'), key('int8'))
+            tuned = dict(device='cpu', compute_type='int8_float32', cpu_threads=4, rtf=0.1)
+            with mock.patch.object(transcribe, 'tuned_whisper_settings', lambda model_size: tuned):
+                self.assertEqual(key('auto'), key('int8_float32'))
+                self.assertNotEqual(key('auto'), key('int8'))
+            ctranslate2.get_cuda_device_count = lambda: 1
+            self.assertNotEqual(key('auto'), key('int8'))
+            self.assertEqual(transcribe.resolve_whisper_settings('tiny', 'auto'),
+                             ('cuda', 'float16', None))
+    
+    def test_record_throughput_accumulates(self):
+        transcribe.record_throughput('tiny/int8/sequential', 60.0, 10.0)
+        self.assertEqual(transcribe.record_throughput('tiny/int8/sequential', 60.0, 20.0), 4.0)
+
+
+class TranscriptIndexTest(ScratchDirTest):
+
+    TRANSCRIPT = "# Meeting\n\n## Transcript\n\n[00:00:05] [SPEAKER_00]:\nQuarterly budget review\n"
+
+    def test_final_transcript_replaces_live_one(self):
+        directory = self.scratch / 'transcripts'
+        directory.mkdir()
+        live = directory / 'meeting.live.md'
+        live.write_text(self.TRANSCRIPT)
+        index = transcribe.TranscriptIndex(self.scratch / 'index.sqlite')
+        self.addCleanup(index.close)
+        index.refresh(directory)
+        self.assertEqual(len(index.search('budget')), 1)
+        
+        final = directory / 'meeting.md'
+        final.write_text(self.TRANSCRIPT)
+        index.add(final)
+        self.assertEqual([row['path'] for row in index.search('budget')], [str(final)])
+        
+        # A fresh index doesn't pick the live transcript up either
+        index.conn.execute("DELETE FROM documents")
+        index.conn.execute("DELETE FROM passages")
+        index.refresh(directory)
+        self.assertEqual([row['path'] for row in index.search('budget')], [str(final)])
+
+
+class PollingWatcherTest(ScratchDirTest):
+
+    def test_reports_added_and_modified_files(self):
+        watcher = transcribe._PollingWatcher(self.scratch)
+        self.assertEqual(watcher.changes(timeout=0), set())
+        
+        added = self.scratch / 'standup.m4a'
+        added.write_bytes(b'audio')
+        (self.scratch / 'notes.txt').write_text('not audio')
+        self.assertEqual(watcher.changes(timeout=0), {added})
+        
+        # Rewritten in place: the directory's own mtime doesn't change
+        with open(self.recording, 'ab') as f:
+            f.write(b'more')
+        self.assertEqual(watcher.changes(timeout=0), {self.recording})
+        self.assertEqual(watcher.changes(timeout=0), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
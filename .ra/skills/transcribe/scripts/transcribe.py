@@ -10,20 +10,45 @@ Usage:
     python .ra/skills/transcribe/scripts/transcribe.py .research/meetings/audio/recording.m4a
     python .ra/skills/transcribe/scripts/transcribe.py .research/meetings/audio/  # Process all untranscribed audio
     python .ra/skills/transcribe/scripts/transcribe.py --model large-v3 --language en .research/meetings/audio/recording.m4a
+    python .ra/skills/transcribe/scripts/transcribe.py --stream .research/meetings/audio/recording.wav  # While recording
 
 For speaker diarization, set HF_TOKEN environment variable. See .ra/skills/transcribe/README.md.
 """
 
+from __future__ import annotations
+
 import os
 import sys
 import glob
 import subprocess
 import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
 import json
+import multiprocessing
+import queue
+import re
+import socket
+import sqlite3
 import tempfile
+import threading
+import time
+import traceback
+import warnings
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -31,8 +56,25 @@ try:
 except ImportError:
     pass  # dotenv is optional
 
-from tqdm import tqdm
-import numpy as np
+
+def _lazy_import(name: str):
+    """Import a module on first attribute access (importlib's LazyLoader recipe)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# Heavy modules are imported by the stage that needs them, so --help and the
+# speaker-management commands start instantly
+np = _lazy_import('numpy')
 
 # Configuration from environment
 SCRIPT_DIR = Path(__file__).parent.absolute()
@@ -40,7 +82,54 @@ PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent.parent  # .ra/skills/transcribe/s
 
 MEETINGS_AUDIO_DIR = PROJECT_ROOT / '.research' / 'meetings' / 'audio'
 MEETINGS_TRANSCRIPTS_DIR = PROJECT_ROOT / '.research' / 'meetings' / 'transcripts'
-SPEAKER_DB_FILE = PROJECT_ROOT / '.research' / 'speaker_profiles.json'
+# Speaker profiles: a float32 embedding matrix plus a small JSON index
+SPEAKER_DB_DIR = PROJECT_ROOT / '.research' / 'speaker_profiles'
+SPEAKER_INDEX_FILE = SPEAKER_DB_DIR / 'index.json'
+SPEAKER_DB_FILE = PROJECT_ROOT / '.research' / 'speaker_profiles.json'  # legacy format, migrated on first use
+
+# Cache of raw ASR/diarization results, keyed by audio content and settings
+CACHE_DIR = Path(os.environ.get('TRANSCRIBE_CACHE_DIR',
+                                PROJECT_ROOT / '.research' / 'cache' / 'transcribe'))
+CACHE_MAX_BYTES = int(float(os.environ.get('TRANSCRIBE_CACHE_MAX_MB', 1024)) * 1024 * 1024)
+# Entries kept in each of the cache's JSON indexes (file hashes, audio metadata)
+CACHE_INDEX_MAX_ENTRIES = 10000
+
+# Local daemon that keeps models warm between /transcribe calls. Unix socket
+# paths are length-limited, so it lives in the temp dir, named per project.
+DAEMON_SOCKET = Path(os.environ.get('TRANSCRIBE_SOCKET') or Path(tempfile.gettempdir()) / (
+    f"ra-transcribe-{hashlib.sha256(str(PROJECT_ROOT).encode()).hexdigest()[:12]}.sock"))
+DAEMON_IDLE_TIMEOUT = float(os.environ.get('TRANSCRIBE_DAEMON_IDLE_TIMEOUT', 600))
+
+# --profile appends one JSON line of per-stage metrics per file here
+METRICS_FILE = Path(os.environ.get('TRANSCRIBE_METRICS_FILE',
+                                   PROJECT_ROOT / '.research' / 'logs' / 'transcribe_metrics.jsonl'))
+
+# Job store: every recording the batch driver has handled, keyed by content hash
+JOBS_DB_FILE = Path(os.environ.get('TRANSCRIBE_JOBS_DB', CACHE_DIR / 'jobs.sqlite'))
+# Full-text index over the transcripts, for --search (rebuilt from them if deleted)
+TRANSCRIPT_INDEX_FILE = Path(os.environ.get('TRANSCRIBE_INDEX_DB',
+                                            CACHE_DIR / 'transcripts.sqlite'))
+# Failed jobs are retried automatically until they have failed this many times
+MAX_JOB_ATTEMPTS = 3
+
+# Local model store filled by --fetch-models: Whisper models in CTranslate2
+# format and the pyannote checkpoints, with a manifest of their sizes and
+# SHA-256 sums. Models found here are loaded from disk without contacting
+# the Hugging Face hub, so machines without network access can use them.
+MODELS_DIR = Path(os.environ.get('TRANSCRIBE_MODELS_DIR', PROJECT_ROOT / '.research' / 'models'))
+MODEL_MANIFEST_FILE = MODELS_DIR / 'manifest.json'
+
+# Measured performance of this machine (throughput per model and decode mode,
+# and the Whisper settings --tune found fastest)
+HOST_PROFILE_FILE = CACHE_DIR / f"host-{socket.gethostname()}.json"
+# --tune: audio per candidate, and compute types to try (those CTranslate2
+# doesn't support on this CPU/GPU are skipped). On CPU, 'int8' already runs
+# the non-quantized layers in float32.
+TUNE_CLIP_SECONDS = 120.0
+TUNE_COMPUTE_TYPES = {
+    'cpu': ['int8', 'int8_bfloat16', 'int16', 'bfloat16', 'float32'],
+    'cuda': ['float16', 'int8_float16', 'bfloat16', 'int8_bfloat16', 'int8_float32'],
+}
 
 # Whisper configuration (can be overridden via CLI or environment)
 DEFAULT_MODEL = os.environ.get('WHISPER_MODEL', 'small')
@@ -50,63 +139,342 @@ DEFAULT_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE', 'auto')
 # HuggingFace token for pyannote models
 HF_TOKEN = os.environ.get('HF_TOKEN', None)
 
-# Similarity threshold for speaker recognition (0.0 to 1.0, higher = stricter)
-SPEAKER_SIMILARITY_THRESHOLD = 0.75
+# All stages share one decoded buffer at Whisper's native rate (mono float32)
+SAMPLE_RATE = 16000
+
+# --batch-size needs faster-whisper's BatchedInferencePipeline
+BATCHED_DECODING_MIN_VERSION = '1.1.0'
+
+# --cascade: segments the fast model is unsure about are decoded again with
+# the larger one. A segment is weak if any of these limits is crossed. They
+# follow Whisper's own temperature-fallback rules, with a stricter
+# log-probability limit because small models are rarely that confident.
+CASCADE_THRESHOLDS = dict(
+    min_avg_logprob=-0.7,        # mean token log-probability
+    max_compression_ratio=2.4,   # gzip ratio of the text; high = repetition loop
+    max_no_speech_prob=0.5,      # text over what the model thinks is silence
+)
+
+# Voice activity detection. One pass per recording finds the speech regions
+# (cached); Whisper decodes only those regions and diarization only sees
+# them. The VAD reads the audio in blocks so a memory-mapped decode is never
+# copied whole.
+VAD_PARAMETERS = dict(min_silence_duration_ms=500)
+VAD_BLOCK_SECONDS = 600.0
+
+# Whisper decode parameters (part of the cache key). Whisper's own VAD
+# filter is only used where no shared speech regions are given.
+ASR_DECODE_OPTIONS = dict(
+    beam_size=5,
+    word_timestamps=True,  # word-level timestamps for diarization alignment
+    vad_filter=True,  # Filter out non-speech
+    vad_parameters=VAD_PARAMETERS,
+)
+
+# Speakers are recognized from the centroid embeddings the diarization
+# pipeline computes anyway. The separate embedding model is only loaded when
+# there are no centroids (multitrack recordings, diarization cached without
+# them). Profiles keep an embedding per model, since the two embedding spaces
+# can't be compared.
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+EMBEDDING_MODEL = "pyannote/embedding"
+
+# Cosine similarity above which a speaker is recognized as a saved profile
+# (0.0 to 1.0, higher = stricter), per embedding model. The pipeline's
+# WeSpeaker embeddings score the same voice lower than pyannote/embedding
+# does, and lower across meetings than within one recording (compare
+# DIARIZATION_STITCH_THRESHOLD).
+SPEAKER_SIMILARITY_THRESHOLDS = {
+    DIARIZATION_MODEL: 0.4,
+    EMBEDDING_MODEL: 0.75,
+}
+
+# Recordings longer than this are diarized in overlapping windows read from a
+# memory-mapped decode, with speakers stitched across windows by embedding
+# similarity, so memory is bounded by the window rather than the recording
+# (0 disables)
+DIARIZATION_WINDOW_SECONDS = float(os.environ.get('TRANSCRIBE_DIARIZATION_WINDOW', 3600))
+DIARIZATION_WINDOW_OVERLAP = 30.0
+# Cosine similarity above which speakers of different windows are the same person
+DIARIZATION_STITCH_THRESHOLD = 0.5
+
+# --multitrack: with a mic (or remote participant) per track, speakers come
+# from the tracks. A track speaks where VAD fires on it and it is within
+# MULTITRACK_DOMINANCE_DB of the loudest track; quieter copies of a voice on
+# other tracks are bleed. Neural diarization is used instead when more than
+# MULTITRACK_MAX_SHARED of the speech is heard at similar level on several
+# tracks, i.e. the tracks can't be told apart.
+MULTITRACK_FRAME_SECONDS = 0.02
+MULTITRACK_DOMINANCE_DB = 10.0
+MULTITRACK_MAX_SHARED = 0.25
+
+# Audio per speaker used to compute their recognition embedding with the
+# separate model (longest turns first), cut into pieces that are embedded
+# EMBEDDING_BATCH_SIZE at a time
+SPEAKER_EMBEDDING_SECONDS = 60.0
+EMBEDDING_CHUNK_SECONDS = 5.0
+EMBEDDING_BATCH_SIZE = 32
+
+# --stream: Whisper re-decodes a rolling buffer of the newest audio each time
+# at least STREAM_MIN_CHUNK_SECONDS more has arrived. Words two consecutive
+# decodes agree on are final; the buffer is cut back to the last finished
+# line once it is longer than STREAM_BUFFER_SECONDS.
+STREAM_MIN_CHUNK_SECONDS = 1.0
+STREAM_BUFFER_SECONDS = 15.0
+# A growing recording is considered finished once it stops growing for this long
+STREAM_END_TIMEOUT = 30.0
 
 # Supported audio formats
 AUDIO_EXTENSIONS = {'.m4a', '.mp3', '.wav', '.webm', '.mp4', '.ogg', '.flac'}
 
-# Lazy-loaded models
-_whisper_model = None
+# Lazy-loaded models. Up to two Whisper configurations stay loaded (the
+# fast and the large model of a --cascade run), least recently used first out.
+_whisper_models = {}
+WHISPER_MODELS_RESIDENT = 2
 _diarization_pipeline = None
 _embedding_model = None
 
-# Check for optional dependencies
-DIARIZATION_AVAILABLE = False
-try:
+# Check for optional dependencies without importing them (torch alone takes seconds)
+def _module_available(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+DIARIZATION_AVAILABLE = _module_available('torch') and _module_available('pyannote.audio')
+
+
+def available_cpus() -> int:
+    """Number of CPU cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def split_cpu_budget(total: int = None) -> tuple:
+    """
+    Split cores between concurrent ASR and diarization.
+    
+    Returns:
+        tuple: (asr_threads, diarization_threads), each at least 1
+    """
+    total = total or available_cpus()
+    asr_threads = max(1, (total + 1) // 2)
+    return asr_threads, max(1, total - asr_threads)
+
+
+class TranscriptionError(Exception):
+    """A recording could not be transcribed (raised by TranscriptionEngine)."""
+    
+    def __init__(self, message: str, file_path: Path = None, stats: dict = None):
+        super().__init__(message)
+        self.file_path = file_path
+        self.stats = stats or {}
+
+
+class ModelLoadError(TranscriptionError):
+    """A model could not be loaded."""
+
+
+def _load_model_manifest() -> dict:
+    """Load the model store's manifest: {'models': {name: {'fetched', 'files'}}}."""
+    try:
+        with open(MODEL_MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'models': {}}
+
+
+def stored_model(name: str) -> Path:
+    """
+    Directory of a model in the local store, or None if it hasn't been fetched.
+    
+    name is 'whisper/<size>' or a pyannote model id. File sizes are checked
+    against the manifest, which catches interrupted copies without reading
+    the weights; --verify-models compares the checksums.
+    """
+    entry = _load_model_manifest()['models'].get(name)
+    if entry is None:
+        return None
+    directory = MODELS_DIR / name
+    for relative, recorded in entry['files'].items():
+        try:
+            size = (directory / relative).stat().st_size
+        except OSError:
+            size = None
+        if size != recorded['size']:
+            print(f"Warning: {name} in {MODELS_DIR} is incomplete ({relative}); "
+                  f"run --fetch-models again")
+            return None
+    return directory
+
+
+@contextlib.contextmanager
+def _stored_torch_load():
+    """
+    Make torch.load memory-map checkpoints from the model store.
+    
+    pyannote loads checkpoints through Lightning, which hands torch.load an
+    open file; torch can only map a path, so the file's name is used.
+    Stored checkpoints were re-saved by --fetch-models (see
+    _fetch_pyannote_model) and are loaded with weights_only=False, as
+    pyannote's checkpoints need. Other loads are left alone.
+    """
+    import inspect
     import torch
-    from pyannote.audio import Pipeline
-    from pyannote.audio.pipelines.utils.hook import ProgressHook
-    DIARIZATION_AVAILABLE = True
-except ImportError:
-    pass
+    
+    original_load = torch.load
+    root = MODELS_DIR.resolve()
+    options = {'weights_only': False}
+    if 'mmap' in inspect.signature(original_load).parameters:  # torch >= 2.1
+        options['mmap'] = True
+    
+    def load(f, *args, **kwargs):
+        name = f if isinstance(f, (str, os.PathLike)) else getattr(f, 'name', None)
+        if isinstance(name, (str, os.PathLike)) and root in Path(name).resolve().parents:
+            return original_load(os.fspath(name), *args, **{**kwargs, **options})
+        return original_load(f, *args, **kwargs)
+    
+    torch.load = load
+    try:
+        yield
+    finally:
+        torch.load = original_load
+
 
+def _load_stored_pipeline(directory: Path):
+    """
+    Build the diarization pipeline from its stored config and component checkpoints.
+    
+    Pipeline.from_pretrained would resolve the components by hub id, so the
+    pipeline class is instantiated directly with the stored paths instead.
+    """
+    import yaml
+    
+    with open(directory / 'config.yaml', 'r') as f:
+        config = yaml.safe_load(f)
+    params = dict(config['pipeline'].get('params', {}))
+    for component in ('segmentation', 'embedding'):
+        local = stored_model(params[component])
+        if local is None:
+            raise FileNotFoundError(f"{params[component]} is not in {MODELS_DIR}; "
+                                    f"run --fetch-models")
+        params[component] = str(local / 'pytorch_model.bin')
+    
+    module_name, _, class_name = config['pipeline']['name'].rpartition('.')
+    pipeline_class = getattr(importlib.import_module(module_name), class_name)
+    with _stored_torch_load():
+        pipeline = pipeline_class(**params)
+    pipeline.instantiate(config['params'])
+    return pipeline
+
+
+def batched_decoding_error() -> str:
+    """
+    Why --batch-size can't be used with the installed faster-whisper.
+    
+    Reads the installed version from package metadata, without importing it.
+    
+    Returns:
+        str: an error message, or None if batched decoding is available (or
+        faster-whisper is missing altogether, which loading the model reports)
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    
+    try:
+        installed = version('faster-whisper')
+    except PackageNotFoundError:
+        return None
+    
+    def release(text):
+        return tuple(int(part) for part in re.findall(r'\d+', text)[:3])
+    
+    if release(installed) < release(BATCHED_DECODING_MIN_VERSION):
+        return (f"--batch-size needs faster-whisper {BATCHED_DECODING_MIN_VERSION} or newer "
+                f"(installed: {installed}). Upgrade with: "
+                f"pip install -U 'faster-whisper>={BATCHED_DECODING_MIN_VERSION}'")
+    return None
+
+
+def resolve_whisper_settings(model_size: str = None, compute_type: str = None) -> tuple:
+    """
+    Device and compute type get_whisper_model loads model_size with.
+    
+    With compute_type 'auto', the settings --tune measured on this host
+    are used if there are any; otherwise CUDA with float16 if CTranslate2
+    sees a GPU, else CPU with int8. An explicit compute_type runs on the CPU.
+    
+    Returns:
+        tuple: (device, compute_type, tuned) where tuned is the
+        tuned_whisper_settings() entry used, or None
+    """
+    model_size = model_size or DEFAULT_MODEL
+    compute_type = compute_type or DEFAULT_COMPUTE_TYPE
+    if compute_type != "auto":
+        return "cpu", compute_type, None
+    tuned = tuned_whisper_settings(model_size)
+    if tuned:
+        return tuned['device'], tuned['compute_type'], tuned
+    # Ask CTranslate2 (already loaded by faster-whisper) rather than
+    # importing torch just for this. MPS (Apple Silicon) isn't supported by
+    # faster-whisper yet, so Macs use CPU with int8 like everything without CUDA.
+    try:
+        import ctranslate2
+        cuda = ctranslate2.get_cuda_device_count() > 0
+    except ImportError:
+        cuda = False  # nothing can be loaded anyway
+    return ("cuda", "float16", None) if cuda else ("cpu", "int8", None)
 
-def get_whisper_model(model_size: str = None, compute_type: str = None):
-    """Get or initialize the Whisper model."""
-    global _whisper_model
+
+def get_whisper_model(model_size: str = None, compute_type: str = None,
+                      cpu_threads: int = None):
+    """
+    Get or initialize the Whisper model.
     
+    cpu_threads caps CTranslate2's thread pool (None = library default).
+    With compute_type 'auto', the settings measured by --tune on this host
+    are used if there are any (including the thread count, unless
+    cpu_threads is given); otherwise a fixed rule picks them (see
+    resolve_whisper_settings).
+    Each configuration is loaded once; the least recently used one is
+    released when more than WHISPER_MODELS_RESIDENT are in use. Models in
+    the local store (--fetch-models) are loaded from there, offline.
+    
+    Raises ModelLoadError if the model can't be loaded.
+    """
     model_size = model_size or DEFAULT_MODEL
     compute_type = compute_type or DEFAULT_COMPUTE_TYPE
+    config = (model_size, compute_type, cpu_threads)
     
-    if _whisper_model is None:
+    model = _whisper_models.pop(config, None)
+    if model is None:
         try:
             from faster_whisper import WhisperModel
             
             print(f"Loading Whisper model '{model_size}'...")
             
-            # Determine device and compute type
-            device = "cpu"
-            if compute_type == "auto":
-                # Auto-detect best settings
-                if DIARIZATION_AVAILABLE and torch.cuda.is_available():
-                    device = "cuda"
-                    compute_type = "float16"
-                elif DIARIZATION_AVAILABLE and torch.backends.mps.is_available():
-                    # MPS (Apple Silicon) - use CPU with int8 for now
-                    # faster-whisper doesn't fully support MPS yet
-                    device = "cpu"
-                    compute_type = "int8"
-                else:
-                    device = "cpu"
-                    compute_type = "int8"
+            device, compute_type, tuned = resolve_whisper_settings(model_size, compute_type)
+            if tuned:
+                if cpu_threads is None and device == "cpu":
+                    cpu_threads = tuned['cpu_threads']
+                print("  Using settings tuned for this host (--tune)")
             
             print(f"  Device: {device}, Compute type: {compute_type}")
+            if cpu_threads:
+                print(f"  CPU threads: {cpu_threads}")
+            
+            stored = stored_model(f"whisper/{model_size}")
+            if stored is not None:
+                print(f"  From the model store: {stored}")
             
-            _whisper_model = WhisperModel(
-                model_size,
+            model = WhisperModel(
+                str(stored) if stored is not None else model_size,
                 device=device,
-                compute_type=compute_type
+                compute_type=compute_type,
+                cpu_threads=cpu_threads or 0,
+                local_files_only=stored is not None
             )
             
             print(f"  Model loaded successfully")
@@ -114,20 +482,30 @@ def get_whisper_model(model_size: str = None, compute_type: str = None):
         except Exception as e:
             print(f"Error: Failed to load Whisper model: {e}")
             print("Make sure faster-whisper is installed: pip install faster-whisper")
-            sys.exit(1)
+            raise ModelLoadError(f"Failed to load Whisper model '{model_size}': {e}") from e
     
-    return _whisper_model
+    # Most recently used last
+    _whisper_models[config] = model
+    while len(_whisper_models) > WHISPER_MODELS_RESIDENT:
+        del _whisper_models[next(iter(_whisper_models))]
+    return model
 
 
 def get_diarization_pipeline():
-    """Get or initialize the speaker diarization pipeline."""
+    """
+    Get or initialize the speaker diarization pipeline.
+    
+    A pipeline in the local store (--fetch-models) is built from there
+    without HF_TOKEN or network access.
+    """
     global _diarization_pipeline
     
     if not DIARIZATION_AVAILABLE:
         return None
     
     if _diarization_pipeline is None:
-        if HF_TOKEN is None:
+        stored = stored_model(DIARIZATION_MODEL)
+        if HF_TOKEN is None and stored is None:
             print("\nWarning: HF_TOKEN environment variable not set.")
             print("To enable speaker diarization:")
             print("  1. Create account at: https://huggingface.co/join")
@@ -139,16 +517,23 @@ def get_diarization_pipeline():
             return None
         
         try:
+            import torch
+            from pyannote.audio import Pipeline
+            
             print("Loading speaker diarization model...")
             
             # Fix for PyTorch 2.6+ weights_only default change
             from pyannote.audio.core.task import Specifications, Problem, Resolution
             torch.serialization.add_safe_globals([Specifications, Problem, Resolution])
             
-            _diarization_pipeline = Pipeline.from_pretrained(
-                "pyannote/speaker-diarization-3.1",
-                use_auth_token=HF_TOKEN
-            )
+            if stored is not None:
+                print(f"  From the model store: {stored}")
+                _diarization_pipeline = _load_stored_pipeline(stored)
+            else:
+                _diarization_pipeline = Pipeline.from_pretrained(
+                    DIARIZATION_MODEL,
+                    use_auth_token=HF_TOKEN
+                )
             
             # Send to GPU if available
             if torch.cuda.is_available():
@@ -169,32 +554,38 @@ def get_diarization_pipeline():
 
 
 def get_embedding_model():
-    """Get or initialize the speaker embedding model for recognition."""
+    """Get or initialize the separate speaker embedding model (see extract_speaker_embeddings)."""
     global _embedding_model
     
     if not DIARIZATION_AVAILABLE:
         return None
     
     if _embedding_model is None:
-        if HF_TOKEN is None:
+        stored = stored_model(EMBEDDING_MODEL)
+        if HF_TOKEN is None and stored is None:
             return None
         
         try:
+            import torch
             from pyannote.audio import Model, Inference
             
             print("Loading speaker embedding model...")
             
-            # Temporarily allow unsafe loading for pyannote models
-            original_load = torch.load
-            torch.load = lambda *args, **kwargs: original_load(*args, **{**kwargs, 'weights_only': False})
-            
-            try:
-                model = Model.from_pretrained(
-                    "pyannote/embedding",
-                    use_auth_token=HF_TOKEN
-                )
-            finally:
-                torch.load = original_load
+            if stored is not None:
+                with _stored_torch_load():
+                    model = Model.from_pretrained(str(stored / 'pytorch_model.bin'))
+            else:
+                # Temporarily allow unsafe loading for pyannote models
+                original_load = torch.load
+                torch.load = lambda *args, **kwargs: original_load(*args, **{**kwargs, 'weights_only': False})
+                
+                try:
+                    model = Model.from_pretrained(
+                        EMBEDDING_MODEL,
+                        use_auth_token=HF_TOKEN
+                    )
+                finally:
+                    torch.load = original_load
             
             _embedding_model = Inference(model, window="whole")
             
@@ -211,438 +602,4338 @@ def get_embedding_model():
     return _embedding_model
 
 
-def get_audio_duration(file_path: Path) -> float:
-    """Get audio duration in seconds using ffprobe."""
+def _decode_pcm(file_path: Path, output_args: list, spill_dir: Path = None) -> np.ndarray:
+    """
+    Run ffmpeg over file_path and return its float32 PCM output at SAMPLE_RATE.
+    
+    output_args select and mix the audio (e.g. ['-ac', '1']). See
+    decode_audio for spill_dir.
+    
+    Returns:
+        np.ndarray of interleaved samples, or None if decoding failed
+    """
+    spill_path = None
+    if spill_dir is not None:
+        spill_dir.mkdir(parents=True, exist_ok=True)
+        fd, spill_path = tempfile.mkstemp(suffix='.f32', dir=spill_dir)
+        os.close(fd)
     try:
         result = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-             '-of', 'default=noprint_wrappers=1:nokey=1', str(file_path)],
-            capture_output=True,
-            text=True
+            ['ffmpeg', '-nostdin', '-v', 'error', '-y', '-i', str(file_path),
+             *output_args, '-f', 'f32le', '-acodec', 'pcm_f32le',
+             '-ar', str(SAMPLE_RATE), spill_path or 'pipe:1'],
+            capture_output=True
         )
-        if result.returncode == 0 and result.stdout.strip():
-            return float(result.stdout.strip())
-    except Exception:
-        pass
-    return None
+    except FileNotFoundError:
+        print("Error: ffmpeg not found. Install it with: conda install ffmpeg")
+        result = None
+    
+    if result is None or result.returncode != 0:
+        if result is not None:
+            stderr = result.stderr.decode('utf-8', errors='replace')
+            print(f"Error: Failed to decode audio: {stderr[:200]}")
+        if spill_path:
+            os.unlink(spill_path)
+        return None
+    
+    if spill_path is None:
+        # Zero-copy view over ffmpeg's output
+        return np.frombuffer(result.stdout, dtype=np.float32)
+    
+    if os.path.getsize(spill_path) == 0:
+        audio = np.zeros(0, dtype=np.float32)
+    else:
+        audio = np.memmap(spill_path, dtype=np.float32, mode='r')
+    try:
+        os.unlink(spill_path)
+    except OSError:
+        pass  # still mapped (Windows)
+    return audio
 
 
-def format_timestamp(seconds: float) -> str:
-    """Format seconds as HH:MM:SS."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+def decode_audio(file_path: Path, spill_dir: Path = None) -> np.ndarray:
+    """
+    Decode an audio file to a 16 kHz mono float32 buffer.
+    
+    ffmpeg writes raw PCM straight to a pipe, so the recording is decoded
+    exactly once and nothing is written to disk. The same buffer is handed to
+    Whisper, the diarization pipeline and duration reporting.
+    
+    With spill_dir, ffmpeg writes the PCM to a file there instead and a
+    read-only memory map of it is returned. Pages are then read on demand
+    and can be dropped under memory pressure, so stages that only look at
+    part of the audio at a time (windowed diarization) stay small however
+    long the recording is. The file is unlinked once mapped (on Windows it
+    stays until the map is closed).
+    
+    Returns:
+        np.ndarray of samples at SAMPLE_RATE, or None if decoding failed
+    """
+    return _decode_pcm(file_path, ['-ac', '1'], spill_dir)
 
 
-def transcribe_audio(file_path: Path, model_size: str = None, 
-                     language: str = None, compute_type: str = None) -> tuple:
+def probe_audio(file_path: Path) -> dict:
     """
-    Transcribe audio file using Whisper.
+    Read a recording's duration and audio streams from its container.
+    
+    Uses PyAV (installed with faster-whisper) in this process, and an
+    ffprobe subprocess only where PyAV is missing. Nothing is decoded.
     
     Returns:
-        tuple: (segments_list, detected_language, duration)
-        Each segment is (start_time, end_time, text)
+        dict: {'duration': seconds (None if the container doesn't say),
+        'channels': [channels, ...] per audio stream}, or None if the file
+        can't be probed
     """
-    model = get_whisper_model(model_size, compute_type)
-    duration = get_audio_duration(file_path)
-    duration_str = f" ({duration/60:.1f} minutes)" if duration else ""
+    try:
+        import av
+    except ImportError:
+        av = None
     
-    print(f"Transcribing: {file_path.name}{duration_str}")
+    if av is not None:
+        try:
+            with av.open(str(file_path), metadata_errors='ignore') as container:
+                streams = list(container.streams.audio)
+                duration = None
+                if container.duration is not None:
+                    duration = container.duration / av.time_base
+                elif streams and streams[0].duration is not None:
+                    duration = float(streams[0].duration * streams[0].time_base)
+                return {'duration': duration,
+                        'channels': [stream.codec_context.channels for stream in streams]}
+        except Exception:
+            return None
     
     try:
-        # Transcribe with word-level timestamps for diarization alignment
-        segments, info = model.transcribe(
-            str(file_path),
-            language=language,
-            beam_size=5,
-            word_timestamps=True,
-            vad_filter=True,  # Filter out non-speech
-            vad_parameters=dict(min_silence_duration_ms=500)
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration:stream=codec_type,channels',
+             '-of', 'json', str(file_path)],
+            capture_output=True, text=True
         )
-        
-        # Collect segments with timestamps
-        transcript_segments = []
-        for segment in segments:
-            transcript_segments.append((
-                segment.start,
-                segment.end,
-                segment.text.strip()
-            ))
-        
-        detected_lang = info.language
-        print(f"  Detected language: {detected_lang} (probability: {info.language_probability:.2f})")
-        print(f"  Transcribed {len(transcript_segments)} segments")
-        
-        return transcript_segments, detected_lang, duration
-        
-    except Exception as e:
-        print(f"Error: Transcription failed: {e}")
-        return None, None, None
+        info = json.loads(result.stdout)
+    except (FileNotFoundError, ValueError):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        duration = float(info.get('format', {}).get('duration'))
+    except (TypeError, ValueError):
+        duration = None
+    return {'duration': duration,
+            'channels': [int(stream.get('channels', 1)) for stream in info.get('streams', [])
+                         if stream.get('codec_type') == 'audio']}
 
 
-def perform_diarization(file_path: Path) -> list:
+def audio_metadata(file_path: Path, audio_hash: str = None) -> dict:
     """
-    Perform speaker diarization on an audio file.
+    probe_audio() of a recording, remembered by content hash.
+    
+    The hash itself is remembered per (path, size, mtime) by
+    hash_audio_file, so an unchanged recording is neither read nor probed
+    again, and a renamed or copied one reuses its entry.
     
     Returns:
-        list: [(start_time, end_time, speaker_label), ...]
+        dict: as probe_audio, or None if the file can't be probed
     """
-    pipeline = get_diarization_pipeline()
-    if pipeline is None:
-        return None
+    audio_hash = audio_hash or hash_audio_file(file_path)
+    index_path = CACHE_DIR / 'audio_metadata.json'
+    known = _read_json_index(index_path).get(audio_hash)
+    if known is not None:
+        return known
     
-    print(f"Performing speaker diarization...")
-    
-    try:
-        import torchaudio
-        
-        # Convert to WAV if needed (torchaudio handles most formats but WAV is safest)
-        if file_path.suffix.lower() in {'.m4a', '.mp3', '.aac', '.ogg', '.flac', '.webm', '.mp4'}:
-            print("  Converting audio to WAV format...")
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                tmp_path = tmp.name
-            
-            result = subprocess.run(
-                ['ffmpeg', '-y', '-i', str(file_path), '-ar', '16000', '-ac', '1', tmp_path],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode != 0:
-                print(f"  Warning: FFmpeg conversion failed: {result.stderr[:200]}")
-                return None
-            
-            waveform, sample_rate = torchaudio.load(tmp_path)
-            os.unlink(tmp_path)
-        else:
-            waveform, sample_rate = torchaudio.load(str(file_path))
-        
-        # Convert to mono if needed
-        if waveform.shape[0] > 1:
-            waveform = waveform.mean(dim=0, keepdim=True)
-        
-        # Create audio dict for pyannote
-        audio_dict = {"waveform": waveform, "sample_rate": sample_rate}
-        
-        # Run diarization with progress
-        with ProgressHook() as hook:
-            diarization = pipeline(audio_dict, hook=hook)
-        
-        # Extract speaker segments
-        segments = []
-        for turn, _, speaker in diarization.itertracks(yield_label=True):
-            segments.append((turn.start, turn.end, speaker))
-        
-        num_speakers = len(set(s[2] for s in segments))
-        print(f"  Identified {num_speakers} speakers in {len(segments)} segments")
-        
-        return segments
-        
-    except Exception as e:
-        print(f"  Warning: Diarization failed: {e}")
-        return None
+    metadata = probe_audio(file_path)
+    if metadata is not None:
+        _update_json_index(index_path, audio_hash, metadata)
+    return metadata
 
 
-def combine_transcript_with_diarization(transcript_segments: list, 
-                                         diarization_segments: list,
-                                         speaker_mapping: dict = None) -> str:
+def probe_audio_streams(file_path: Path) -> list:
     """
-    Combine transcript with speaker labels from diarization.
+    Channel count of each audio stream in a file (see audio_metadata).
     
-    Returns formatted transcript with speaker annotations.
+    Returns:
+        list: [channels, ...] per audio stream ([] if the file can't be probed)
     """
-    if not transcript_segments:
-        return ""
-    
-    if not diarization_segments:
-        # No diarization - just return plain transcript
-        lines = []
-        for start, end, text in transcript_segments:
-            lines.append(f"[{format_timestamp(start)}] {text}")
-        return '\n\n'.join(lines)
+    metadata = audio_metadata(file_path)
+    return metadata['channels'] if metadata else []
+
+
+def decode_tracks(file_path: Path, spill_dir: Path = None) -> np.ndarray:
+    """
+    Decode a multitrack recording to one 16 kHz float32 row per track.
     
-    # Create speaker name mapping
-    if speaker_mapping is None:
-        speaker_ids = sorted(set(seg[2] for seg in diarization_segments))
-        speaker_mapping = {sid: f"SPEAKER_{i+1}" for i, sid in enumerate(speaker_ids)}
+    A file with several audio streams (one per remote participant, as
+    some meeting recorders write them) gives one track per stream, each
+    mixed to mono. A file with a single multichannel stream (a mic per
+    channel) gives one track per channel. The rows are strided views of
+    the interleaved PCM; see decode_audio for spill_dir.
     
-    result_lines = []
-    current_speaker = None
-    current_text = []
-    current_start = None
+    Returns:
+        np.ndarray of shape (tracks, samples), or None if the file has a
+        single mono track or could not be decoded
+    """
+    streams = probe_audio_streams(file_path)
+    if len(streams) > 1:
+        count = len(streams)
+        inputs = ''.join(f'[a{i}]' for i in range(count))
+        graph = ';'.join(f'[0:a:{i}]aformat=channel_layouts=mono[a{i}]' for i in range(count))
+        output_args = ['-filter_complex', f'{graph};{inputs}amerge=inputs={count}']
+    elif streams and streams[0] > 1:
+        count = streams[0]
+        output_args = ['-map', '0:a:0', '-ac', str(count)]
+    else:
+        return None
     
-    for t_start, t_end, text in transcript_segments:
-        # Find the speaker with most overlap for this segment
-        best_speaker = None
-        best_overlap = 0
-        
-        for d_start, d_end, speaker in diarization_segments:
-            overlap_start = max(t_start, d_start)
-            overlap_end = min(t_end, d_end)
-            overlap = max(0, overlap_end - overlap_start)
-            
-            if overlap > best_overlap:
-                best_overlap = overlap
-                best_speaker = speaker
-        
-        speaker_name = speaker_mapping.get(best_speaker, "UNKNOWN") if best_speaker else "UNKNOWN"
-        
-        # Group consecutive text from same speaker
-        if speaker_name == current_speaker:
-            current_text.append(text)
-        else:
-            # Output previous speaker's text
-            if current_speaker and current_text:
-                timestamp = format_timestamp(current_start)
-                combined_text = ' '.join(current_text)
-                result_lines.append(f"[{timestamp}] [{current_speaker}]:\n{combined_text}")
-            
-            current_speaker = speaker_name
-            current_text = [text]
-            current_start = t_start
-    
-    # Don't forget the last segment
-    if current_speaker and current_text:
-        timestamp = format_timestamp(current_start)
-        combined_text = ' '.join(current_text)
-        result_lines.append(f"[{timestamp}] [{current_speaker}]:\n{combined_text}")
+    samples = _decode_pcm(file_path, output_args, spill_dir)
+    if samples is None:
+        return None
+    # ffmpeg interleaves the channels
+    return samples[:len(samples) // count * count].reshape(-1, count).T
+
+
+def mix_tracks(tracks: np.ndarray, spill_dir: Path = None) -> np.ndarray:
+    """
+    Average decode_tracks() rows into one mono buffer, VAD_BLOCK_SECONDS at a time.
     
-    return '\n\n'.join(result_lines)
+    With spill_dir the mix is a memory map of a temporary file there (see
+    decode_audio).
+    """
+    mix = _pcm_buffer(tracks.shape[1], spill_dir)
+    block = int(VAD_BLOCK_SECONDS * SAMPLE_RATE)
+    for offset in range(0, tracks.shape[1], block):
+        mix[offset:offset + block] = tracks[:, offset:offset + block].mean(axis=0, dtype=np.float32)
+    return mix
 
 
-def load_speaker_database() -> dict:
-    """Load saved speaker profiles from disk."""
-    if SPEAKER_DB_FILE.exists():
-        try:
-            with open(SPEAKER_DB_FILE, 'r') as f:
-                data = json.load(f)
-                return {
-                    name: {
-                        'embedding': np.array(profile['embedding']),
-                        'description': profile.get('description', ''),
-                        'sample_count': profile.get('sample_count', 1)
-                    }
-                    for name, profile in data.items()
-                }
-        except Exception as e:
-            print(f"Warning: Failed to load speaker database: {e}")
-    return {}
+def audio_duration(audio: np.ndarray) -> float:
+    """Duration in seconds of a decoded buffer."""
+    return len(audio) / SAMPLE_RATE
 
 
-def save_speaker_database(speaker_db: dict):
-    """Save speaker profiles to disk."""
-    SPEAKER_DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+def detect_speech(audio: np.ndarray) -> np.ndarray:
+    """
+    Find the speech regions of a decoded buffer with faster-whisper's VAD.
     
-    data = {
-        name: {
-            'embedding': profile['embedding'].tolist(),
-            'description': profile.get('description', ''),
-            'sample_count': profile.get('sample_count', 1)
-        }
-        for name, profile in speaker_db.items()
-    }
+    The buffer is read VAD_BLOCK_SECONDS at a time; regions that meet at a
+    block boundary, or are separated by less than the minimum silence, are
+    joined.
     
+    Returns:
+        np.ndarray of shape (regions, 2): start and end times in seconds
+    """
+    from faster_whisper.vad import get_speech_timestamps
+    
+    min_silence = VAD_PARAMETERS['min_silence_duration_ms'] / 1000
+    block = int(VAD_BLOCK_SECONDS * SAMPLE_RATE)
+    regions = []
+    for offset in range(0, len(audio), block):
+        chunk = np.array(audio[offset:offset + block])
+        for span in get_speech_timestamps(chunk, **VAD_PARAMETERS):
+            start = (offset + span['start']) / SAMPLE_RATE
+            end = (offset + span['end']) / SAMPLE_RATE
+            if regions and start - regions[-1][1] < min_silence:
+                regions[-1][1] = max(regions[-1][1], end)
+            else:
+                regions.append([start, end])
+    return np.array(regions, dtype=np.float64).reshape(-1, 2)
+
+
+def _pcm_buffer(samples: int, spill_dir: Path = None) -> np.ndarray:
+    """A writable float32 buffer, memory-mapped from a spill file if spill_dir is given."""
+    if spill_dir is None or samples == 0:
+        return np.empty(samples, dtype=np.float32)
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    fd, spill_path = tempfile.mkstemp(suffix='.f32', dir=spill_dir)
+    os.close(fd)
+    buffer = np.memmap(spill_path, dtype=np.float32, mode='w+', shape=(samples,))
     try:
-        with open(SPEAKER_DB_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"Warning: Failed to save speaker database: {e}")
+        os.unlink(spill_path)
+    except OSError:
+        pass  # still mapped (Windows)
+    return buffer
 
 
-def cosine_similarity(a, b) -> float:
-    """Calculate cosine similarity between two embeddings."""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+def gather_speech(audio: np.ndarray, speech_regions: np.ndarray,
+                  spill_dir: Path = None) -> np.ndarray:
+    """
+    Concatenate the speech regions of a buffer, leaving out the silence.
+    
+    With spill_dir the result is a memory map of a temporary file there
+    (see decode_audio), for buffers too long to copy into RAM.
+    """
+    bounds = np.round(speech_regions * SAMPLE_RATE).astype(np.int64).clip(0, len(audio))
+    speech = _pcm_buffer(int((bounds[:, 1] - bounds[:, 0]).sum()), spill_dir)
+    position = 0
+    for start, end in bounds:
+        speech[position:position + end - start] = audio[start:end]
+        position += end - start
+    return speech
 
 
-def generate_transcript_markdown(file_path: Path, transcript_text: str,
-                                  detected_language: str, duration: float,
-                                  model_used: str, has_diarization: bool) -> str:
-    """Generate markdown-formatted transcript document."""
-    date_str = datetime.now().strftime('%Y-%m-%d %H:%M')
-    duration_str = f"{duration/60:.1f} minutes" if duration else "Unknown"
+def restore_timeline(segments: list, speech_regions: np.ndarray) -> list:
+    """
+    Map turns found on gather_speech() output back to the recording's timeline.
     
-    # Extract date from filename if present (e.g., 2024-12-02-meeting.m4a)
-    recording_date = "See filename"
-    name_parts = file_path.stem.split('-')
-    if len(name_parts) >= 3:
+    A turn that runs across the join of two regions is split there, since
+    the silence between them was never heard.
+    
+    Returns:
+        list: [(start_time, end_time, label), ...]
+    """
+    bounds = np.round(speech_regions * SAMPLE_RATE).astype(np.int64) / SAMPLE_RATE
+    lengths = bounds[:, 1] - bounds[:, 0]
+    offsets = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    restored = []
+    for start, end, label in segments:
+        first = max(int(np.searchsorted(offsets, start, side='right')) - 1, 0)
+        last = int(np.searchsorted(offsets, end, side='left')) - 1
+        for k in range(first, last + 1):
+            piece_start = max(start, offsets[k])
+            piece_end = min(end, offsets[k] + lengths[k])
+            if piece_end > piece_start:
+                restored.append((float(bounds[k, 0] + piece_start - offsets[k]),
+                                 float(bounds[k, 0] + piece_end - offsets[k]), label))
+    return restored
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as HH:MM:SS."""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+@contextlib.contextmanager
+def _timed(stages: dict, name: str):
+    """Add the wall time of the enclosed block to stages[name] (seconds)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+
+def _progress_bar(total: float, initial: float = 0.0, desc: str = None):
+    """
+    Progress bar over seconds of audio, or None if tqdm isn't installed.
+    
+    Advancing by audio position rather than by segment keeps the bar and
+    its time estimate honest when segment lengths vary.
+    """
+    try:
+        from tqdm import tqdm
+    except ImportError:
+        return None
+    return tqdm(total=round(total, 1), initial=round(initial, 1), desc=desc, unit='s',
+                bar_format='{desc}: {percentage:3.0f}%|{bar}| {n:.0f}/{total:.0f}s '
+                           'of audio [{elapsed}<{remaining}]', leave=False)
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    """Replace path with data so readers see either the old or the new file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _ensure_cache_dir():
+    """Create CACHE_DIR, keeping its derived data out of the project's repository."""
+    if not CACHE_DIR.exists():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (CACHE_DIR / '.gitignore').write_text('*\n')
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path: Path, shared: bool = False):
+    """Hold an advisory lock on lock_path across processes (shared or exclusive)."""
+    with open(lock_path, 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
         try:
-            # Check if first three parts look like a date
-            int(name_parts[0])
-            int(name_parts[1])
-            int(name_parts[2])
-            recording_date = f"{name_parts[0]}-{name_parts[1]}-{name_parts[2]}"
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def cache_lock():
+    """
+    Hold the cache directory's lock.
+    
+    The host profile and the JSON indexes are rewritten whole, so each
+    read-modify-write holds this lock; otherwise parallel workers would
+    drop each other's entries. Readers don't need it, since files are
+    replaced atomically.
+    """
+    _ensure_cache_dir()
+    with _file_lock(CACHE_DIR / '.lock'):
+        yield
+
+
+def _read_json_index(index_path: Path) -> dict:
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_json_index(index_path: Path, key: str, value):
+    """
+    Set one entry of a JSON index in CACHE_DIR, keeping at most
+    CACHE_INDEX_MAX_ENTRIES (the oldest entries are dropped first).
+    """
+    try:
+        with cache_lock():
+            index = _read_json_index(index_path)
+            index.pop(key, None)
+            index[key] = value
+            for old_key in list(index)[:max(0, len(index) - CACHE_INDEX_MAX_ENTRIES)]:
+                del index[old_key]
+            _atomic_write_bytes(index_path, json.dumps(index).encode('utf-8'))
+    except OSError:
+        pass  # the index is only an optimization
+
+
+def load_host_profile() -> dict:
+    """Load this machine's measured performance profile."""
+    try:
+        with open(HOST_PROFILE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_host_profile(profile: dict):
+    """Save this machine's performance profile (callers hold cache_lock)."""
+    try:
+        _ensure_cache_dir()
+        _atomic_write_bytes(HOST_PROFILE_FILE, json.dumps(profile, indent=2).encode('utf-8'))
+    except OSError as e:
+        print(f"  Warning: Failed to save host profile: {e}")
+
+
+@contextlib.contextmanager
+def updating_host_profile():
+    """
+    Load the host profile for a change that is saved on exit.
+    
+    The update holds cache_lock, so parallel workers don't lose each
+    other's measurements.
+    """
+    with contextlib.ExitStack() as stack:
+        try:
+            stack.enter_context(cache_lock())
+        except OSError as e:
+            print(f"  Warning: Failed to lock host profile: {e}")
+        profile = load_host_profile()
+        yield profile
+        save_host_profile(profile)
+
+
+def throughput_key(model_size: str, compute_type: str, batch_size: int = None) -> str:
+    mode = f"batched{batch_size}" if batch_size else "sequential"
+    return f"{model_size or DEFAULT_MODEL}/{compute_type or DEFAULT_COMPUTE_TYPE}/{mode}"
+
+
+def host_speed(key: str) -> float:
+    """Measured speed (audio seconds per wall second) for a throughput_key, or None."""
+    entry = load_host_profile().get('throughput', {}).get(key)
+    if not entry or not entry.get('wall_seconds'):
+        return None
+    return entry['audio_seconds'] / entry['wall_seconds']
+
+
+def record_throughput(key: str, audio_seconds: float, wall_seconds: float) -> float:
+    """
+    Add a run to this host's throughput totals.
+    
+    Returns:
+        float: the updated average speed for key
+    """
+    with updating_host_profile() as profile:
+        entry = profile.setdefault('throughput', {}).setdefault(
+            key, {'audio_seconds': 0.0, 'wall_seconds': 0.0})
+        entry['audio_seconds'] += audio_seconds
+        entry['wall_seconds'] += wall_seconds
+        entry['updated'] = datetime.now().isoformat(timespec='seconds')
+    return entry['audio_seconds'] / entry['wall_seconds']
+
+
+def report_throughput(model_size: str, compute_type: str, batch_size: int,
+                      audio_seconds: float, wall_seconds: float):
+    """Print this run's speed and compare batched and sequential decoding on this host."""
+    if audio_seconds <= 0 or wall_seconds <= 0:
+        return
+    speed = audio_seconds / wall_seconds
+    record_throughput(throughput_key(model_size, compute_type, batch_size),
+                      audio_seconds, wall_seconds)
+    message = f"  Throughput: {speed:.1f}x real-time"
+    
+    if batch_size:
+        sequential = host_speed(throughput_key(model_size, compute_type))
+        if sequential:
+            message += f" ({speed / sequential:.1f}x the sequential path's {sequential:.1f}x on this host)"
+        else:
+            message += " (run once without --batch-size to compare with sequential decoding)"
+    print(message)
+
+
+def job_throughput_key(options: dict, workers: int = 1) -> str:
+    """
+    Key for the measured speed of whole jobs (all stages) run with these
+    process_file options by `workers` parallel workers, for batch ETAs.
+    """
+    key = throughput_key(options.get('model_size'), options.get('compute_type'),
+                         options.get('batch_size')) + "/job"
+    if options.get('cascade_model'):
+        key += f"+{options['cascade_model']}"
+    if options.get('enable_diarization', True) and (DIARIZATION_AVAILABLE
+                                                    or options.get('multitrack')):
+        key += "+diarization"
+    if workers > 1:
+        key += f"/{workers}workers"
+    return key
+
+
+def record_job_throughput(key: str, stats: dict):
+    """Add a finished job to its throughput totals, unless cached results sped it up."""
+    if stats.get('duration') and stats.get('wall_seconds') and not stats.get('cached'):
+        record_throughput(key, stats['duration'], stats['wall_seconds'])
+
+
+def batch_eta(durations: list, speed: float, workers: int = 1) -> float:
+    """
+    Wall seconds to transcribe recordings of these durations at speed
+    (audio seconds per wall second, per worker), handing them to `workers`
+    workers longest first as JobStore.claim does.
+    """
+    finish = [0.0] * workers
+    for duration in sorted(durations, reverse=True):
+        earliest = finish.index(min(finish))
+        finish[earliest] += duration / speed
+    return max(finish)
+
+
+def print_batch_eta(store, hashes: list, key: str, workers: int = 1):
+    """
+    Print the audio left in a batch and when it should be done.
+    
+    The estimate uses this host's measured speed for the batch's settings
+    (job_throughput_key); running jobs count only with the audio they
+    presumably have left.
+    """
+    remaining = store.remaining(hashes)
+    if not remaining:
+        return
+    speed = host_speed(key)
+    durations = []
+    for duration, started_at in remaining:
+        if duration and started_at and speed:
+            elapsed = (datetime.now() - datetime.fromisoformat(started_at)).total_seconds()
+            duration = max(0.0, duration - elapsed * speed)
+        if duration is not None:
+            durations.append(duration)
+    
+    message = f"Remaining: {len(remaining)} file(s), {format_timestamp(sum(durations))} of audio"
+    if len(durations) < len(remaining):
+        message += f" ({len(remaining) - len(durations)} of unknown length)"
+    if speed is None:
+        print(f"{message}; ETA once a file has been transcribed with these settings")
+        return
+    seconds = batch_eta(durations, speed, workers)
+    finish = datetime.fromtimestamp(time.time() + seconds)
+    print(f"{message}; ETA {finish:%H:%M} (in {format_timestamp(seconds)}, "
+          f"{speed:.1f}x real-time per worker)")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def tuned_whisper_settings(model_size: str) -> dict:
+    """
+    Fastest settings --tune measured for model_size on this host.
+    
+    Returns:
+        dict: {'device', 'compute_type', 'cpu_threads', 'rtf'}, or None if untuned
+    """
+    return load_host_profile().get('tuning', {}).get('best', {}).get(model_size)
+
+
+def tuning_candidates(device: str) -> tuple:
+    """
+    Compute types and thread counts worth trying on this machine.
+    
+    Compute types are limited to what CTranslate2 supports on this
+    device (for CPUs, that depends on the instruction set). Thread counts
+    are powers of two up to the number of usable cores.
+    
+    Returns:
+        tuple: (compute_types, thread_counts); thread_counts is [None] on GPU
+    """
+    import ctranslate2
+    supported = ctranslate2.get_supported_compute_types(device)
+    compute_types = [c for c in TUNE_COMPUTE_TYPES[device] if c in supported]
+    if device == 'cuda':
+        return compute_types, [None]
+    cores = available_cpus()
+    threads = {2 ** i for i in range(1, cores.bit_length()) if 2 ** i < cores} | {cores}
+    return compute_types, sorted(threads)
+
+
+def _tune_candidate(model_size: str, device: str, compute_type: str, cpu_threads: int,
+                    clip_path: str, language: str) -> dict:
+    """Tuning worker: load one configuration and time it on the reference clip."""
+    from faster_whisper import WhisperModel
+    
+    audio = np.load(clip_path)
+    started = time.perf_counter()
+    model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                         cpu_threads=cpu_threads or 0)
+    load_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    segments, _ = model.transcribe(audio, language=language, **ASR_DECODE_OPTIONS)
+    for _ in segments:
+        pass
+    wall_seconds = time.perf_counter() - started
+    return dict(load_seconds=round(load_seconds, 2),
+                rtf=round(wall_seconds / audio_duration(audio), 4),
+                peak_rss_mb=round(peak_rss_mb() or 0))
+
+
+def measure_whisper_config(model_size: str, device: str, compute_type: str,
+                           cpu_threads: int, clip_path: Path, language: str = None) -> dict:
+    """
+    Time one Whisper configuration in a fresh process.
+    
+    A new process per candidate keeps peak RSS and load time honest: nothing
+    is shared with or left over from earlier candidates.
+    
+    Returns:
+        dict: the configuration plus load_seconds, rtf (wall time / audio
+        time) and peak_rss_mb, or an 'error'
+    """
+    result = dict(model=model_size, device=device, compute_type=compute_type,
+                  cpu_threads=cpu_threads)
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result.update(pool.submit(_tune_candidate, model_size, device, compute_type,
+                                      cpu_threads, str(clip_path), language).result())
+    except BrokenProcessPool:
+        result['error'] = "worker crashed (unsupported instruction set?)"
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _print_tuning_result(result: dict):
+    threads = result['cpu_threads'] or '-'
+    if 'error' in result:
+        print(f"  {result['model']:<9} {result['compute_type']:<14} {threads:>7}  "
+              f"failed: {result['error'][:60]}")
+        return
+    print(f"  {result['model']:<9} {result['compute_type']:<14} {threads:>7} "
+          f"{result['load_seconds']:>7.1f}s {result['rtf']:>7.3f} "
+          f"{1 / result['rtf']:>7.1f}x {result['peak_rss_mb']:>8.0f} MB")
+
+
+def tune_host(clip: Path, models: list, language: str = None,
+              clip_seconds: float = TUNE_CLIP_SECONDS) -> dict:
+    """
+    Find the fastest Whisper settings for each model on this machine.
+    
+    Each candidate transcribes the first clip_seconds of clip in its own
+    process. Compute types are compared at the full thread count, then
+    thread counts are swept for the fastest type. The winners are saved in
+    the host profile, where compute_type 'auto' picks them up.
+    
+    Returns:
+        dict: model -> best settings, or None if the clip can't be decoded
+    """
+    from faster_whisper import download_model
+    import ctranslate2
+    
+    audio = decode_audio(clip)
+    if audio is None:
+        return None
+    audio = audio[:int(clip_seconds * SAMPLE_RATE)]
+    
+    device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    compute_types, thread_counts = tuning_candidates(device)
+    print(f"Tuning on {clip.name} ({audio_duration(audio):.0f}s), device: {device}")
+    print(f"  Compute types: {', '.join(compute_types)}")
+    if device == "cpu":
+        print(f"  Thread counts: {', '.join(map(str, thread_counts))}")
+    print(f"\n  {'Model':<9} {'Compute':<14} {'Threads':>7} {'Load':>8} {'RTF':>7} "
+          f"{'Speed':>8} {'Peak RSS':>11}")
+    print("  " + "-" * 70)
+    
+    results = {}
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        clip_path = Path(tmp) / 'clip.npy'
+        np.save(clip_path, audio)
+        for model_size in models:
+            # Download up front so the first candidate's load time is just loading
+            download_model(model_size)
+            measured = []
+            for compute_type in compute_types:
+                measured.append(measure_whisper_config(model_size, device, compute_type,
+                                                       thread_counts[-1], clip_path, language))
+                _print_tuning_result(measured[-1])
+            usable = [r for r in measured if 'error' not in r]
+            if not usable:
+                print(f"Warning: No configuration of {model_size} ran on this machine")
+                continue
+            fastest_type = min(usable, key=lambda r: r['rtf'])['compute_type']
+            for cpu_threads in thread_counts[:-1]:
+                measured.append(measure_whisper_config(model_size, device, fastest_type,
+                                                       cpu_threads, clip_path, language))
+                _print_tuning_result(measured[-1])
+            
+            winner = min((r for r in measured if 'error' not in r), key=lambda r: r['rtf'])
+            best[model_size] = {k: winner[k] for k in ('device', 'compute_type',
+                                                       'cpu_threads', 'rtf')}
+            results[model_size] = measured
+    
+    with updating_host_profile() as profile:
+        tuning = profile.setdefault('tuning', {})
+        tuning.setdefault('best', {}).update(best)
+        tuning.setdefault('results', {}).update(results)
+        tuning['clip_seconds'] = audio_duration(audio)
+        tuning['updated'] = datetime.now().isoformat(timespec='seconds')
+    return best
+
+
+def checkpoint_path(asr_key: str) -> Path:
+    """Checkpoint file for a transcription, named by its cache key."""
+    return CACHE_DIR / 'checkpoints' / f"{asr_key}.jsonl"
+
+
+def read_checkpoint(path: Path, transcript_segments: list,
+                    words: 'WordColumns.Builder', segment_scores: list) -> dict:
+    """
+    Load the committed segments of a transcription checkpoint.
+    
+    The file is append-only JSON lines: a header with the detected language,
+    then one [start, end, text, [[word_start, word_end, word], ...], scores]
+    per segment, where scores is [avg_logprob, compression_ratio,
+    no_speech_prob]. Segments are appended to transcript_segments, words and
+    segment_scores. A torn last line from an interrupted write is cut off so
+    appending can resume cleanly.
+    
+    Returns:
+        dict: the header, or None if there is no usable checkpoint
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    
+    header = None
+    committed = 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b'\n'):
+            break
+        try:
+            record = json.loads(line)
         except ValueError:
-            pass
+            break
+        if header is None:
+            header = record
+        else:
+            start, end, text, segment_words, scores = record
+            segment_scores.append(tuple(scores))
+            index = len(transcript_segments)
+            for word_start, word_end, word in segment_words:
+                words.add(index, word_start, word_end, word)
+            if not segment_words:
+                words.add(index, start, end, ' ' + text)
+            transcript_segments.append((start, end, text))
+        committed += len(line)
     
-    md = f"""# Meeting Transcript: {file_path.stem}
+    if committed < len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(committed)
+    return header
+
+
+def _batch_clips(clips: np.ndarray, max_seconds: float = 30.0) -> list:
+    """
+    Pack speech regions into clips of at most max_seconds (one Whisper
+    window), for faster-whisper's clip_timestamps.
+    
+    Neighbouring regions share a clip while it stays short enough (as the
+    pipeline's own VAD chunking does); longer regions are cut. Each clip
+    costs one encoder pass, however little speech it holds.
+    
+    Returns:
+        list: [{'start': seconds, 'end': seconds}, ...]
+    """
+    packed = []
+    for start, end in clips.tolist():
+        if packed and end - packed[-1]['start'] <= max_seconds:
+            packed[-1]['end'] = end
+            continue
+        while end - start > max_seconds:
+            packed.append({'start': start, 'end': start + max_seconds})
+            start += max_seconds
+        packed.append({'start': start, 'end': end})
+    return packed
+
+
+def transcribe_audio(file_path: Path, model_size: str = None, 
+                     language: str = None, compute_type: str = None,
+                     audio: np.ndarray = None, cpu_threads: int = None,
+                     checkpoint: Path = None, batch_size: int = None,
+                     cascade_model: str = None, stages: dict = None,
+                     progress: bool = False, speech_regions: np.ndarray = None) -> tuple:
+    """
+    Transcribe audio file using Whisper.
+    
+    If `audio` is given it must be the decode_audio() buffer for file_path;
+    otherwise the file is decoded here.
+    
+    With batch_size, faster-whisper's batched pipeline decodes that many
+    VAD speech chunks at once through the same model; segments still come
+    back in time order.
+    
+    With a checkpoint path, every segment is appended to that file as soon
+    as it is decoded. If the file already holds segments from an interrupted
+    run, the audio is clipped at the last committed timestamp and only the
+    remainder is transcribed.
+    
+    With cascade_model, model_size is the fast first pass; segments it is
+    unsure about are then decoded again with cascade_model (see
+    refine_weak_segments).
+    
+    With speech_regions (detect_speech), only those regions are decoded,
+    packed into 30 s clips (_batch_clips) and passed to Whisper as clip
+    timestamps in place of its own VAD filter.
+    
+    Wall times are added to stages: model_load, asr_prepare (features and
+    language detection, plus VAD without speech_regions, which
+    faster-whisper does before the first segment), asr (decoding) and
+    cascade. With progress, a bar follows the
+    audio position.
+    
+    Returns:
+        tuple: (segments_list, detected_language, duration, words)
+        Each segment is (start_time, end_time, text); words is a WordColumns
+    
+    Raises:
+        ModelLoadError: if the Whisper or cascade model can't be loaded
+    """
+    stages = {} if stages is None else stages
+    unsupported = batched_decoding_error() if batch_size else None
+    if unsupported:
+        print(f"Error: {unsupported}")
+        return None, None, None, None
+    with _timed(stages, 'model_load'):
+        model = get_whisper_model(model_size, compute_type, cpu_threads)
+    if audio is None:
+        audio = decode_audio(file_path)
+        if audio is None:
+            return None, None, None, None
+    duration = audio_duration(audio)
+    
+    print(f"Transcribing: {file_path.name} ({duration/60:.1f} minutes)")
+    
+    transcript_segments = []
+    segment_scores = []
+    words = WordColumns.Builder()
+    header = None
+    if checkpoint is not None:
+        header = read_checkpoint(checkpoint, transcript_segments, words, segment_scores)
+    resume_from = transcript_segments[-1][1] if transcript_segments else 0.0
+    if header is not None:
+        print(f"  Resuming from {format_timestamp(resume_from)} "
+              f"({len(transcript_segments)} segments recovered from checkpoint)")
+        # Keep the language consistent with the part already transcribed
+        language = language or header['language']
+    
+    try:
+        started = time.perf_counter()
+        if header is None or duration - resume_from > 1.0:
+            remaining = audio[int(resume_from * SAMPLE_RATE):]
+            decode_options = dict(ASR_DECODE_OPTIONS)
+            if speech_regions is not None:
+                clips = speech_regions[speech_regions[:, 1] > resume_from] - resume_from
+                clips[:, 0] = np.maximum(clips[:, 0], 0.0)
+                if len(clips):
+                    # Regions share 30 s windows, so short utterances don't
+                    # each cost an encoder pass and keep their neighbours' context
+                    packed = _batch_clips(clips)
+                    decode_options.update(vad_filter=False, clip_timestamps=(
+                        packed if batch_size else
+                        [t for clip in packed for t in (clip['start'], clip['end'])]))
+            with _timed(stages, 'asr_prepare'):
+                if batch_size:
+                    from faster_whisper import BatchedInferencePipeline
+                    segments, info = BatchedInferencePipeline(model=model).transcribe(
+                        remaining,
+                        language=language,
+                        batch_size=batch_size,
+                        **decode_options
+                    )
+                else:
+                    segments, info = model.transcribe(
+                        remaining,
+                        language=language,
+                        **decode_options
+                    )
+            if header is None:
+                header = {'language': info.language,
+                          'language_probability': info.language_probability}
+                if checkpoint is not None:
+                    _ensure_cache_dir()
+                    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+                    with open(checkpoint, 'w', encoding='utf-8') as f:
+                        f.write(json.dumps(header) + '\n')
+            
+            # Collect segments with timestamps, and their words column-wise,
+            # committing each one to the checkpoint as it arrives
+            bar = _progress_bar(duration, resume_from, "  Transcribing") if progress else None
+            with (open(checkpoint, 'a', encoding='utf-8') if checkpoint is not None
+                  else contextlib.nullcontext()) as log, \
+                    (bar or contextlib.nullcontext()), _timed(stages, 'asr'):
+                for segment in segments:
+                    start = segment.start + resume_from
+                    end = segment.end + resume_from
+                    text = segment.text.strip()
+                    scores = (segment.avg_logprob, segment.compression_ratio,
+                              segment.no_speech_prob)
+                    words.add_segment(len(transcript_segments), segment, offset=resume_from)
+                    transcript_segments.append((start, end, text))
+                    segment_scores.append(scores)
+                    if log is not None:
+                        segment_words = [[w.start + resume_from, w.end + resume_from, w.word]
+                                         for w in segment.words or []]
+                        log.write(json.dumps([start, end, text, segment_words, scores],
+                                             ensure_ascii=False) + '\n')
+                        log.flush()
+                    if bar is not None and end > bar.n:
+                        bar.update(round(min(end, duration) - bar.n, 1))
+            report_throughput(model_size, compute_type, batch_size,
+                              duration - resume_from, time.perf_counter() - started)
+        words = words.build()
+        
+        detected_lang = header['language']
+        print(f"  Detected language: {detected_lang} (probability: {header['language_probability']:.2f})")
+        print(f"  Transcribed {len(transcript_segments)} segments ({len(words)} words)")
+        
+        if cascade_model and cascade_model != (model_size or DEFAULT_MODEL):
+            with _timed(stages, 'cascade'):
+                transcript_segments, words = refine_weak_segments(
+                    audio, transcript_segments, segment_scores, words, cascade_model,
+                    detected_lang, compute_type, cpu_threads
+                )
+        
+        return transcript_segments, detected_lang, duration, words
+        
+    except ModelLoadError:
+        raise
+    except Exception as e:
+        print(f"Error: Transcription failed: {e}")
+        if checkpoint is not None and transcript_segments:
+            print(f"  Progress is checkpointed; re-run to resume from "
+                  f"{format_timestamp(transcript_segments[-1][1])}")
+        return None, None, None, None
+
+
+def weak_segment_spans(transcript_segments: list, segment_scores: list,
+                       duration: float) -> list:
+    """
+    Find the runs of low-confidence segments worth decoding again.
+    
+    Consecutive weak segments form one run. Each run's span reaches out
+    through the silence on either side up to the neighbouring confident
+    segments, so the re-decode sees the whole utterance without overlapping
+    text that is kept.
+    
+    Returns:
+        list: [(first_index, last_index, start_time, end_time), ...]
+    """
+    if not transcript_segments:
+        return []
+    scores = np.asarray(segment_scores, dtype=np.float64).reshape(-1, 3)
+    # NaN (unknown) compares False, so it never counts as weak
+    weak = ((scores[:, 0] < CASCADE_THRESHOLDS['min_avg_logprob'])
+            | (scores[:, 1] > CASCADE_THRESHOLDS['max_compression_ratio'])
+            | (scores[:, 2] > CASCADE_THRESHOLDS['max_no_speech_prob']))
+    
+    # Run boundaries: where the mask switches on and off
+    edges = np.diff(np.concatenate(([0], weak.astype(np.int8), [0])))
+    firsts = np.flatnonzero(edges == 1)
+    lasts = np.flatnonzero(edges == -1) - 1
+    
+    spans = []
+    for first, last in zip(firsts.tolist(), lasts.tolist()):
+        start = transcript_segments[first - 1][1] if first > 0 else 0.0
+        end = (transcript_segments[last + 1][0] if last + 1 < len(transcript_segments)
+               else duration)
+        spans.append((first, last, start, max(end, start)))
+    return spans
+
+
+def refine_weak_segments(audio: np.ndarray, transcript_segments: list,
+                         segment_scores: list, words: WordColumns,
+                         model_size: str, language: str, compute_type: str = None,
+                         cpu_threads: int = None) -> tuple:
+    """
+    Second pass of a cascade: decode weak spans again with a larger model.
+    
+    Only the audio under weak_segment_spans() is decoded, with the
+    preceding segment's text as the prompt. The new segments and words
+    replace the weak ones; everything else is kept as it is.
+    
+    Returns:
+        tuple: (segments_list, words) with the spans spliced in
+    """
+    spans = weak_segment_spans(transcript_segments, segment_scores, audio_duration(audio))
+    if not spans:
+        print(f"  Cascade: all {len(transcript_segments)} segments confident, "
+              f"skipping {model_size}")
+        return transcript_segments, words
+    
+    span_seconds = sum(end - start for _, _, start, end in spans)
+    weak_count = sum(last - first + 1 for first, last, _, _ in spans)
+    print(f"  Cascade: re-decoding {weak_count} of {len(transcript_segments)} segments "
+          f"({span_seconds/60:.1f} min, {span_seconds/audio_duration(audio):.0%} of audio) "
+          f"with '{model_size}'")
+    
+    model = get_whisper_model(model_size, compute_type, cpu_threads)
+    started = time.perf_counter()
+    # Words are stored in segment order: word_bounds[i]:word_bounds[i+1] belong to segment i
+    word_bounds = np.searchsorted(words.segment, np.arange(len(transcript_segments) + 1))
+    
+    refined = []
+    builder = WordColumns.Builder()
+    
+    def keep(index):
+        for w in range(word_bounds[index], word_bounds[index + 1]):
+            builder.add(len(refined), words.start[w], words.end[w], words.text[w])
+        refined.append(transcript_segments[index])
+    
+    position = 0
+    for first, last, start, end in spans:
+        for index in range(position, first):
+            keep(index)
+        position = last + 1
+        
+        clip = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        prompt = transcript_segments[first - 1][2] if first > 0 else None
+        try:
+            segments, _ = model.transcribe(clip, language=language, initial_prompt=prompt,
+                                           **ASR_DECODE_OPTIONS)
+            segments = list(segments)
+        except Exception as e:
+            print(f"Warning: Cascade re-decode failed at {format_timestamp(start)}: {e}")
+            for index in range(first, last + 1):
+                keep(index)
+            continue
+        for segment in segments:
+            builder.add_segment(len(refined), segment, offset=start)
+            refined.append((segment.start + start, segment.end + start, segment.text.strip()))
+    for index in range(position, len(transcript_segments)):
+        keep(index)
+    
+    print(f"  Cascade: {len(refined)} segments after refinement "
+          f"({time.perf_counter() - started:.1f}s)")
+    return refined, builder.build()
+
+
+def _diarize_chunk(pipeline, audio: np.ndarray, **kwargs):
+    """Run the pyannote pipeline over one buffer of samples, with a progress display."""
+    import torch
+    from pyannote.audio.pipelines.utils.hook import ProgressHook
+    
+    # pyannote only reads the waveform, so wrapping the read-only
+    # decode buffer without copying is safe
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='.*not writable.*')
+        waveform = torch.from_numpy(audio).unsqueeze(0)
+    
+    with ProgressHook() as hook:
+        return pipeline({"waveform": waveform, "sample_rate": SAMPLE_RATE},
+                        hook=hook, **kwargs)
+
+
+def diarize_windowed(pipeline, audio: np.ndarray, window_seconds: float,
+                     overlap_seconds: float = DIARIZATION_WINDOW_OVERLAP,
+                     embeddings: dict = None) -> list:
+    """
+    Diarize a long recording in overlapping windows with bounded memory.
+    
+    Only one window of samples is copied out of `audio` (typically a memory
+    map) at a time. Each window's speakers come with pyannote's centroid
+    embeddings; they are matched one-to-one against speakers of earlier
+    windows (duration-weighted mean embeddings) and take over their label,
+    or become new speakers. Each window keeps the turns in its half of the
+    overlaps, so no turn is counted twice. The speakers' mean embeddings
+    are added to embeddings, if given, as {speaker_label: embedding}.
+    
+    Returns:
+        list: [(start_time, end_time, speaker_label), ...]
+    """
+    total = audio_duration(audio)
+    overlap_seconds = min(overlap_seconds, window_seconds / 4)
+    count = max(1, int(np.ceil((total - overlap_seconds) / (window_seconds - overlap_seconds))))
+    # Equal windows no longer than window_seconds, instead of a short last one
+    step = (total - overlap_seconds) / count
+    print(f"  Diarizing in {count} windows of {format_timestamp(step + overlap_seconds)}")
+    
+    centroids = []  # global speaker -> duration-weighted sum of unit embeddings
+    segments = []
+    for k in range(count):
+        start = k * step
+        end = min(start + step + overlap_seconds, total)
+        print(f"  Window {k+1}/{count}: {format_timestamp(start)} - {format_timestamp(end)}")
+        chunk = np.array(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)])
+        diarization, window_embeddings = _diarize_chunk(pipeline, chunk, return_embeddings=True)
+        del chunk
+        
+        labels = diarization.labels()
+        if not labels:
+            continue
+        local = np.asarray(window_embeddings, dtype=np.float32)[:len(labels)]
+        # Speakers too brief for an embedding come back as NaN
+        usable = np.isfinite(local).all(axis=1)
+        local = l2_normalize(np.where(usable[:, None], local, 0.0))
+        
+        assignment = np.full(len(labels), -1, dtype=np.int64)
+        if centroids:
+            assignment, _ = match_speakers(local, l2_normalize(np.stack(centroids)),
+                                           DIARIZATION_STITCH_THRESHOLD)
+        mapping = {}
+        for i, label in enumerate(labels):
+            speaker = int(assignment[i])
+            if speaker < 0:
+                speaker = len(centroids)
+                centroids.append(np.zeros(local.shape[1], dtype=np.float32))
+            centroids[speaker] += local[i] * diarization.label_duration(label)
+            mapping[label] = speaker
+        
+        keep_from = start + overlap_seconds / 2 if k > 0 else 0.0
+        keep_to = end - overlap_seconds / 2 if k < count - 1 else total
+        for turn, _, label in diarization.itertracks(yield_label=True):
+            turn_start = max(turn.start + start, keep_from)
+            turn_end = min(turn.end + start, keep_to)
+            if turn_end <= turn_start:
+                continue
+            if segments and segments[-1][2] == mapping[label] and segments[-1][1] >= turn_start:
+                # A turn cut at the window boundary continues in this window
+                segments[-1] = (segments[-1][0], max(segments[-1][1], turn_end), mapping[label])
+            else:
+                segments.append((turn_start, turn_end, mapping[label]))
+    
+    # Number speakers by first appearance; some only spoke in discarded overlap
+    names = {}
+    for _, _, speaker in segments:
+        names.setdefault(speaker, f"SPEAKER_{len(names):02d}")
+    if embeddings is not None:
+        for speaker, label in names.items():
+            if centroids[speaker].any():
+                embeddings[label] = l2_normalize(centroids[speaker])
+    return [(start, end, names[speaker]) for start, end, speaker in segments]
+
+
+def _mask_runs(mask: np.ndarray, min_gap: int, min_length: int) -> list:
+    """
+    [start, end) index runs where mask is set, after closing gaps shorter
+    than min_gap and dropping runs shorter than min_length.
+    """
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    runs = []
+    for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        if runs and start - runs[-1][1] < min_gap:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+    return [(int(start), int(end)) for start, end in runs if end - start >= min_length]
+
+
+def diarize_tracks(tracks: np.ndarray) -> list:
+    """
+    Speaker turns of a multitrack recording, read off its tracks.
+    
+    Each track is taken to be one speaker. Speech is found per track with
+    the same VAD Whisper uses, and a track counts as speaking only while it
+    is no more than MULTITRACK_DOMINANCE_DB below the loudest track, so
+    the quieter copy of a voice picked up by the other mics is ignored but
+    two people talking at once both keep their turn.
+    
+    Like detect_speech, the tracks are read VAD_BLOCK_SECONDS at a time, so
+    memory-mapped tracks (decode_tracks with spill_dir) are never copied
+    whole into RAM.
+    
+    Returns:
+        list: [(start_time, end_time, speaker_label), ...] with one
+        SPEAKER_<nn> label per track, or None if the tracks can't be told
+        apart (fewer than two carry speech, or too much of the speech is
+        shared between them) and neural diarization should be used
+    """
+    from faster_whisper.vad import get_speech_timestamps
+    
+    frame = int(MULTITRACK_FRAME_SECONDS * SAMPLE_RATE)
+    frames = tracks.shape[1] // frame
+    # Whole frames per block, so block boundaries fall on frame boundaries
+    block = int(VAD_BLOCK_SECONDS * SAMPLE_RATE) // frame * frame
+    level = np.empty((len(tracks), frames), dtype=np.float32)
+    voiced = np.zeros((len(tracks), frames), dtype=bool)
+    for offset in range(0, tracks.shape[1], block):
+        chunk = np.array(tracks[:, offset:offset + block])
+        first = offset // frame
+        count = min(chunk.shape[1] // frame, frames - first)
+        power = np.square(chunk[:, :count * frame].reshape(len(tracks), count, frame)).mean(axis=2)
+        level[:, first:first + count] = 10 * np.log10(power + 1e-10)
+        for i, track in enumerate(chunk):
+            for span in get_speech_timestamps(track, **VAD_PARAMETERS):
+                voiced[i, (offset + span['start']) // frame:
+                       -(-(offset + span['end']) // frame)] = True
+    
+    active = voiced & (level >= level.max(axis=0) - MULTITRACK_DOMINANCE_DB)
+    speech = active.any(axis=0).sum()
+    shared = (active.sum(axis=0) > 1).sum() / max(speech, 1)
+    
+    min_gap = int(0.5 / MULTITRACK_FRAME_SECONDS)
+    min_turn = int(0.25 / MULTITRACK_FRAME_SECONDS)
+    segments = []
+    for i in range(len(tracks)):
+        for start, end in _mask_runs(active[i], min_gap, min_turn):
+            segments.append((start * MULTITRACK_FRAME_SECONDS, end * MULTITRACK_FRAME_SECONDS,
+                             f"SPEAKER_{i:02d}"))
+    speakers = len(set(s[2] for s in segments))
+    
+    if speakers < 2:
+        print(f"  Multitrack: speech on {speakers} of {len(tracks)} tracks; "
+              f"falling back to neural diarization")
+        return None
+    if shared > MULTITRACK_MAX_SHARED:
+        print(f"  Multitrack: {shared:.0%} of the speech is heard on several tracks "
+              f"(bleed); falling back to neural diarization")
+        return None
+    
+    segments.sort()
+    print(f"  Multitrack: {speakers} speakers in {len(segments)} segments "
+          f"({shared:.0%} overlapping speech)")
+    return segments
+
+
+def perform_diarization(file_path: Path, audio: np.ndarray = None,
+                        num_threads: int = None, stages: dict = None,
+                        window_seconds: float = None,
+                        speech_regions: np.ndarray = None,
+                        embeddings: dict = None) -> list:
+    """
+    Perform speaker diarization on an audio file.
+    
+    If `audio` is given it must be the decode_audio() buffer for file_path;
+    otherwise the file is decoded here. num_threads sets torch's intra-op
+    thread count (None = leave torch's default). Recordings longer than
+    window_seconds are diarized in windows (see diarize_windowed). Wall
+    times are added to stages (diarization_load, diarization).
+    
+    With speech_regions (detect_speech), the pipeline only hears the speech,
+    joined end to end, and the turns are mapped back to the recording's
+    timeline. A memory-mapped buffer is gathered into another spill file.
+    
+    The pipeline's centroid embedding of each speaker (DIARIZATION_MODEL's
+    embedding space) is added to embeddings, if given, for
+    recognize_speakers. Speakers too brief for one are left out.
+    
+    Returns:
+        list: [(start_time, end_time, speaker_label), ...]
+    """
+    stages = {} if stages is None else stages
+    with _timed(stages, 'diarization_load'):
+        pipeline = get_diarization_pipeline()
+    if pipeline is None:
+        return None
+    
+    import torch
+    
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    
+    print(f"Performing speaker diarization...")
+    
+    if audio is None:
+        audio = decode_audio(file_path)
+        if audio is None:
+            return None
+    
+    try:
+        with _timed(stages, 'diarization'):
+            if speech_regions is not None and len(speech_regions):
+                spill_dir = CACHE_DIR / 'pcm' if isinstance(audio, np.memmap) else None
+                audio = gather_speech(audio, speech_regions, spill_dir)
+            else:
+                speech_regions = None
+            
+            if window_seconds and audio_duration(audio) > window_seconds:
+                segments = diarize_windowed(pipeline, audio, window_seconds,
+                                            embeddings=embeddings)
+            else:
+                diarization, centroids = _diarize_chunk(pipeline, audio, return_embeddings=True)
+                # Extract speaker segments
+                segments = []
+                for turn, _, speaker in diarization.itertracks(yield_label=True):
+                    segments.append((turn.start, turn.end, speaker))
+                if embeddings is not None and centroids is not None:
+                    # Rows follow labels(); NaN rows are speakers too brief for an embedding
+                    for label, centroid in zip(diarization.labels(), np.asarray(centroids)):
+                        if np.isfinite(centroid).all():
+                            embeddings[label] = l2_normalize(centroid.astype(np.float32))
+            
+            if speech_regions is not None:
+                segments = restore_timeline(segments, speech_regions)
+        
+        num_speakers = len(set(s[2] for s in segments))
+        print(f"  Identified {num_speakers} speakers in {len(segments)} segments")
+        
+        return segments
+        
+    except Exception as e:
+        print(f"  Warning: Diarization failed: {e}")
+        return None
+
+
+class WordColumns:
+    """
+    Word timings held as parallel arrays rather than a list of tuples.
+    
+    `segment` is the index of the Whisper segment each word belongs to.
+    Word text keeps Whisper's leading whitespace, so ''.join() of a run of
+    words reproduces the original spacing (including for languages written
+    without spaces).
+    """
+    __slots__ = ('start', 'end', 'text', 'segment')
+    
+    def __init__(self, start: np.ndarray, end: np.ndarray, text: list,
+                 segment: np.ndarray):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.segment = segment
+    
+    def __len__(self):
+        return len(self.text)
+    
+    class Builder:
+        """Accumulates words into compact typed arrays while segments stream in."""
+        
+        def __init__(self):
+            self.start = array('d')
+            self.end = array('d')
+            self.segment = array('i')
+            self.text = []
+        
+        def add(self, segment_index: int, start: float, end: float, text: str):
+            self.start.append(start)
+            self.end.append(end)
+            self.segment.append(segment_index)
+            self.text.append(text)
+        
+        def add_segment(self, segment_index: int, segment, offset: float = 0.0):
+            """
+            Add a faster-whisper segment's words (or the whole segment if it
+            has none), shifting timestamps by offset seconds.
+            """
+            if segment.words:
+                for word in segment.words:
+                    self.add(segment_index, word.start + offset, word.end + offset, word.word)
+            else:
+                self.add(segment_index, segment.start + offset, segment.end + offset,
+                         ' ' + segment.text.strip())
+        
+        def build(self) -> 'WordColumns':
+            return WordColumns(np.frombuffer(self.start, dtype=np.float64),
+                               np.frombuffer(self.end, dtype=np.float64),
+                               self.text,
+                               np.frombuffer(self.segment, dtype=np.int32))
+    
+    @classmethod
+    def from_segments(cls, transcript_segments: list) -> 'WordColumns':
+        """Treat each (start, end, text) segment as a single word."""
+        builder = cls.Builder()
+        for index, (start, end, text) in enumerate(transcript_segments):
+            builder.add(index, start, end, ' ' + text)
+        return builder.build()
+
+
+class TurnColumns:
+    """
+    Diarization turns as parallel arrays, sorted by start time.
+    
+    `speaker` holds integer codes indexing into `labels`.
+    """
+    __slots__ = ('start', 'end', 'speaker', 'labels')
+    
+    def __init__(self, start: np.ndarray, end: np.ndarray, speaker: np.ndarray,
+                 labels: list):
+        self.start = start
+        self.end = end
+        self.speaker = speaker
+        self.labels = labels
+    
+    def __len__(self):
+        return len(self.start)
+    
+    @classmethod
+    def from_segments(cls, diarization_segments: list) -> 'TurnColumns':
+        """Build from [(start_time, end_time, speaker_label), ...]."""
+        labels = sorted(set(seg[2] for seg in diarization_segments))
+        codes = {label: i for i, label in enumerate(labels)}
+        start = np.fromiter((seg[0] for seg in diarization_segments), dtype=np.float64,
+                            count=len(diarization_segments))
+        end = np.fromiter((seg[1] for seg in diarization_segments), dtype=np.float64,
+                          count=len(diarization_segments))
+        speaker = np.fromiter((codes[seg[2]] for seg in diarization_segments),
+                              dtype=np.int32, count=len(diarization_segments))
+        order = np.argsort(start, kind='stable')
+        return cls(start[order], end[order], speaker[order], labels)
+
+
+def assign_word_speakers(words: WordColumns, turns: TurnColumns) -> np.ndarray:
+    """
+    Give every word the speaker whose turn overlaps it the most.
+    
+    Sweep line over words and turns, both sorted by start time: turns enter
+    the active set once the sweep reaches them and leave once they end, so
+    each turn is touched a constant number of times and the whole pass is
+    linear in words + turns (times the handful of overlapping speakers).
+    A word that falls in a gap between turns keeps the previous word's
+    speaker.
+    
+    Returns:
+        np.ndarray of speaker codes into turns.labels, -1 where unknown
+    """
+    order = np.argsort(words.start, kind='stable')
+    word_start = words.start.tolist()
+    word_end = words.end.tolist()
+    turn_start = turns.start.tolist()
+    turn_end = turns.end.tolist()
+    turn_speaker = turns.speaker.tolist()
+    n_turns = len(turn_start)
+    
+    speakers = np.full(len(words), -1, dtype=np.int32)
+    active = []
+    next_turn = 0
+    previous = -1
+    
+    for i in order.tolist():
+        w_start, w_end = word_start[i], word_end[i]
+        
+        while next_turn < n_turns and turn_start[next_turn] < w_end:
+            active.append(next_turn)
+            next_turn += 1
+        active = [k for k in active if turn_end[k] > w_start]
+        
+        best_speaker = previous
+        best_overlap = 0.0
+        for k in active:
+            overlap = min(w_end, turn_end[k]) - max(w_start, turn_start[k])
+            if overlap > best_overlap:
+                best_overlap = overlap
+                best_speaker = turn_speaker[k]
+        
+        speakers[i] = best_speaker
+        previous = best_speaker
+    
+    return speakers
+
+
+def combine_transcript_with_diarization(transcript_segments: list, 
+                                         diarization_segments: list,
+                                         speaker_mapping: dict = None,
+                                         words: WordColumns = None) -> str:
+    """
+    Combine transcript with speaker labels from diarization.
+    
+    Speakers are assigned per word (see assign_word_speakers), so a Whisper
+    segment spoken by two people is split where the speaker changes. Without
+    word timings each segment is treated as one word.
+    
+    Returns formatted transcript with speaker annotations.
+    """
+    if not transcript_segments:
+        return ""
+    
+    if not diarization_segments:
+        # No diarization - just return plain transcript
+        lines = []
+        for start, end, text in transcript_segments:
+            lines.append(f"[{format_timestamp(start)}] {text}")
+        return '\n\n'.join(lines)
+    
+    if words is None or len(words) == 0:
+        words = WordColumns.from_segments(transcript_segments)
+    turns = TurnColumns.from_segments(diarization_segments)
+    
+    # Create speaker name mapping
+    if speaker_mapping is None:
+        speaker_mapping = {sid: f"SPEAKER_{i+1}" for i, sid in enumerate(turns.labels)}
+    names = [speaker_mapping.get(label, "UNKNOWN") for label in turns.labels]
+    
+    speakers = assign_word_speakers(words, turns).tolist()
+    word_start = words.start.tolist()
+    
+    # Group consecutive words from the same speaker into paragraphs
+    result_lines = []
+    run_start = 0
+    for i in range(1, len(words) + 1):
+        if i < len(words) and speakers[i] == speakers[run_start]:
+            continue
+        code = speakers[run_start]
+        speaker_name = names[code] if code >= 0 else "UNKNOWN"
+        text = ''.join(words.text[run_start:i]).strip()
+        if text:
+            timestamp = format_timestamp(word_start[run_start])
+            result_lines.append(f"[{timestamp}] [{speaker_name}]:\n{text}")
+        run_start = i
+    
+    return '\n\n'.join(result_lines)
+
+
+@contextlib.contextmanager
+def speaker_db_lock(shared: bool = False):
+    """
+    Hold the speaker database lock.
+    
+    Readers share the lock; writers hold it exclusively, so concurrent
+    transcription workers never interleave a read-modify-write.
+    """
+    SPEAKER_DB_DIR.mkdir(parents=True, exist_ok=True)
+    with _file_lock(SPEAKER_DB_DIR / '.lock', shared):
+        yield
+
+
+def _read_speaker_index() -> dict:
+    """Read the profile index (caller holds the lock)."""
+    try:
+        with open(SPEAKER_INDEX_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'matrices': {}, 'profiles': {}}
+
+
+def _write_speaker_index(index: dict):
+    """Commit a new index (caller holds the exclusive lock)."""
+    _atomic_write_bytes(SPEAKER_INDEX_FILE, json.dumps(index, indent=2).encode('utf-8'))
+
+
+def _read_speaker_database(index: dict) -> dict:
+    """
+    Attach embeddings to the index entries as rows of the memory-mapped matrices.
+    
+    Returns:
+        dict: {name: {'embeddings': {model: vector}, 'samples': {model: count},
+        'description', 'sample_count'}}
+    """
+    matrices = {space: np.load(SPEAKER_DB_DIR / matrix_name, mmap_mode='r')
+                for space, matrix_name in index['matrices'].items()}
+    return {
+        name: {
+            'embeddings': {space: matrices[space][slot['row']]
+                           for space, slot in entry['spaces'].items()},
+            'samples': {space: slot.get('samples', 1)
+                        for space, slot in entry['spaces'].items()},
+            'description': entry.get('description', ''),
+            'sample_count': entry.get('sample_count', 1)
+        }
+        for name, entry in index['profiles'].items()
+    }
+
+
+def _write_speaker_database(speaker_db: dict):
+    """
+    Write all profiles (caller holds the exclusive lock).
+    
+    Embeddings of each model go to their own matrix, in new files first;
+    replacing the index then switches readers over in one atomic step, and
+    the old matrices are removed.
+    """
+    old_matrices = set(_read_speaker_index()['matrices'].values())
+    matrices = {}
+    rows = {}  # (name, space) -> row
+    spaces = sorted({space for profile in speaker_db.values() for space in profile['embeddings']})
+    for space in spaces:
+        names = [name for name, profile in speaker_db.items() if space in profile['embeddings']]
+        matrix = np.stack([np.asarray(speaker_db[name]['embeddings'][space], dtype=np.float32)
+                           for name in names])
+        matrix_name = f"embeddings-{re.sub(r'[^A-Za-z0-9]+', '-', space)}-{time.time_ns():x}.npy"
+        buffer = io.BytesIO()
+        np.save(buffer, matrix)
+        _atomic_write_bytes(SPEAKER_DB_DIR / matrix_name, buffer.getvalue())
+        matrices[space] = matrix_name
+        rows.update({(name, space): row for row, name in enumerate(names)})
+    
+    _write_speaker_index({
+        'matrices': matrices,
+        'profiles': {
+            name: {
+                'spaces': {space: {'row': rows[name, space],
+                                   'samples': profile['samples'].get(space, 1)}
+                           for space in profile['embeddings']},
+                'description': profile.get('description', ''),
+                'sample_count': profile.get('sample_count', 1)
+            }
+            for name, profile in speaker_db.items()
+        }
+    })
+    
+    for matrix_name in old_matrices - set(matrices.values()):
+        try:
+            (SPEAKER_DB_DIR / matrix_name).unlink()
+        except OSError:
+            pass  # still mapped by a reader on Windows; harmless
+
+
+def _migrate_legacy_speaker_database():
+    """Convert a speaker_profiles.json from older versions to the binary format."""
+    if SPEAKER_INDEX_FILE.exists() or not SPEAKER_DB_FILE.exists():
+        return
+    with speaker_db_lock():
+        if SPEAKER_INDEX_FILE.exists():
+            return  # another process migrated it first
+        try:
+            with open(SPEAKER_DB_FILE, 'r') as f:
+                data = json.load(f)
+            _write_speaker_database({
+                name: {
+                    'embeddings': {EMBEDDING_MODEL: np.array(profile['embedding'],
+                                                             dtype=np.float32)},
+                    'samples': {EMBEDDING_MODEL: profile.get('sample_count', 1)},
+                    'description': profile.get('description', ''),
+                    'sample_count': profile.get('sample_count', 1)
+                }
+                for name, profile in data.items()
+            })
+            SPEAKER_DB_FILE.rename(SPEAKER_DB_FILE.with_suffix('.json.migrated'))
+            print(f"Migrated {len(data)} speaker profiles to {SPEAKER_DB_DIR}")
+        except Exception as e:
+            print(f"Warning: Failed to migrate speaker database: {e}")
+
+
+def load_speaker_index() -> dict:
+    """
+    Load profile metadata without touching the embeddings.
+    
+    Returns:
+        dict: {name: {'spaces', 'description', 'sample_count'}}
+    """
+    _migrate_legacy_speaker_database()
+    if not SPEAKER_INDEX_FILE.exists():
+        return {}
+    try:
+        with speaker_db_lock(shared=True):
+            return _read_speaker_index()['profiles']
+    except Exception as e:
+        print(f"Warning: Failed to load speaker database: {e}")
+    return {}
+
+
+def load_speaker_database() -> dict:
+    """Load saved speaker profiles from disk (embeddings are memory-mapped)."""
+    _migrate_legacy_speaker_database()
+    try:
+        with speaker_db_lock(shared=True):
+            return _read_speaker_database(_read_speaker_index())
+    except Exception as e:
+        print(f"Warning: Failed to load speaker database: {e}")
+    return {}
+
+
+def save_speaker_database(speaker_db: dict):
+    """Save speaker profiles to disk."""
+    try:
+        with speaker_db_lock():
+            _write_speaker_database(speaker_db)
+    except Exception as e:
+        print(f"Warning: Failed to save speaker database: {e}")
+
+
+@contextlib.contextmanager
+def update_speaker_database():
+    """
+    Read-modify-write the speaker profiles under the exclusive lock.
+    
+    Yields the profile dict; changes are saved when the block exits normally.
+    """
+    _migrate_legacy_speaker_database()
+    with speaker_db_lock():
+        speaker_db = _read_speaker_database(_read_speaker_index())
+        yield speaker_db
+        _write_speaker_database(speaker_db)
+
+
+@contextlib.contextmanager
+def update_speaker_index():
+    """
+    Like update_speaker_database, but for metadata-only changes.
+    
+    Renames and deletions only rewrite the small index; rows left unused
+    are dropped the next time the embedding matrix is written.
+    """
+    _migrate_legacy_speaker_database()
+    with speaker_db_lock():
+        index = _read_speaker_index()
+        yield index['profiles']
+        _write_speaker_index(index)
+
+
+def cosine_similarity(a, b) -> float:
+    """Calculate cosine similarity between two embeddings."""
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+
+def extract_speaker_embeddings(audio: np.ndarray, diarization_segments: list) -> dict:
+    """
+    Compute one EMBEDDING_MODEL embedding per diarized speaker.
+    
+    Each speaker's longest turns, up to SPEAKER_EMBEDDING_SECONDS in total,
+    are concatenated and cut into EMBEDDING_CHUNK_SECONDS pieces. The
+    pieces of all speakers go through the model EMBEDDING_BATCH_SIZE at a
+    time, and a speaker's embedding is the mean of its normalised piece
+    embeddings. Speakers with less than one piece of speech are embedded
+    whole.
+    
+    Returns:
+        dict: {speaker_label: embedding}, or None if the embedding model is unavailable
+    """
+    inference = get_embedding_model()
+    if inference is None:
+        return None
+    import torch
+    
+    turns_by_speaker = {}
+    for start, end, label in diarization_segments:
+        turns_by_speaker.setdefault(label, []).append((end - start, start, end))
+    
+    chunk = int(EMBEDDING_CHUNK_SECONDS * SAMPLE_RATE)
+    pieces, owners = [], []
+    short = {}  # label -> whole signal shorter than a piece
+    for label, turns in turns_by_speaker.items():
+        selected = []
+        total = 0.0
+        for length, start, end in sorted(turns, reverse=True):
+            if total >= SPEAKER_EMBEDDING_SECONDS:
+                break
+            selected.append(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)])
+            total += length
+        if total < 1.0:
+            continue  # too little speech for a reliable embedding
+        signal = np.concatenate(selected)[:int(SPEAKER_EMBEDDING_SECONDS * SAMPLE_RATE)]
+        if len(signal) < chunk:
+            short[label] = signal
+        for offset in range(0, len(signal) - chunk + 1, chunk):
+            pieces.append(signal[offset:offset + chunk])
+            owners.append(label)
+    
+    sums = {}
+    try:
+        for i in range(0, len(pieces), EMBEDDING_BATCH_SIZE):
+            batch = torch.from_numpy(np.stack(pieces[i:i + EMBEDDING_BATCH_SIZE])).unsqueeze(1)
+            vectors = l2_normalize(np.asarray(inference.infer(batch),
+                                              dtype=np.float32).reshape(len(batch), -1))
+            for label, vector in zip(owners[i:i + EMBEDDING_BATCH_SIZE], vectors):
+                sums[label] = sums.get(label, 0.0) + vector
+        for label, signal in short.items():
+            waveform = torch.from_numpy(signal).unsqueeze(0)
+            embedding = inference({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+            sums[label] = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    except Exception as e:
+        print(f"  Warning: Speaker embedding failed: {e}")
+        return None
+    
+    return {label: l2_normalize(vector) for label, vector in sums.items()}
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def stack_speaker_profiles(speaker_db: dict, space: str) -> tuple:
+    """
+    Stack the profiles' embeddings from one model into an L2-normalised matrix.
+    
+    Profiles without an embedding from that model are left out.
+    
+    Returns:
+        tuple: (names, matrix) with one row per name
+    """
+    names = [name for name in speaker_db if space in speaker_db[name]['embeddings']]
+    if not names:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    matrix = np.stack([speaker_db[name]['embeddings'][space] for name in names])
+    return names, l2_normalize(matrix.astype(np.float32))
+
+
+def match_speakers(embeddings: np.ndarray, profiles: np.ndarray, threshold: float) -> tuple:
+    """
+    Match speaker embeddings to profiles one-to-one.
+    
+    All similarities come from a single (speakers x profiles) matrix
+    multiply. Pairs are then taken greedily from most to least similar, so
+    no two speakers can claim the same profile.
+    
+    Args:
+        embeddings: (S, D) L2-normalised speaker embeddings
+        profiles: (P, D) L2-normalised profile matrix
+        threshold: minimum cosine similarity for a match
+    
+    Returns:
+        tuple: (assignment, similarity) arrays of length S; assignment is
+        the matched profile row or -1
+    """
+    assignment = np.full(len(embeddings), -1, dtype=np.int64)
+    best = np.zeros(len(embeddings), dtype=np.float32)
+    if len(embeddings) == 0 or len(profiles) == 0:
+        return assignment, best
+    
+    similarity = embeddings @ profiles.T
+    candidates = np.flatnonzero(similarity >= threshold)
+    order = candidates[np.argsort(-similarity.flat[candidates], kind='stable')]
+    taken = set()
+    for flat_index in order.tolist():
+        speaker, profile = divmod(flat_index, similarity.shape[1])
+        if assignment[speaker] >= 0 or profile in taken:
+            continue
+        assignment[speaker] = profile
+        best[speaker] = similarity[speaker, profile]
+        taken.add(profile)
+    return assignment, best
+
+
+def recognize_speakers(embeddings: dict, space: str, update_profiles: bool = True) -> dict:
+    """
+    Map diarized speakers to known people in the speaker database.
+    
+    embeddings come from the model named by space (DIARIZATION_MODEL for
+    centroids, or EMBEDDING_MODEL for multitrack recordings) and are
+    matched against the profiles' embeddings from the same model;
+    profiles without one can't be matched.
+    
+    Matched profiles absorb the new embeddings as running means weighted by
+    their sample counts (unless update_profiles is False, e.g. when
+    re-rendering a recording that was already counted). Unmatched speakers
+    get new UNKNOWN_<date>_SPEAKER_<n> profiles that can be renamed later.
+    
+    Returns:
+        dict: {speaker_label: profile_name}
+    """
+    labels = sorted(embeddings)
+    if not labels:
+        return {}
+    new = l2_normalize(np.stack([embeddings[label] for label in labels]).astype(np.float32))
+    
+    mapping = {}
+    # Match and update under the lock so concurrent workers don't lose each other's changes
+    with update_speaker_database() as speaker_db:
+        names, profiles = stack_speaker_profiles(speaker_db, space)
+        assignment, similarity = match_speakers(new, profiles,
+                                                SPEAKER_SIMILARITY_THRESHOLDS[space])
+        unknown_prefix = f"UNKNOWN_{datetime.now().strftime('%Y%m%d')}_SPEAKER_"
+        next_unknown = 0
+        for i, label in enumerate(labels):
+            if assignment[i] >= 0:
+                name = names[assignment[i]]
+                profile = speaker_db[name]
+                if update_profiles:
+                    count = profile['samples'][space]
+                    profile['embeddings'][space] = (profile['embeddings'][space] * count
+                                                    + new[i]) / (count + 1)
+                    profile['samples'][space] = count + 1
+                    profile['sample_count'] = profile.get('sample_count', 1) + 1
+                print(f"  {label} -> {name} (similarity {similarity[i]:.2f})")
+            else:
+                while f"{unknown_prefix}{next_unknown}" in speaker_db:
+                    next_unknown += 1
+                name = f"{unknown_prefix}{next_unknown}"
+                speaker_db[name] = {'embeddings': {space: new[i]}, 'samples': {space: 1},
+                                    'description': '', 'sample_count': 1}
+                print(f"  {label} -> {name} (new speaker)")
+            mapping[label] = name
+    return mapping
+
+
+def generate_transcript_markdown(file_path: Path, transcript_text: str,
+                                  detected_language: str, duration: float,
+                                  model_used: str, has_diarization: bool) -> str:
+    """Generate markdown-formatted transcript document."""
+    date_str = datetime.now().strftime('%Y-%m-%d %H:%M')
+    duration_str = f"{duration/60:.1f} minutes" if duration else "Unknown"
+    
+    # Extract date from filename if present (e.g., 2024-12-02-meeting.m4a)
+    recording_date = "See filename"
+    name_parts = file_path.stem.split('-')
+    if len(name_parts) >= 3:
+        try:
+            # Check if first three parts look like a date
+            int(name_parts[0])
+            int(name_parts[1])
+            int(name_parts[2])
+            recording_date = f"{name_parts[0]}-{name_parts[1]}-{name_parts[2]}"
+        except ValueError:
+            pass
+    
+    md = f"""# Meeting Transcript: {file_path.stem}
+
+**Date**: {recording_date}
+**Duration**: {duration_str}
+**Participants**: {"See transcript" if has_diarization else "Speaker diarization not available"}
+**Audio file**: {file_path.name}
+
+---
+
+## Transcript
+
+{transcript_text}
+
+---
+
+## Metadata
+
+- **Transcribed**: {date_str}
+- **Model**: Whisper {model_used}
+- **Language**: {detected_language or "auto-detected"}
+- **Speaker diarization**: {"Yes" if has_diarization else "No"}
+
+## Next Steps
+
+Run `/summarize_meeting {file_path.stem}.md` to:
+- Extract action items
+- Identify key decisions
+- Create tasks and issues
+
+---
+
+*Raw transcript - not yet summarized*
+"""
+    return md
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_audio_file(file_path: Path) -> str:
+    """
+    SHA-256 of the file contents.
+    
+    Hashes are remembered per (path, size, mtime) so re-processing an
+    unchanged recording doesn't re-read it.
+    """
+    stat = file_path.stat()
+    index_path = CACHE_DIR / 'file_hashes.json'
+    key = str(file_path.resolve())
+    known = _read_json_index(index_path).get(key)
+    if known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return known[2]
+    
+    audio_hash = _file_sha256(file_path)
+    _update_json_index(index_path, key, [stat.st_size, stat.st_mtime_ns, audio_hash])
+    return audio_hash
+
+
+def _cache_key(**fields) -> str:
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def transcript_cache_key(audio_hash: str, model_size: str, language: str,
+                         compute_type: str, batch_size: int = None,
+                         cascade_model: str = None) -> str:
+    """
+    Cache key for Whisper output: audio content plus everything that affects decoding.
+    
+    The device and compute type are the ones the model would be loaded
+    with (resolve_whisper_settings), so an 'auto' run reuses only output
+    decoded at the precision it would use itself, and retuning starts afresh.
+    """
+    device, compute_type, _ = resolve_whisper_settings(model_size, compute_type)
+    fields = dict(stage='asr', audio=audio_hash, model=model_size or DEFAULT_MODEL,
+                  language=language, device=device, compute_type=compute_type,
+                  decode=ASR_DECODE_OPTIONS, vad=[VAD_PARAMETERS, VAD_BLOCK_SECONDS])
+    if batch_size:
+        # Batched decoding chunks audio differently, so results differ slightly
+        fields['batch_size'] = batch_size
+    if cascade_model:
+        fields['cascade'] = dict(model=cascade_model, thresholds=CASCADE_THRESHOLDS)
+    return _cache_key(**fields)
+
+
+def speech_cache_key(audio_hash: str) -> str:
+    """Cache key for the speech regions found by detect_speech."""
+    return _cache_key(stage='vad', audio=audio_hash, vad=VAD_PARAMETERS,
+                      block=VAD_BLOCK_SECONDS)
+
+
+def diarization_cache_key(audio_hash: str, window_seconds: float = None,
+                          multitrack: bool = False) -> str:
+    """Cache key for diarization turns."""
+    fields = dict(stage='diarization', audio=audio_hash, model=DIARIZATION_MODEL,
+                  vad=[VAD_PARAMETERS, VAD_BLOCK_SECONDS])
+    if window_seconds:
+        # Long recordings are windowed, which changes the result
+        fields['window'] = [window_seconds, DIARIZATION_WINDOW_OVERLAP,
+                            DIARIZATION_STITCH_THRESHOLD]
+    if multitrack:
+        fields['multitrack'] = [MULTITRACK_FRAME_SECONDS, MULTITRACK_DOMINANCE_DB,
+                                MULTITRACK_MAX_SHARED, VAD_PARAMETERS]
+    return _cache_key(**fields)
+
+
+def _pack_strings(strings: list) -> tuple:
+    """Pack strings into one UTF-8 byte array plus end offsets."""
+    encoded = [text.encode('utf-8') for text in strings]
+    offsets = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list:
+    data = blob.tobytes()
+    starts = [0] + offsets[:-1].tolist()
+    return [data[a:b].decode('utf-8') for a, b in zip(starts, offsets.tolist())]
+
+
+def _cache_write(key: str, arrays: dict):
+    """Store arrays under key as a compressed .npz, then enforce the size limit."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    try:
+        _ensure_cache_dir()
+        _atomic_write_bytes(CACHE_DIR / f"{key}.npz", buffer.getvalue())
+        evict_cache()
+    except OSError as e:
+        print(f"  Warning: Failed to write cache: {e}")
+
+
+def _cache_read(key: str) -> dict:
+    """Load a cache entry's arrays, or None on a miss."""
+    path = CACHE_DIR / f"{key}.npz"
+    try:
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        os.utime(path)  # eviction is least-recently-used
+        return arrays
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def evict_cache(max_bytes: int = None):
+    """Delete least-recently-used cache entries until the cache fits in max_bytes."""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for path in CACHE_DIR.glob('*.npz'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+def save_cached_transcript(key: str, transcript_segments: list, detected_language: str,
+                           duration: float, words: WordColumns):
+    """Cache the raw Whisper segments and word timings."""
+    seg_text, seg_offsets = _pack_strings([seg[2] for seg in transcript_segments])
+    word_text, word_offsets = _pack_strings(words.text)
+    meta = json.dumps({'language': detected_language, 'duration': duration})
+    _cache_write(key, dict(
+        seg_start=np.array([seg[0] for seg in transcript_segments], dtype=np.float64),
+        seg_end=np.array([seg[1] for seg in transcript_segments], dtype=np.float64),
+        seg_text=seg_text, seg_offsets=seg_offsets,
+        word_start=words.start, word_end=words.end, word_segment=words.segment,
+        word_text=word_text, word_offsets=word_offsets,
+        meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8),
+    ))
+
+
+def load_cached_transcript(key: str) -> tuple:
+    """
+    Load cached Whisper output.
+    
+    Returns:
+        tuple: (segments_list, detected_language, duration, words) as returned
+        by transcribe_audio, or None on a cache miss
+    """
+    data = _cache_read(key)
+    if data is None:
+        return None
+    meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+    texts = _unpack_strings(data['seg_text'], data['seg_offsets'])
+    transcript_segments = list(zip(data['seg_start'].tolist(), data['seg_end'].tolist(), texts))
+    words = WordColumns(data['word_start'], data['word_end'],
+                        _unpack_strings(data['word_text'], data['word_offsets']),
+                        data['word_segment'])
+    return transcript_segments, meta['language'], meta['duration'], words
+
+
+def save_cached_speech(key: str, speech_regions: np.ndarray):
+    """Cache speech regions."""
+    _cache_write(key, dict(regions=speech_regions))
+
+
+def load_cached_speech(key: str) -> np.ndarray:
+    """Load cached speech regions as an array of (start, end) rows, or None."""
+    data = _cache_read(key)
+    return None if data is None else data['regions']
+
+
+def save_cached_diarization(key: str, diarization_segments: list):
+    """Cache diarization turns."""
+    turns = TurnColumns.from_segments(diarization_segments)
+    labels, label_offsets = _pack_strings(turns.labels)
+    _cache_write(key, dict(turn_start=turns.start, turn_end=turns.end,
+                           turn_speaker=turns.speaker,
+                           labels=labels, label_offsets=label_offsets))
+
+
+def load_cached_diarization(key: str) -> list:
+    """Load cached diarization turns as [(start_time, end_time, speaker_label), ...], or None."""
+    data = _cache_read(key)
+    if data is None:
+        return None
+    labels = _unpack_strings(data['labels'], data['label_offsets'])
+    return [(start, end, labels[code]) for start, end, code in
+            zip(data['turn_start'].tolist(), data['turn_end'].tolist(),
+                data['turn_speaker'].tolist())]
+
+
+def embedding_cache_key(diarization_key: str, space: str) -> str:
+    """
+    Cache key for per-speaker recognition embeddings of a diarized recording.
+    
+    space is the model the embeddings come from: DIARIZATION_MODEL for the
+    pipeline's centroids, EMBEDDING_MODEL for extract_speaker_embeddings.
+    """
+    # Speaker labels and turns come from the diarization, so key on its result
+    if space == DIARIZATION_MODEL:
+        return _cache_key(stage='embeddings', diarization=diarization_key, model=space)
+    return _cache_key(stage='embeddings', diarization=diarization_key, model=space,
+                      seconds=SPEAKER_EMBEDDING_SECONDS, chunk=EMBEDDING_CHUNK_SECONDS)
+
+
+def save_cached_embeddings(key: str, embeddings: dict):
+    """Cache per-speaker embeddings."""
+    labels = sorted(embeddings)
+    packed, offsets = _pack_strings(labels)
+    _cache_write(key, dict(labels=packed, label_offsets=offsets,
+                           embeddings=np.stack([embeddings[label] for label in labels])))
+
+
+def load_cached_embeddings(key: str) -> dict:
+    """Load cached per-speaker embeddings as {speaker_label: embedding}, or None."""
+    data = _cache_read(key)
+    if data is None:
+        return None
+    labels = _unpack_strings(data['labels'], data['label_offsets'])
+    return dict(zip(labels, data['embeddings']))
+
+
+def _transcript_path(audio_file: Path) -> Path:
+    return MEETINGS_TRANSCRIPTS_DIR / audio_file.with_suffix('.md').name
+
+
+def _is_audio_file(path: Path) -> bool:
+    return path.suffix.lower() in AUDIO_EXTENSIONS and not path.name.startswith('.')
+
+
+def find_untranscribed_audio(directory: Path) -> list:
+    """Find audio files in directory that don't have matching .md transcripts."""
+    # One directory listing each, instead of a glob per extension and a stat per file
+    try:
+        transcripts = set(os.listdir(MEETINGS_TRANSCRIPTS_DIR))
+    except FileNotFoundError:
+        transcripts = set()
+    
+    untranscribed = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            path = Path(entry.path)
+            if (_is_audio_file(path) and entry.is_file()
+                    and path.with_suffix('.md').name not in transcripts):
+                untranscribed.append(path)
+    
+    return sorted(untranscribed)
+
+
+def needs_transcription(audio_file: Path) -> bool:
+    """True if the file has no transcript, or was modified after its transcript was written."""
+    try:
+        return audio_file.stat().st_mtime > _transcript_path(audio_file).stat().st_mtime
+    except FileNotFoundError:
+        return audio_file.exists()
+
+
+@contextlib.contextmanager
+def _write_transaction(conn: sqlite3.Connection):
+    """Write transaction on an autocommit connection; taken up front so writers queue."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def _job_worker_alive(worker: str) -> bool:
+    """True unless worker ("host:pid") is a process on this machine that has exited."""
+    host, _, pid = (worker or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # can't tell for other machines sharing the store
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+class JobStore:
+    """
+    SQLite record of every recording the batch driver has handled.
+    
+    Jobs are keyed by the audio's content hash, so a renamed or copied
+    recording is recognized as already transcribed. Each job records its
+    status (queued, running, done, failed), attempts, last error, per-stage
+    durations, priority and the recording's duration. Runs claim queued
+    jobs highest priority first and, within a priority, longest recording
+    first (so parallel workers finish together instead of waiting on one
+    long straggler), one at a time, so several processes (a batch, --watch,
+    the daemon) can share the queue, and --jobs can inspect it while they
+    work.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            audio_hash  TEXT PRIMARY KEY,
+            path        TEXT NOT NULL,
+            status      TEXT NOT NULL DEFAULT 'queued',
+            priority    INTEGER NOT NULL DEFAULT 0,
+            attempts    INTEGER NOT NULL DEFAULT 0,
+            last_error  TEXT,
+            stages      TEXT,
+            transcript  TEXT,
+            duration    REAL,
+            worker      TEXT,
+            created_at  TEXT NOT NULL,
+            updated_at  TEXT NOT NULL,
+            started_at  TEXT,
+            finished_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+    """
+    
+    def __init__(self, path: Path = None):
+        path = Path(path or JOBS_DB_FILE)
+        _ensure_cache_dir()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; claims open their own write transaction
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets --jobs read while a batch is writing
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._requeue_abandoned()
+    
+    def close(self):
+        self.conn.close()
+    
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+    
+    def _transaction(self):
+        return _write_transaction(self.conn)
+    
+    def _requeue_abandoned(self):
+        """Put jobs whose process died mid-run (crash, Ctrl-C) back in the queue."""
+        with self._transaction():
+            rows = self.conn.execute(
+                "SELECT audio_hash, worker FROM jobs WHERE status = 'running'").fetchall()
+            for row in rows:
+                if not _job_worker_alive(row['worker']):
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? "
+                        "WHERE audio_hash = ?", (self._now(), row['audio_hash']))
+    
+    def get(self, audio_hash: str) -> sqlite3.Row:
+        return self.conn.execute("SELECT * FROM jobs WHERE audio_hash = ?",
+                                 (audio_hash,)).fetchone()
+    
+    def enqueue(self, file_path: Path, priority: int = None, force: bool = False) -> str:
+        """
+        Queue a recording.
+        
+        Without force, recordings already transcribed under another name,
+        recordings that have failed MAX_JOB_ATTEMPTS times and recordings
+        another process is transcribing are skipped (with a note).
+        
+        Returns:
+            str: the job's audio hash, or None if it was skipped
+        """
+        audio_hash = hash_audio_file(file_path)
+        metadata = audio_metadata(file_path, audio_hash)
+        duration = metadata['duration'] if metadata else None
+        now = self._now()
+        with self._transaction():
+            job = self.get(audio_hash)
+            if job is None:
+                self.conn.execute(
+                    "INSERT INTO jobs (audio_hash, path, priority, duration, created_at, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (audio_hash, str(file_path), priority or 0, duration, now, now))
+                return audio_hash
+            
+            if job['status'] == 'running':
+                print(f"Skipping {file_path.name}: already being transcribed ({job['worker']})")
+                return None
+            if not force:
+                if (job['status'] == 'done' and job['transcript']
+                        and Path(job['transcript']).exists()):
+                    print(f"Skipping {file_path.name}: already transcribed as "
+                          f"{Path(job['transcript']).name}")
+                    return None
+                if job['status'] == 'failed' and job['attempts'] >= MAX_JOB_ATTEMPTS:
+                    print(f"Skipping {file_path.name}: failed {job['attempts']} times "
+                          f"({job['last_error']}); use --retry-failed")
+                    return None
+            
+            self.conn.execute(
+                "UPDATE jobs SET path = ?, status = 'queued', "
+                "priority = COALESCE(?, priority), duration = COALESCE(?, duration), "
+                "updated_at = ? WHERE audio_hash = ?",
+                (str(file_path), priority, duration, now, audio_hash))
+        return audio_hash
+    
+    def claim(self, hashes: list = None) -> sqlite3.Row:
+        """
+        Mark the next queued job (highest priority, then longest, then oldest) as running.
+        
+        Args:
+            hashes: only consider these jobs (default: the whole queue)
+        
+        Returns:
+            sqlite3.Row: the claimed job, or None if the queue is empty
+        """
+        query = "SELECT * FROM jobs WHERE status = 'queued'"
+        params = []
+        if hashes is not None:
+            if not hashes:
+                return None
+            query += f" AND audio_hash IN ({', '.join('?' * len(hashes))})"
+            params.extend(hashes)
+        query += " ORDER BY priority DESC, duration DESC, created_at LIMIT 1"
+        
+        while True:
+            now = self._now()
+            with self._transaction():
+                job = self.conn.execute(query, params).fetchone()
+                if job is None:
+                    return None
+                if not Path(job['path']).exists():
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = ? "
+                        "WHERE audio_hash = ?",
+                        ("audio file no longer exists", now, job['audio_hash']))
+                    continue
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    "worker = ?, started_at = ?, finished_at = NULL, updated_at = ? "
+                    "WHERE audio_hash = ?",
+                    (self.worker, now, now, job['audio_hash']))
+            return self.get(job['audio_hash'])
+    
+    def finish(self, audio_hash: str, success: bool, stats: dict):
+        """Record the outcome of a claimed job; stats is what process_file filled in."""
+        now = self._now()
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, last_error = ?, stages = ?, "
+            "transcript = COALESCE(?, transcript), worker = NULL, finished_at = ?, "
+            "updated_at = ? WHERE audio_hash = ?",
+            ('done' if success else 'failed',
+             None if success else stats.get('error', 'unknown error'),
+             json.dumps({k: round(v, 2) for k, v in stats.get('stages', {}).items()}),
+             stats.get('transcript'), now, now, audio_hash))
+    
+    def release(self, audio_hash: str):
+        """
+        Put a claimed job back in the queue without counting the attempt,
+        when the run couldn't start (a model failed to load).
+        """
+        self.conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), worker = NULL, "
+            "started_at = NULL, updated_at = ? WHERE audio_hash = ?",
+            (self._now(), audio_hash))
+    
+    def jobs(self, status: str = None) -> list:
+        """Jobs in the order they would run (optionally only those with status)."""
+        query = "SELECT * FROM jobs"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY priority DESC, duration DESC, created_at"
+        return self.conn.execute(query, params).fetchall()
+    
+    def remaining(self, hashes: list = None) -> list:
+        """
+        Queued and running jobs (optionally only these) as (duration, started_at).
+        
+        duration is None where the recording couldn't be probed; started_at
+        is None for queued jobs.
+        """
+        rows = self.conn.execute(
+            "SELECT audio_hash, status, duration, started_at FROM jobs "
+            "WHERE status IN ('queued', 'running')").fetchall()
+        return [(row['duration'], row['started_at'] if row['status'] == 'running' else None)
+                for row in rows if hashes is None or row['audio_hash'] in hashes]
+    
+    def find(self, name: str) -> list:
+        """Jobs whose audio file name, path or hash prefix matches name."""
+        return [job for job in self.jobs()
+                if name in (job['path'], Path(job['path']).name)
+                or (len(name) >= 6 and job['audio_hash'].startswith(name))]
+    
+    def set_priority(self, audio_hash: str, priority: int):
+        self.conn.execute("UPDATE jobs SET priority = ?, updated_at = ? WHERE audio_hash = ?",
+                          (priority, self._now(), audio_hash))
+    
+    def retry_failed(self) -> int:
+        """Queue every failed job again with a fresh attempt count. Returns how many."""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, updated_at = ? "
+            "WHERE status = 'failed'", (self._now(),))
+        return cursor.rowcount
+
+
+def parse_transcript_markdown(text: str) -> tuple:
+    """
+    Read the passages back out of a transcript written by process_file.
+    
+    Each paragraph of the Transcript section is one passage: its
+    [HH:MM:SS] anchor, the speaker label if diarized, and the text. Edits
+    made by hand (corrected words, renamed speakers) are kept.
+    
+    Returns:
+        tuple: (recording_date or None, [(start_seconds, speaker, text), ...])
+    """
+    date = re.search(r'^\*\*Date\*\*: (\d{4}-\d{2}-\d{2})', text, re.MULTILINE)
+    section = re.search(r'^## Transcript\s*$(.*?)(?:^---\s*$|\Z)', text,
+                        re.MULTILINE | re.DOTALL)
+    passages = []
+    for paragraph in re.split(r'\n\s*\n', section.group(1) if section else ''):
+        match = re.match(r'\s*\[(\d+):(\d{2}):(\d{2})\] (?:\[([^\]\n]+)\]:\s*)?(.*)',
+                         paragraph, re.DOTALL)
+        if match is None:
+            continue
+        hours, minutes, seconds, speaker, body = match.groups()
+        body = ' '.join(body.split())
+        if body:
+            passages.append((int(hours) * 3600 + int(minutes) * 60 + int(seconds),
+                             speaker, body))
+    return (date.group(1) if date else None), passages
+
+
+class TranscriptIndex:
+    """
+    SQLite FTS5 index of transcript passages, for --search.
+    
+    One row per passage (a speaker's paragraph, or a Whisper segment
+    without diarization) with its recording, start time and speaker.
+    process_file indexes each transcript as it writes it; refresh()
+    re-reads only transcripts whose size or modification time changed
+    (hand edits, appended summaries) and drops deleted ones.
+    
+    A --stream transcript (<name>.live.md) is left out once the
+    recording's own <name>.md exists, so its passages aren't found twice.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id         INTEGER PRIMARY KEY,
+            path       TEXT UNIQUE NOT NULL,
+            recording  TEXT NOT NULL,
+            date       TEXT,
+            mtime      REAL NOT NULL,
+            size       INTEGER NOT NULL,
+            indexed_at TEXT NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+            text, speaker, document UNINDEXED, start UNINDEXED,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        );
+    """
+    
+    def __init__(self, path: Path = None):
+        path = Path(path or TRANSCRIPT_INDEX_FILE)
+        _ensure_cache_dir()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+    
+    def close(self):
+        self.conn.close()
+    
+    def _remove(self, document_id: int):
+        self.conn.execute("DELETE FROM passages WHERE document = ?", (document_id,))
+        self.conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+    
+    @staticmethod
+    def _superseded(path: Path) -> bool:
+        """Whether path is a --stream transcript whose final transcript exists."""
+        return (path.name.endswith('.live.md')
+                and path.with_name(path.name[:-len('.live.md')] + '.md').exists())
+    
+    def add(self, path: Path) -> int:
+        """
+        (Re)index one transcript. Returns the number of passages.
+        
+        Indexing <name>.md drops <name>.live.md from the index, and a
+        superseded .live.md is not indexed.
+        """
+        path = Path(path).absolute()
+        superseded = self._superseded(path)
+        if not superseded:
+            stat = path.stat()
+            date, passages = parse_transcript_markdown(path.read_text(encoding='utf-8'))
+        with _write_transaction(self.conn):
+            for stale in (path, path.with_name(f"{path.stem}.live.md")):
+                row = self.conn.execute("SELECT id FROM documents WHERE path = ?",
+                                        (str(stale),)).fetchone()
+                if row is not None:
+                    self._remove(row['id'])
+            if superseded:
+                return 0
+            document_id = self.conn.execute(
+                "INSERT INTO documents (path, recording, date, mtime, size, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(path), path.stem, date, stat.st_mtime, stat.st_size,
+                 datetime.now().isoformat(timespec='seconds'))).lastrowid
+            self.conn.executemany(
+                "INSERT INTO passages (text, speaker, document, start) VALUES (?, ?, ?, ?)",
+                [(body, speaker, document_id, start) for start, speaker, body in passages])
+        return len(passages)
+    
+    def refresh(self, directory: Path) -> tuple:
+        """
+        Bring the index up to date with the transcripts in directory.
+        
+        Returns:
+            tuple: (updated, removed) transcript counts
+        """
+        known = {row['path']: row for row in
+                 self.conn.execute("SELECT id, path, mtime, size FROM documents")}
+        updated = 0
+        for path in sorted(Path(directory).absolute().glob('*.md')):
+            if self._superseded(path):
+                continue  # left in known, so it's removed below
+            row = known.pop(str(path), None)
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if row is not None and row['mtime'] == stat.st_mtime and row['size'] == stat.st_size:
+                continue
+            self.add(path)
+            updated += 1
+        
+        # Whatever is left no longer exists in the directory (or is superseded)
+        removed = 0
+        directory = str(Path(directory).absolute())
+        with _write_transaction(self.conn):
+            for path, row in known.items():
+                if str(Path(path).parent) == directory:
+                    self._remove(row['id'])
+                    removed += 1
+        return updated, removed
+    
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Passages matching an FTS5 query, best first (BM25).
+        
+        Plain words that aren't valid FTS5 syntax (e.g. "state-of-the-art")
+        are searched as quoted terms instead.
+        
+        Returns:
+            list of rows with recording, date, path, start, speaker and a
+            snippet with the matches in **bold**
+        """
+        sql = """
+            SELECT documents.recording, documents.date, documents.path,
+                   passages.start, passages.speaker,
+                   snippet(passages, 0, '**', '**', '…', 16) AS snippet
+            FROM passages JOIN documents ON documents.id = passages.document
+            WHERE passages MATCH ?
+            ORDER BY bm25(passages, 1.0, 0.5)
+            LIMIT ?
+        """
+        try:
+            return self.conn.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            quoted = ' '.join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+            return self.conn.execute(sql, (quoted, limit)).fetchall()
+
+
+def _run_file(file_path: Path, options: dict) -> tuple:
+    """
+    Run process_file, turning crashes into a failed result.
+    
+    Also the worker entry point of process_batch. Adds the total wall time
+    and this process's peak memory to the stats. ModelLoadError is passed
+    on to the caller rather than recorded against the file.
+    
+    Returns:
+        tuple: (success, stats) as filled in by process_file
+    """
+    stats = {}
+    started = time.perf_counter()
+    try:
+        success = process_file(file_path, stats=stats, **options)
+    except ModelLoadError:
+        raise
+    except (Exception, SystemExit) as e:
+        stats['error'] = str(e) or type(e).__name__
+        success = False
+    stats['wall_seconds'] = time.perf_counter() - started
+    stats['peak_rss_mb'] = peak_rss_mb()
+    return success, stats
+
+
+def write_metrics(file_path: Path, success: bool, stats: dict, options: dict) -> dict:
+    """
+    Append one file's metrics to METRICS_FILE as a JSON line.
+    
+    Besides the stage times it records real-time factor (wall time / audio
+    time), decoded segments per second of ASR time and peak RSS. Peak RSS
+    is the process's high-water mark so far, which for a long-lived worker
+    or daemon covers earlier files too.
+    
+    Returns:
+        dict: the record written
+    """
+    stages = {name: round(seconds, 3) for name, seconds in stats.get('stages', {}).items()}
+    duration = stats.get('duration')
+    wall = stats.get('wall_seconds')
+    asr_seconds = stages.get('asr')
+    record = dict(
+        time=datetime.now().isoformat(timespec='seconds'),
+        host=socket.gethostname(),
+        file=str(file_path),
+        success=success,
+        error=stats.get('error'),
+        settings={k: v for k, v in options.items() if k != 'progress'},
+        audio_seconds=duration,
+        wall_seconds=round(wall, 3) if wall is not None else None,
+        rtf=round(wall / duration, 4) if duration and wall else None,
+        segments=stats.get('segments'),
+        words=stats.get('words'),
+        segments_per_second=(round(stats['segments'] / asr_seconds, 2)
+                             if asr_seconds and stats.get('segments') else None),
+        peak_rss_mb=round(stats['peak_rss_mb']) if stats.get('peak_rss_mb') else None,
+        cached=stats.get('cached', []),
+        stages=stages,
+    )
+    try:
+        METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(METRICS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    except OSError as e:
+        print(f"Warning: Failed to write metrics: {e}")
+    return record
+
+
+def print_profile(record: dict):
+    """Print a write_metrics record as a per-stage table."""
+    wall = record['wall_seconds'] or 0.0
+    summary = f"\nProfile: {Path(record['file']).name} took {wall:.1f}s"
+    if record['audio_seconds']:
+        summary += (f" for {format_timestamp(record['audio_seconds'])} of audio "
+                    f"(RTF {record['rtf']:.3f})")
+    print(summary)
+    details = []
+    if record['segments_per_second']:
+        details.append(f"{record['segments_per_second']:.1f} segments/s")
+    if record['peak_rss_mb']:
+        details.append(f"peak RSS {record['peak_rss_mb']} MB")
+    if record['cached']:
+        details.append(f"cached: {', '.join(record['cached'])}")
+    if details:
+        print(f"  {', '.join(details)}")
+    # Concurrent stages overlap, so shares can add up to more than 100%
+    for name, seconds in record['stages'].items():
+        share = f"{seconds / wall:>6.1%}" if wall else ""
+        print(f"  {name:<18} {seconds:>9.2f}s {share}")
+    print(f"  Metrics appended to {METRICS_FILE}")
+
+
+def run_job(store: JobStore, job: sqlite3.Row, options: dict,
+            profile: bool = False) -> tuple:
+    """
+    Transcribe a claimed job in this process and record the outcome.
+    
+    If the run is interrupted, the job stays marked as running and is
+    queued again by the next JobStore opened on this machine. With
+    profile, the run's metrics are written and printed. The run's speed
+    is recorded for batch ETAs (see print_batch_eta).
+    
+    Returns:
+        tuple: (success, stats)
+    
+    Raises:
+        ModelLoadError: the job is released back to the queue first
+    """
+    try:
+        success, stats = _run_file(Path(job['path']), options)
+    except ModelLoadError:
+        store.release(job['audio_hash'])
+        raise
+    store.finish(job['audio_hash'], success, stats)
+    if success:
+        record_job_throughput(job_throughput_key(options), stats)
+    if profile:
+        print_profile(write_metrics(Path(job['path']), success, stats, options))
+    return success, stats
+
+
+class _PollingWatcher:
+    """
+    Fallback change detection when watchdog isn't installed.
+    
+    Every poll lists the directory and stats its audio files; files that
+    are new or whose size or mtime changed since the last poll are
+    reported, so recordings rewritten in place (or replaced after a failed
+    run) are picked up again.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.signatures = self._scan()
+    
+    def _scan(self) -> dict:
+        signatures = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not _is_audio_file(Path(entry.name)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                signatures[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+    
+    def changes(self, timeout: float) -> set:
+        time.sleep(timeout)
+        signatures = self._scan()
+        changed = {name for name, signature in signatures.items()
+                   if self.signatures.get(name) != signature}
+        self.signatures = signatures
+        return {self.directory / name for name in changed}
+    
+    def stop(self):
+        pass
+
+
+class _WatchdogWatcher:
+    """Change notification through watchdog (inotify, FSEvents or ReadDirectoryChangesW)."""
+    
+    def __init__(self, directory: Path):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+        
+        self.changed = set()
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        watcher = self
+        
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                path = getattr(event, 'dest_path', None) or event.src_path
+                with watcher.lock:
+                    watcher.changed.add(Path(os.fsdecode(path)))
+                watcher.event.set()
+        
+        self.observer = Observer()
+        self.observer.schedule(Handler(), str(directory), recursive=False)
+        self.observer.start()
+    
+    def changes(self, timeout: float) -> set:
+        self.event.wait(timeout)
+        with self.lock:
+            changed, self.changed = self.changed, set()
+            self.event.clear()
+        return changed
+    
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+def watch_directory(directory: Path, options: dict, settle_seconds: float = 5.0,
+                    profile: bool = False) -> int:
+    """
+    Transcribe recordings as they appear in directory, until interrupted.
+    
+    New or modified audio files are picked up from change notifications
+    rather than by rescanning the directory. A file is only queued once its
+    size and mtime have stayed the same for settle_seconds, so recordings
+    still being written or copied are left alone. Each file goes through
+    the job store like a batch run, so --jobs shows what the watcher is
+    doing and renamed recordings are not transcribed twice.
+    
+    Args:
+        options: keyword arguments for process_file
+        profile: write and print per-stage metrics for each file
+    
+    Returns:
+        int: process exit code
+    """
+    try:
+        watcher = _WatchdogWatcher(directory)
+        backend = "file system notifications"
+    except ImportError:
+        watcher = _PollingWatcher(directory)
+        backend = "directory polling (pip install watchdog for instant notifications)"
+    
+    print(f"Watching {directory} for new recordings using {backend}")
+    print("Press Ctrl-C to stop.")
+    
+    store = JobStore()
+    
+    # path -> ((size, mtime), monotonic time it was first seen with that signature)
+    pending = {path: None for path in find_untranscribed_audio(directory)}
+    transcribed = 0
+    try:
+        while True:
+            for path in watcher.changes(timeout=1.0):
+                if _is_audio_file(path) and path not in pending and needs_transcription(path):
+                    pending[path] = None
+            
+            now = time.monotonic()
+            ready = []
+            for path, state in list(pending.items()):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    del pending[path]
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if state is None or state[0] != signature:
+                    pending[path] = (signature, now)
+                elif now - state[1] >= settle_seconds:
+                    ready.append(path)
+                    del pending[path]
+            
+            for path in sorted(ready):
+                audio_hash = store.enqueue(path)
+                job = store.claim([audio_hash]) if audio_hash else None
+                if job is not None and run_job(store, job, options, profile)[0]:
+                    transcribed += 1
+                print(f"\nWatching {directory}...")
+    except KeyboardInterrupt:
+        print(f"\nStopped watching. Transcribed {transcribed} file(s).")
+    except ModelLoadError:
+        print(f"\nStopped watching: the model can't be loaded. Transcribed {transcribed} file(s).")
+        return 1
+    finally:
+        watcher.stop()
+    return 0
+
+
+def _read_stream(source: str, chunks: queue.Queue):
+    """
+    Feed float32 sample blocks of a live source into chunks, then None.
+    
+    source is '-' for raw 16 kHz mono s16le PCM on stdin, or the path of a
+    recording that is still being written, which ffmpeg follows until it
+    has not grown for STREAM_END_TIMEOUT.
+    """
+    process = None
+    try:
+        if source == '-':
+            stream, dtype = sys.stdin.buffer, np.int16
+        else:
+            process = subprocess.Popen(
+                ['ffmpeg', '-nostdin', '-v', 'error', '-follow', '1',
+                 '-rw_timeout', str(int(STREAM_END_TIMEOUT * 1e6)), '-i', f'file:{source}',
+                 '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', '1', '-ar', str(SAMPLE_RATE),
+                 'pipe:1'],
+                stdout=subprocess.PIPE
+            )
+            stream, dtype = process.stdout, np.float32
+        itemsize = np.dtype(dtype).itemsize
+        leftover = b''
+        while True:
+            data = stream.read1(1 << 16)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % itemsize
+            leftover = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=dtype)
+            if dtype == np.int16:
+                samples = samples.astype(np.float32) / 32768
+            chunks.put(samples)
+    except FileNotFoundError:
+        print("Error: ffmpeg not found. Install it with: conda install ffmpeg")
+    finally:
+        if process is not None:
+            process.kill()
+            process.wait()
+        chunks.put(None)
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Whether two decodes produced the same word, ignoring case and punctuation."""
+    return re.sub(r'[^\w]', '', a.lower()) == re.sub(r'[^\w]', '', b.lower())
+
+
+def stream_transcribe(source: str, output_path: Path, model_size: str = None,
+                      language: str = None, compute_type: str = None,
+                      cpu_threads: int = None) -> int:
+    """
+    Transcribe a live recording while it is being made.
+    
+    Audio is decoded as it arrives. Whenever STREAM_MIN_CHUNK_SECONDS more
+    is available, Whisper decodes the rolling buffer again, prompted with
+    the final text that precedes it. A word becomes final once two
+    consecutive decodes agree on it (LocalAgreement); the rest is the
+    partial hypothesis, shown on the terminal and revised by the next
+    decode. Final words are grouped into lines at sentence ends and
+    pauses, and each line is appended to output_path immediately. The
+    buffer is cut back to the last written line once it is longer than
+    STREAM_BUFFER_SECONDS, so each decode costs about the same however
+    long the meeting runs, and the delay stays a few seconds as long as
+    the model keeps up with real time.
+    
+    When the source ends (or on Ctrl-C), the remaining hypothesis is taken
+    as final and the transcript is rewritten in the usual format.
+    
+    Returns:
+        int: process exit code
+    """
+    model_used = model_size or DEFAULT_MODEL
+    source_path = Path(output_path.stem) if source == '-' else Path(source)
+    try:
+        model = get_whisper_model(model_size, compute_type, cpu_threads)
+    except ModelLoadError:
+        return 1
+    chunks = queue.Queue()
+    threading.Thread(target=_read_stream, args=(source, chunks), daemon=True).start()
+    print(f"Streaming from {'stdin' if source == '-' else source} -> {output_path}")
+    print("Press Ctrl-C to stop.")
+    show_partial = sys.stderr.isatty()
+    
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0.0       # recording time of buffer[0]
+    committed = []     # final words: (start, end, text)
+    tentative = []     # words of the last decode that aren't final yet
+    line = []          # final words not yet written
+    lines = []
+    line_end = 0.0     # end of the last written line
+    finished = False
+    
+    def write_line():
+        nonlocal line_end
+        text = ''.join(word[2] for word in line).strip()
+        if text:
+            entry = f"[{format_timestamp(line[0][0])}] {text}"
+            if not lines:
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                header = generate_transcript_markdown(source_path, '', language, None,
+                                                      f"{model_used} (live)", False)
+                output_path.write_text(header[:header.index('## Transcript')] +
+                                       '## Transcript\n\n', encoding='utf-8')
+            lines.append(entry)
+            with open(output_path, 'a', encoding='utf-8') as f:
+                f.write(entry + '\n\n')
+            if show_partial:
+                sys.stderr.write('\r\033[K')
+            print(entry, flush=True)
+            line_end = line[-1][1]
+        line.clear()
+    
+    try:
+        while not finished:
+            # Wait for enough new audio, taking what has queued up (when
+            # catching up with a file, no more than fits Whisper's 30 s window)
+            pieces = []
+            new_samples = 0
+            limit = max(STREAM_MIN_CHUNK_SECONDS, 30.0 - audio_duration(buffer)) * SAMPLE_RATE
+            while (new_samples < STREAM_MIN_CHUNK_SECONDS * SAMPLE_RATE or not chunks.empty()) \
+                    and new_samples < limit:
+                chunk = chunks.get()
+                if chunk is None:
+                    finished = True
+                    break
+                pieces.append(chunk)
+                new_samples += len(chunk)
+            if pieces:
+                buffer = np.concatenate([buffer] + pieces)
+            if len(buffer) == 0:
+                continue
+            received = offset + audio_duration(buffer)
+            
+            prompt = ''.join(word[2] for word in committed if word[1] <= offset)[-200:]
+            segments, info = model.transcribe(buffer, language=language,
+                                              initial_prompt=prompt or None,
+                                              condition_on_previous_text=False,
+                                              **ASR_DECODE_OPTIONS)
+            words = [(offset + w.start, offset + w.end, w.word)
+                     for segment in segments for w in segment.words or []]
+            if language is None and words:
+                # Keep the language the meeting started in
+                language = info.language
+                print(f"  Detected language: {language}")
+            
+            # Drop what is already final: words before the last final one,
+            # and a repeat of its last few words at the start of the buffer
+            last_end = committed[-1][1] if committed else 0.0
+            words = [word for word in words if word[1] > last_end - 0.05]
+            for n in range(min(5, len(words), len(committed)), 0, -1):
+                if all(_same_word(a[2], b[2]) for a, b in zip(committed[-n:], words[:n])):
+                    words = words[n:]
+                    break
+            
+            if finished:
+                agreed = words
+            else:
+                agreed = []
+                for word, previous in zip(words, tentative):
+                    if not _same_word(word[2], previous[2]):
+                        break
+                    agreed.append(word)
+            tentative = words[len(agreed):]
+            
+            for word in agreed:
+                if line and word[0] - line[-1][1] > 2.0:
+                    write_line()
+                line.append(word)
+                committed.append(word)
+                if word[2].rstrip().endswith(('.', '?', '!', '。', '？', '！')) or len(line) >= 50:
+                    write_line()
+            
+            if show_partial and tentative:
+                lag = received - (committed[-1][1] if committed else offset)
+                partial = ''.join(word[2] for word in line + tentative).strip()
+                sys.stderr.write(f"\r\033[K  ({lag:.1f}s behind) …{partial[-100:]}")
+                sys.stderr.flush()
+            
+            # Cut the buffer back to the last written line (or, in a long
+            # sentence, the last final word; in silence, the newest audio)
+            if audio_duration(buffer) > STREAM_BUFFER_SECONDS:
+                cut = line_end
+                if cut <= offset and committed:
+                    cut = committed[-1][1]
+                if cut <= offset and audio_duration(buffer) > 2 * STREAM_BUFFER_SECONDS:
+                    cut = received - STREAM_BUFFER_SECONDS
+                if cut > offset:
+                    buffer = buffer[int((cut - offset) * SAMPLE_RATE):].copy()
+                    offset = cut
+        write_line()
+    except KeyboardInterrupt:
+        line.extend(tentative)
+        write_line()
+        received = offset + audio_duration(buffer)
+        print("\nStopped streaming.")
+    
+    if not lines:
+        print("No speech was transcribed.")
+        return 0 if committed or len(buffer) else 1
+    
+    # Rewrite the finished transcript with its duration and metadata
+    markdown = generate_transcript_markdown(source_path, '\n\n'.join(lines),
+                                            language, received, f"{model_used} (live)", False)
+    _atomic_write_bytes(output_path, markdown.encode('utf-8'))
+    print(f"\n✓ Transcript saved: {output_path} ({len(lines)} lines, "
+          f"{format_timestamp(received)} of audio)")
+    try:
+        index = TranscriptIndex()
+        index.add(output_path)
+        index.close()
+    except sqlite3.Error as e:
+        print(f"Warning: Failed to update the transcript search index: {e}")
+    return 0
+
+
+def process_file(file_path: Path, model_size: str = None, language: str = None,
+                 compute_type: str = None, enable_diarization: bool = True,
+                 enable_recognition: bool = True, concurrent: bool = False,
+                 asr_threads: int = None, use_cache: bool = True,
+                 batch_size: int = None, cascade_model: str = None,
+                 diarization_window: float = DIARIZATION_WINDOW_SECONDS,
+                 multitrack: bool = False, progress: bool = False,
+                 stats: dict = None, result: dict = None) -> bool:
+    """
+    Process a single audio file: transcribe and optionally diarize.
+    
+    Raw Whisper and diarization results are cached under CACHE_DIR, keyed by
+    the audio's content hash and the settings that affect them, so
+    re-rendering a transcript (or adding diarization later) skips inference.
+    Transcription is checkpointed segment by segment; an interrupted run
+    resumes where it stopped. With use_cache=False the cache and
+    checkpoints are neither read nor written.
+    
+    With concurrent=True, transcription and diarization run side by side on
+    the shared decode buffer. The cores are split between CTranslate2 and
+    torch (asr_threads for Whisper, the rest for diarization) so the two
+    don't oversubscribe the CPU.
+    
+    With cascade_model, model_size does a fast first pass and only the
+    segments it is unsure about are decoded again with cascade_model.
+    
+    When diarization is needed and diarization_window is set, the audio is
+    decoded to a memory-mapped spill file under CACHE_DIR instead of RAM,
+    and recordings longer than the window are diarized window by window.
+    
+    Both stages work from one shared VAD pass (detect_speech, cached): Whisper
+    decodes only the speech regions and diarization only hears them.
+    
+    With multitrack, a recording with several channels or audio streams
+    takes its speakers from the tracks (see diarize_tracks) and is
+    transcribed from their mix; neural diarization (which then runs on the
+    mix) is only needed if the tracks bleed into each other.
+    
+    If stats is given, it is filled with the wall time of each stage
+    (stats['stages'], seconds), the audio duration, segment and word counts,
+    which results came from the cache, the transcript path, and on failure
+    a short error message (stats['error']). progress shows a bar while
+    transcribing.
+    
+    If result is given, it receives the raw outputs behind the transcript:
+    'segments' [(start, end, text)], 'words' (WordColumns), 'turns'
+    [(start, end, label)] or None, 'speakers' {label: name} or None,
+    'language' and 'duration'.
+    
+    Returns True if successful, False otherwise. A model that can't be
+    loaded raises ModelLoadError instead, since no recording would fare
+    better.
+    """
+    stats = {} if stats is None else stats
+    stages = stats.setdefault('stages', {})
+    
+    print(f"\n{'='*60}")
+    print(f"Processing: {file_path.name}")
+    print('='*60)
+    
+    run_diarization = enable_diarization and (DIARIZATION_AVAILABLE or multitrack)
+    asr_result = None
+    diarization_segments = None
+    speaker_mapping = None
+    
+    # Without the cache nothing is looked up or resumed, so the keys aren't needed
+    audio_hash = asr_key = diarization_key = asr_checkpoint = None
+    if use_cache:
+        with _timed(stages, 'hash'):
+            audio_hash = hash_audio_file(file_path)
+        asr_key = transcript_cache_key(audio_hash, model_size, language, compute_type,
+                                       batch_size, cascade_model)
+        diarization_key = diarization_cache_key(audio_hash, diarization_window, multitrack)
+        asr_checkpoint = checkpoint_path(asr_key)
+    
+    # Reuse raw results from earlier runs on the same audio and settings
+    cached = stats.setdefault('cached', [])
+    if use_cache:
+        asr_result = load_cached_transcript(asr_key)
+        if asr_result is not None:
+            print("Using cached transcription")
+            cached.append('transcription')
+        if run_diarization:
+            diarization_segments = load_cached_diarization(diarization_key)
+            if diarization_segments is not None:
+                print("Using cached speaker diarization")
+                cached.append('diarization')
+    
+    need_asr = asr_result is None
+    need_diarization = run_diarization and diarization_segments is None
+    
+    audio = None
+    # Long recordings are decoded to a spill file when diarization is windowed
+    spill_dir = CACHE_DIR / 'pcm' if need_diarization and diarization_window else None
+    if spill_dir is not None:
+        _ensure_cache_dir()
+    if need_diarization and multitrack:
+        with _timed(stages, 'decode'):
+            tracks = decode_tracks(file_path, spill_dir)
+            if tracks is not None:
+                # Whisper (and the neural fallback) hear the mix, like a mono decode
+                audio = mix_tracks(tracks, spill_dir)
+        if tracks is None:
+            print("Not a multitrack recording; using neural diarization")
+        else:
+            print(f"Assigning speakers from {len(tracks)} tracks...")
+            with _timed(stages, 'diarization'):
+                diarization_segments = diarize_tracks(tracks)
+            del tracks
+            if diarization_segments is not None:
+                need_diarization = False
+                if use_cache:
+                    save_cached_diarization(diarization_key, diarization_segments)
+    
+    # Decode once; every stage below shares this buffer
+    if audio is None and (need_asr or need_diarization):
+        with _timed(stages, 'decode'):
+            audio = decode_audio(file_path, spill_dir)
+        if audio is None:
+            print(f"Error: Failed to decode {file_path.name}")
+            stats['error'] = "could not decode audio"
+            return False
+    
+    # One VAD pass serves both stages
+    speech_regions = None
+    centroids = {}  # speaker embeddings from the diarization pipeline, if it runs
+    if need_asr or need_diarization:
+        speech_key = speech_cache_key(audio_hash)
+        speech_regions = load_cached_speech(speech_key) if use_cache else None
+        if speech_regions is not None:
+            cached.append('vad')
+        else:
+            with _timed(stages, 'vad'):
+                speech_regions = detect_speech(audio)
+            if use_cache:
+                save_cached_speech(speech_key, speech_regions)
+        speech_seconds = float((speech_regions[:, 1] - speech_regions[:, 0]).sum())
+        print(f"Speech: {format_timestamp(speech_seconds)} of "
+              f"{format_timestamp(audio_duration(audio))} in {len(speech_regions)} regions")
+    
+    if concurrent and need_asr and need_diarization:
+        # The stages are independent until alignment, so run them side by side
+        if asr_threads:
+            diarization_threads = max(1, available_cpus() - asr_threads)
+        else:
+            asr_threads, diarization_threads = split_cpu_budget()
+        print(f"Running transcription ({asr_threads} threads) and "
+              f"diarization ({diarization_threads} threads) concurrently")
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            asr_future = executor.submit(
+                transcribe_audio, file_path, model_size, language, compute_type,
+                audio=audio, cpu_threads=asr_threads, checkpoint=asr_checkpoint,
+                batch_size=batch_size, cascade_model=cascade_model, stages=stages,
+                progress=progress, speech_regions=speech_regions
+            )
+            diarization_future = executor.submit(
+                perform_diarization, file_path, audio=audio,
+                num_threads=diarization_threads, stages=stages,
+                window_seconds=diarization_window, speech_regions=speech_regions,
+                embeddings=centroids
+            )
+            asr_result = asr_future.result()
+            diarization_segments = diarization_future.result()
+    else:
+        # Transcribe
+        if need_asr:
+            asr_result = transcribe_audio(
+                file_path, model_size, language, compute_type, audio=audio,
+                cpu_threads=asr_threads, checkpoint=asr_checkpoint,
+                batch_size=batch_size, cascade_model=cascade_model, stages=stages,
+                progress=progress, speech_regions=speech_regions
+            )
+        
+        # Optionally perform diarization
+        if need_diarization:
+            diarization_segments = perform_diarization(file_path, audio=audio,
+                                                       stages=stages,
+                                                       window_seconds=diarization_window,
+                                                       speech_regions=speech_regions,
+                                                       embeddings=centroids)
+    
+    transcript_segments, detected_language, duration, words = asr_result
+    if transcript_segments is None:
+        print(f"Error: Failed to transcribe {file_path.name}")
+        stats['error'] = "transcription failed"
+        return False
+    stats.update(duration=duration, segments=len(transcript_segments), words=len(words))
+    
+    if use_cache:
+        if need_asr:
+            save_cached_transcript(asr_key, transcript_segments, detected_language,
+                                   duration, words)
+        if need_diarization and diarization_segments is not None:
+            save_cached_diarization(diarization_key, diarization_segments)
+            if centroids:
+                save_cached_embeddings(embedding_cache_key(diarization_key, DIARIZATION_MODEL),
+                                       centroids)
+    
+    # Recognize known speakers
+    if diarization_segments and enable_recognition:
+        with _timed(stages, 'recognition'):
+            print("Recognizing speakers...")
+            # Centroids from a diarization run now are new; cached ones (like
+            # cached embeddings below) mean the recording was already counted
+            space = DIARIZATION_MODEL
+            fresh = bool(centroids)
+            embeddings = centroids
+            if not embeddings and use_cache:
+                embeddings = load_cached_embeddings(embedding_cache_key(diarization_key, space))
+            if not embeddings:
+                # Multitrack turns, or a diarization cached without its centroids
+                space = EMBEDDING_MODEL
+                embedding_key = embedding_cache_key(diarization_key, space)
+                embeddings = load_cached_embeddings(embedding_key) if use_cache else None
+                fresh = embeddings is None
+                if fresh:
+                    if audio is None:
+                        audio = decode_audio(file_path)
+                    if audio is not None:
+                        embeddings = extract_speaker_embeddings(audio, diarization_segments)
+                        if embeddings and use_cache:
+                            save_cached_embeddings(embedding_key, embeddings)
+            
+            if embeddings:
+                speaker_mapping = recognize_speakers(embeddings, space, update_profiles=fresh)
+                # Speakers too brief to embed keep a generic label
+                labels = sorted(set(seg[2] for seg in diarization_segments))
+                for i, label in enumerate(labels):
+                    speaker_mapping.setdefault(label, f"SPEAKER_{i+1}")
+    
+    if result is not None:
+        result.update(segments=transcript_segments, words=words, turns=diarization_segments,
+                      speakers=speaker_mapping, language=detected_language, duration=duration)
+    
+    # Combine transcript with diarization
+    with _timed(stages, 'alignment'):
+        transcript_text = combine_transcript_with_diarization(
+            transcript_segments, diarization_segments, speaker_mapping, words
+        )
+    
+    # Generate markdown document
+    model_used = model_size or DEFAULT_MODEL
+    if cascade_model:
+        model_used = f"{model_used}, weak segments re-decoded with {cascade_model}"
+    with _timed(stages, 'render'):
+        markdown = generate_transcript_markdown(
+            file_path, transcript_text, detected_language, duration,
+            model_used, diarization_segments is not None
+        )
+    
+    # Save transcript
+    # Transcripts go to .research/meetings/transcripts/ with the same stem as the audio
+    output_path = _transcript_path(file_path)
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with _timed(stages, 'write'), open(output_path, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        print(f"\n✓ Transcript saved: {output_path}")
+        stats['transcript'] = str(output_path)
+        try:
+            with _timed(stages, 'index'):
+                index = TranscriptIndex()
+                index.add(output_path)
+                index.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Failed to update the transcript search index: {e}")
+        # The transcript (and cache) now hold everything the checkpoint did
+        if asr_checkpoint is not None:
+            asr_checkpoint.unlink(missing_ok=True)
+        return True
+    except Exception as e:
+        print(f"Error: Failed to save transcript: {e}")
+        stats['error'] = f"could not save transcript: {e}"
+        return False
+
+
+def _init_batch_worker(model_size: str, compute_type: str, cpu_threads: int,
+                       enable_diarization: bool, cascade_model: str = None):
+    """Load models once per worker process; they stay resident for every file it handles."""
+    try:
+        get_whisper_model(model_size, compute_type, cpu_threads)
+        if cascade_model:
+            get_whisper_model(cascade_model, compute_type, cpu_threads)
+    except ModelLoadError:
+        pass  # raised again by the worker's first job, which stops the batch
+    if enable_diarization and DIARIZATION_AVAILABLE:
+        import torch
+        torch.set_num_threads(cpu_threads)
+        get_diarization_pipeline()
+
+
+def process_batch(store: JobStore, hashes: list, workers: int, model_size: str,
+                  language: str, compute_type: str, enable_diarization: bool,
+                  enable_recognition: bool, use_cache: bool = True,
+                  batch_size: int = None, cascade_model: str = None,
+                  diarization_window: float = DIARIZATION_WINDOW_SECONDS,
+                  multitrack: bool = False, profile: bool = False) -> tuple:
+    """
+    Transcribe queued jobs in parallel across a pool of worker processes.
+    
+    Cores are divided evenly so that workers x cpu_threads matches the
+    machine, and each worker keeps its models loaded between files. Jobs
+    are claimed from the store one at a time as workers free up, so
+    priority changes made while the batch runs take effect. With profile,
+    each file's metrics are written as it finishes. The batch's ETA is
+    printed at the start and after every file.
+    
+    Args:
+        hashes: jobs to run (None: everything queued in the store)
+    
+    Returns:
+        tuple: (success_count, failed) where failed is [(file_path, reason), ...]
+    
+    Raises:
+        ModelLoadError: once the jobs already running have finished; jobs
+        that hit it are queued again without using up an attempt
+    """
+    cpu_threads = max(1, available_cpus() // workers)
+    print(f"Starting {workers} workers ({cpu_threads} CPU threads each)...")
+    
+    options = dict(model_size=model_size, language=language,
+                   compute_type=compute_type,
+                   enable_diarization=enable_diarization,
+                   enable_recognition=enable_recognition,
+                   asr_threads=cpu_threads, use_cache=use_cache,
+                   batch_size=batch_size, cascade_model=cascade_model,
+                   diarization_window=diarization_window, multitrack=multitrack)
+    
+    eta_key = job_throughput_key(options, workers)
+    print_batch_eta(store, hashes, eta_key, workers)
+    
+    success_count = 0
+    failed = []
+    running = {}  # future -> job
+    model_error = None
+    # spawn avoids forking a parent whose torch/CTranslate2 thread pools exist
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_batch_worker,
+                                 initargs=(model_size, compute_type, cpu_threads,
+                                           enable_diarization, cascade_model)) as pool:
+            def submit_next() -> bool:
+                job = store.claim(hashes)
+                if job is None:
+                    return False
+                running[pool.submit(_run_file, Path(job['path']), options)] = job
+                return True
+            
+            for _ in range(workers):
+                if not submit_next():
+                    break
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        ok, stats = future.result()
+                    except ModelLoadError as e:
+                        # Every other job would fail the same way: stop claiming
+                        # and leave this one queued for the next run
+                        store.release(job['audio_hash'])
+                        if model_error is None:
+                            model_error = e
+                            print(f"Error: {e}; stopping the batch")
+                        continue
+                    store.finish(job['audio_hash'], ok, stats)
+                    if profile:
+                        print_profile(write_metrics(Path(job['path']), ok, stats, options))
+                    if ok:
+                        success_count += 1
+                        record_job_throughput(eta_key, stats)
+                    else:
+                        failed.append((Path(job['path']), stats.get('error', 'see log above')))
+                    if model_error is None:
+                        submit_next()
+                    if running:
+                        print_batch_eta(store, hashes, eta_key, workers)
+    except BrokenProcessPool:
+        print("Error: A transcription worker exited unexpectedly (model load failure?)")
+        for job in running.values():
+            store.finish(job['audio_hash'], False, {'error': "worker pool stopped"})
+            failed.append((Path(job['path']), "worker pool stopped"))
+    
+    if model_error is not None:
+        raise model_error
+    return success_count, failed
+
+
+def _run_engine_job(file_path: Path, options: dict) -> tuple:
+    """
+    Run one TranscriptionEngine job (in its executor) and structure the result.
+    
+    Returns:
+        tuple: (result, stats) with result None on failure
+    """
+    raw = {}
+    success, stats = _run_file(file_path, {**options, 'result': raw})
+    if not success:
+        return None, stats
+    
+    words = raw['words']
+    if len(words) == 0:
+        words = WordColumns.from_segments(raw['segments'])
+    word_speakers = [None] * len(words)
+    turns = []
+    if raw['turns']:
+        columns = TurnColumns.from_segments(raw['turns'])
+        mapping = raw['speakers'] or {label: f"SPEAKER_{i+1}"
+                                      for i, label in enumerate(columns.labels)}
+        names = [mapping.get(label, "UNKNOWN") for label in columns.labels]
+        word_speakers = [names[code] if code >= 0 else None
+                         for code in assign_word_speakers(words, columns).tolist()]
+        turns = [dict(start=start, end=end, speaker=mapping.get(label, "UNKNOWN"))
+                 for start, end, label in raw['turns']]
+    
+    return dict(
+        file=str(file_path),
+        transcript=stats.get('transcript'),
+        language=raw['language'],
+        duration=raw['duration'],
+        segments=[dict(start=start, end=end, text=text)
+                  for start, end, text in raw['segments']],
+        words=[dict(start=start, end=end, text=text.strip(), speaker=speaker)
+               for start, end, text, speaker in zip(words.start.tolist(), words.end.tolist(),
+                                                    words.text, word_speakers)],
+        turns=turns,
+        metrics=stats,
+    ), stats
+
+
+class TranscriptionEngine:
+    """
+    Importable asyncio front end to the transcription pipeline.
+    
+    Each recording goes through process_file, as on the command line: the
+    transcript is written, results are cached and the job is indexed. The
+    blocking work runs in an executor, so one event loop can drive many
+    recordings. With workers=1 (the default) jobs run one at a time in a
+    thread of this process and the models stay loaded between them; with
+    more, each worker is a process with its own models and a share of the
+    cores, as in process_batch. At most max_in_flight jobs are submitted at
+    once (default: workers); transcribe_many reads the next path only when
+    one of them finishes.
+    
+    Failures raise TranscriptionError (ModelLoadError when a model can't be
+    loaded) instead of exiting. Progress is printed to stdout.
+    
+        async with TranscriptionEngine(model_size='small', workers=2) as engine:
+            result = await engine.transcribe('meeting.m4a')
+            async for result in engine.transcribe_many(paths):
+                ...
+    
+    options are process_file's keyword arguments (model_size, language,
+    enable_diarization, ...).
+    """
+    
+    def __init__(self, workers: int = 1, max_in_flight: int = None, **options):
+        self.workers = max(1, workers)
+        self.max_in_flight = max(1, max_in_flight or self.workers)
+        self.options = dict(model_size=DEFAULT_MODEL, language=DEFAULT_LANGUAGE,
+                            compute_type=DEFAULT_COMPUTE_TYPE)
+        self.options.update(options)
+        self._slots = None  # created on the event loop by the first job
+        if self.workers == 1:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            cpu_threads = max(1, available_cpus() // self.workers)
+            self.options.setdefault('asr_threads', cpu_threads)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_batch_worker,
+                initargs=(self.options['model_size'], self.options['compute_type'], cpu_threads,
+                          self.options.get('enable_diarization', True),
+                          self.options.get('cascade_model')))
+    
+    async def transcribe(self, file_path) -> dict:
+        """
+        Transcribe one recording.
+        
+        Returns:
+            dict: 'file', 'transcript' (Markdown path), 'language',
+            'duration', 'segments' [{'start', 'end', 'text'}], 'words'
+            [{'start', 'end', 'text', 'speaker'}], 'turns' [{'start', 'end',
+            'speaker'}] (empty without diarization) and 'metrics' (the
+            stats process_file fills in, plus wall time and peak memory)
+        
+        Raises:
+            TranscriptionError: if the recording can't be transcribed
+        """
+        import asyncio
+        
+        file_path = Path(file_path).absolute()
+        if not file_path.is_file():
+            raise TranscriptionError(f"Path not found: {file_path}", file_path)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            try:
+                result, stats = await loop.run_in_executor(
+                    self._executor, _run_engine_job, file_path, self.options)
+            except ModelLoadError as e:
+                # From a worker process the error arrives without its file
+                raise ModelLoadError(str(e), file_path) from e
+            except BrokenProcessPool as e:
+                raise ModelLoadError("A transcription worker exited unexpectedly "
+                                     "(model load failure?)", file_path) from e
+        if result is None:
+            raise TranscriptionError(f"{file_path.name}: {stats.get('error', 'failed')}",
+                                     file_path, stats)
+        return result
+    
+    async def transcribe_many(self, file_paths, return_exceptions: bool = False):
+        """
+        Transcribe recordings concurrently, yielding results as they finish.
+        
+        file_paths may be an iterable or an async iterable; it is consumed
+        only as fast as jobs complete. Results come in completion order (see
+        their 'file'). A failure raises TranscriptionError and cancels the
+        jobs not yet started, unless return_exceptions is set, in which case
+        the error is yielded in place of the result.
+        """
+        import asyncio
+        
+        async def run(path):
+            try:
+                return await self.transcribe(path)
+            except TranscriptionError as e:
+                if return_exceptions:
+                    return e
+                raise
+        
+        if hasattr(file_paths, '__aiter__'):
+            paths = file_paths
+        else:
+            async def paths_of(iterable):
+                for path in iterable:
+                    yield path
+            paths = paths_of(file_paths)
+        
+        pending = set()
+        try:
+            async for path in paths:
+                if len(pending) >= self.max_in_flight:
+                    done, pending = await asyncio.wait(pending,
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.ensure_future(run(path)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def close(self):
+        """Shut down the executor (and its worker processes) after running jobs finish."""
+        self._executor.shutdown(wait=True)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        import asyncio
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+def list_speakers():
+    """List all speakers in the database."""
+    speaker_db = load_speaker_index()
+    
+    if not speaker_db:
+        print("No speakers in database.")
+        print("Process audio files with diarization to build speaker profiles.")
+        return
+    
+    print(f"\nSpeaker Database ({len(speaker_db)} profiles):")
+    print("-" * 60)
+    
+    named = [(n, p) for n, p in speaker_db.items() if not n.startswith('UNKNOWN_')]
+    unknown = [(n, p) for n, p in speaker_db.items() if n.startswith('UNKNOWN_')]
+    
+    for name, profile in sorted(named) + sorted(unknown):
+        samples = profile.get('sample_count', 1)
+        desc = profile.get('description', '')
+        print(f"  {name}")
+        print(f"    Samples: {samples}, Description: {desc[:50]}")
+    
+    if unknown:
+        print(f"\nTip: Rename unknown speakers with: --rename-speaker OLD_NAME NEW_NAME")
+
+
+def rename_speaker(old_name: str, new_name: str) -> bool:
+    """Rename a speaker in the database."""
+    with update_speaker_index() as profiles:
+        if old_name not in profiles:
+            print(f"Error: Speaker '{old_name}' not found.")
+            print(f"Available speakers: {', '.join(profiles.keys())}")
+            return False
+        
+        if new_name in profiles:
+            print(f"Error: Speaker '{new_name}' already exists. Use --merge-speakers to combine.")
+            return False
+        
+        profiles[new_name] = profiles.pop(old_name)
+        profiles[new_name]['description'] = f'Renamed from {old_name}'
+    print(f"Renamed '{old_name}' to '{new_name}'")
+    return True
+
+
+def delete_speaker(name: str) -> bool:
+    """Delete a speaker from the database."""
+    with update_speaker_index() as profiles:
+        if name not in profiles:
+            print(f"Error: Speaker '{name}' not found.")
+            return False
+        
+        del profiles[name]
+    print(f"Deleted speaker '{name}'")
+    return True
+
+
+def list_jobs(status: str = None):
+    """List transcription jobs in the order they run (optionally only one status)."""
+    jobs = JobStore().jobs(status)
+    
+    if not jobs:
+        print(f"No {status} jobs." if status else "No transcription jobs yet.")
+        return
+    
+    counts = {}
+    for job in jobs:
+        counts[job['status']] = counts.get(job['status'], 0) + 1
+    print(f"\nTranscription Jobs ({', '.join(f'{n} {s}' for s, n in counts.items())}):")
+    print("-" * 60)
+    
+    for job in jobs:
+        stages = json.loads(job['stages'] or '{}')
+        print(f"  {Path(job['path']).name}  [{job['audio_hash'][:8]}]")
+        line = f"    {job['status'].capitalize()}, priority {job['priority']}, attempts {job['attempts']}"
+        if job['duration']:
+            line += f", {format_timestamp(job['duration'])} of audio"
+        if job['status'] == 'running':
+            line += f", on {job['worker']} since {job['started_at']}"
+        elif stages:
+            line += f", took {format_timestamp(sum(stages.values()))}"
+        print(line + f", updated {job['updated_at']}")
+        if stages:
+            print("    Stages: " + ', '.join(f"{name} {seconds:.1f}s"
+                                           for name, seconds in stages.items()))
+        if job['status'] == 'failed' and job['last_error']:
+            print(f"    Error: {job['last_error']}")
+    
+    if counts.get('failed'):
+        print("\nTip: Queue failed jobs again with: --retry-failed")
+
+
+def set_job_priority(name: str, priority: int) -> bool:
+    """Change the priority of a job (by file name or hash prefix); higher runs first."""
+    store = JobStore()
+    matches = store.find(name)
+    if not matches:
+        print(f"Error: No job found for '{name}'.")
+        return False
+    if len(matches) > 1:
+        print(f"Error: '{name}' matches {len(matches)} jobs; use the hash shown by --jobs.")
+        return False
+    
+    job = matches[0]
+    store.set_priority(job['audio_hash'], priority)
+    print(f"Set priority of {Path(job['path']).name} to {priority}")
+    if job['status'] != 'queued':
+        print(f"(The job is {job['status']}; the priority applies when it is queued again)")
+    return True
+
+
+def search_transcripts(query: str, limit: int = 10) -> bool:
+    """Print the transcript passages best matching query, with [HH:MM:SS] anchors."""
+    index = TranscriptIndex()
+    index.refresh(MEETINGS_TRANSCRIPTS_DIR)
+    try:
+        results = index.search(query, limit)
+    except sqlite3.OperationalError as e:
+        print(f"Error: Invalid search query: {e}")
+        return False
+    
+    if not results:
+        print(f"No transcript passages match: {query}")
+        return True
+    
+    print(f"\nTop {len(results)} passages for: {query}")
+    print("-" * 60)
+    for row in results:
+        speaker = f" [{row['speaker']}]" if row['speaker'] else ""
+        date = f" ({row['date']})" if row['date'] else ""
+        print(f"{row['recording']}{date} [{format_timestamp(row['start'])}]{speaker}")
+        print(f"    {row['snippet']}")
+    print(f"\nTranscripts: {MEETINGS_TRANSCRIPTS_DIR}")
+    return True
 
-**Date**: {recording_date}
-**Duration**: {duration_str}
-**Participants**: {"See transcript" if has_diarization else "Speaker diarization not available"}
-**Audio file**: {file_path.name}
 
----
+def reindex_transcripts():
+    """Update the search index for transcripts added, edited or deleted since it was built."""
+    index = TranscriptIndex()
+    updated, removed = index.refresh(MEETINGS_TRANSCRIPTS_DIR)
+    total = index.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    print(f"Search index: {updated} transcript(s) updated, {removed} removed, "
+          f"{total} indexed")
 
-## Transcript
 
-{transcript_text}
+def _record_stored_model(name: str):
+    """Add a fetched model's file sizes and checksums to the store's manifest."""
+    directory = MODELS_DIR / name
+    files = {}
+    for path in sorted(directory.rglob('*')):
+        relative = path.relative_to(directory)
+        # The hub client keeps its download metadata in .cache/
+        if path.is_file() and not any(part.startswith('.') for part in relative.parts):
+            files[relative.as_posix()] = {'size': path.stat().st_size,
+                                          'sha256': _file_sha256(path)}
+    manifest = _load_model_manifest()
+    manifest['models'][name] = {'fetched': datetime.now().isoformat(timespec='seconds'),
+                                'files': files}
+    _atomic_write_bytes(MODEL_MANIFEST_FILE, json.dumps(manifest, indent=2).encode('utf-8'))
+    total = sum(entry['size'] for entry in files.values())
+    print(f"  {name}: {len(files)} files, {total / 1e6:.0f} MB")
 
----
 
-## Metadata
+def _fetch_pyannote_model(repo_id: str) -> Path:
+    """Download a pyannote model or pipeline into the store, with its checkpoint mappable."""
+    import zipfile
+    import torch
+    from huggingface_hub import snapshot_download
+    
+    directory = MODELS_DIR / repo_id
+    snapshot_download(repo_id, local_dir=str(directory), token=HF_TOKEN,
+                      allow_patterns=['config.yaml', 'pytorch_model.bin'])
+    checkpoint = directory / 'pytorch_model.bin'
+    if checkpoint.exists() and not zipfile.is_zipfile(checkpoint):
+        # Only torch's zip format can be memory-mapped (see _stored_torch_load)
+        torch.save(torch.load(checkpoint, map_location='cpu', weights_only=False), checkpoint)
+    return directory
 
-- **Transcribed**: {date_str}
-- **Model**: Whisper {model_used}
-- **Language**: {detected_language or "auto-detected"}
-- **Speaker diarization**: {"Yes" if has_diarization else "No"}
 
-## Next Steps
+def fetch_models(whisper_models: list) -> bool:
+    """
+    Download models into the local store for offline, memory-mapped loading.
+    
+    Whisper models are fetched in CTranslate2 format. If pyannote.audio is
+    installed and HF_TOKEN is set, the diarization pipeline, the models it
+    is built from and the separate speaker embedding model are fetched too.
+    Fetching again only downloads what changed on the hub.
+    
+    Returns:
+        bool: True if every model was fetched
+    """
+    if not MODELS_DIR.exists():
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        # Weights don't belong in the project's repository
+        (MODELS_DIR / '.gitignore').write_text('*\n')
+    
+    print(f"Fetching models into {MODELS_DIR}")
+    success = True
+    for model_size in whisper_models:
+        name = f"whisper/{model_size}"
+        try:
+            from faster_whisper.utils import download_model
+            print(f"Whisper model '{model_size}'...")
+            download_model(model_size, output_dir=str(MODELS_DIR / name))
+            _record_stored_model(name)
+        except Exception as e:
+            print(f"  Error: Failed to fetch {name}: {e}")
+            success = False
+    
+    if not DIARIZATION_AVAILABLE:
+        print("Skipping the diarization models: pyannote.audio is not installed")
+        return success
+    if HF_TOKEN is None:
+        print("Skipping the diarization models: HF_TOKEN is not set (see README)")
+        return success
+    
+    try:
+        import yaml
+        print("Diarization models...")
+        pipeline_dir = _fetch_pyannote_model(DIARIZATION_MODEL)
+        with open(pipeline_dir / 'config.yaml', 'r') as f:
+            params = yaml.safe_load(f)['pipeline'].get('params', {})
+        for repo_id in (params['segmentation'], params['embedding'], EMBEDDING_MODEL):
+            _fetch_pyannote_model(repo_id)
+            _record_stored_model(repo_id)
+        # Recorded last, so an interrupted fetch never leaves a pipeline without its parts
+        _record_stored_model(DIARIZATION_MODEL)
+    except Exception as e:
+        print(f"  Error: Failed to fetch the diarization models: {e}")
+        success = False
+    return success
 
-Run `/summarize_meeting {file_path.stem}.md` to:
-- Extract action items
-- Identify key decisions
-- Create tasks and issues
 
----
+def verify_models() -> bool:
+    """
+    Compare every file in the model store with the checksums recorded when it was fetched.
+    
+    Returns:
+        bool: True if all stored models are intact
+    """
+    models = _load_model_manifest()['models']
+    if not models:
+        print(f"No models in {MODELS_DIR}. Fetch them with --fetch-models.")
+        return True
+    
+    intact = True
+    for name, entry in sorted(models.items()):
+        problems = []
+        for relative, recorded in entry['files'].items():
+            path = MODELS_DIR / name / relative
+            if not path.is_file():
+                problems.append(f"{relative} missing")
+            elif _file_sha256(path) != recorded['sha256']:
+                problems.append(f"{relative} changed")
+        status = "OK" if not problems else "FAILED (" + ", ".join(problems) + ")"
+        print(f"  {name:<45} {status}")
+        intact = intact and not problems
+    if not intact:
+        print("\nRun --fetch-models again to repair the store.")
+    return intact
 
-*Raw transcript - not yet summarized*
-"""
-    return md
 
+def unload_models():
+    """Release every cached model."""
+    global _diarization_pipeline, _embedding_model
+    _whisper_models.clear()
+    _diarization_pipeline = None
+    _embedding_model = None
+    
+    import gc
+    gc.collect()
+    if 'torch' in sys.modules:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
 
-def find_untranscribed_audio(directory: Path) -> list:
-    """Find audio files in directory that don't have matching .md transcripts."""
-    audio_files = []
+
+def _send_message(conn: socket.socket, message: dict):
+    conn.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+
+class _ClientStream(io.TextIOBase):
+    """Text stream that forwards a job's printed output to the client that submitted it."""
     
-    for ext in AUDIO_EXTENSIONS:
-        audio_files.extend(directory.glob(f'*{ext}'))
-        audio_files.extend(directory.glob(f'*{ext.upper()}'))
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.connected = True
     
-    # Filter out files that already have transcripts
-    untranscribed = []
-    for audio_file in audio_files:
-        # Check if transcript exists in the transcripts directory
-        transcript_path = MEETINGS_TRANSCRIPTS_DIR / audio_file.with_suffix('.md').name
-        if not transcript_path.exists():
-            untranscribed.append(audio_file)
+    def writable(self):
+        return True
     
-    return sorted(untranscribed)
+    def write(self, text: str) -> int:
+        if text and self.connected:
+            try:
+                _send_message(self.conn, {'type': 'output', 'text': text})
+            except OSError:
+                # Client went away (e.g. Ctrl-C); finish the job anyway
+                self.connected = False
+        return len(text)
 
 
-def process_file(file_path: Path, model_size: str = None, language: str = None,
-                 compute_type: str = None, enable_diarization: bool = True,
-                 enable_recognition: bool = True) -> bool:
+def serve_daemon(idle_timeout: float = DAEMON_IDLE_TIMEOUT):
     """
-    Process a single audio file: transcribe and optionally diarize.
+    Serve transcription jobs on DAEMON_SOCKET until stopped.
     
-    Returns True if successful, False otherwise.
+    Jobs run one at a time on a single worker thread, so models loaded by
+    the lazy getters stay warm between jobs. Models are unloaded after
+    idle_timeout seconds without work and reloaded on demand.
     """
-    print(f"\n{'='*60}")
-    print(f"Processing: {file_path.name}")
-    print('='*60)
+    import socketserver
     
-    # Transcribe
-    transcript_segments, detected_language, duration = transcribe_audio(
-        file_path, model_size, language, compute_type
-    )
+    if not hasattr(socket, 'AF_UNIX'):
+        print("Error: Daemon mode needs Unix domain sockets, which this platform lacks.")
+        sys.exit(1)
     
-    if transcript_segments is None:
-        print(f"Error: Failed to transcribe {file_path.name}")
-        return False
+    if DAEMON_SOCKET.exists():
+        if _connect_daemon() is not None:
+            print(f"Error: A daemon is already listening on {DAEMON_SOCKET}")
+            sys.exit(1)
+        DAEMON_SOCKET.unlink()  # stale socket from a crashed daemon
     
-    # Optionally perform diarization
-    diarization_segments = None
-    speaker_mapping = None
+    jobs = queue.Queue()
+    busy = threading.Event()
     
-    if enable_diarization and DIARIZATION_AVAILABLE:
-        diarization_segments = perform_diarization(file_path)
-        
-        # TODO: Add speaker recognition if enabled
-        # For now, just use generic speaker labels
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline())
+            if request.get('command') == 'stop':
+                _send_message(self.connection, {'type': 'exit', 'code': 0})
+                threading.Thread(target=server.shutdown).start()
+                return
+            
+            ahead = jobs.qsize() + (1 if busy.is_set() else 0)
+            if ahead:
+                _send_message(self.connection, {
+                    'type': 'output', 'text': f"Queued behind {ahead} job(s)...\n"})
+            done = threading.Event()
+            jobs.put((request['args'], self.connection, done))
+            done.wait()
     
-    # Combine transcript with diarization
-    transcript_text = combine_transcript_with_diarization(
-        transcript_segments, diarization_segments, speaker_mapping
-    )
+    def run_jobs():
+        while True:
+            try:
+                job = jobs.get(timeout=idle_timeout)
+            except queue.Empty:
+                if _whisper_models or _diarization_pipeline or _embedding_model:
+                    print(f"Idle for {idle_timeout:.0f}s, unloading models")
+                    unload_models()
+                continue
+            if job is None:
+                return
+            
+            args, conn, done = job
+            busy.set()
+            print(f"[{datetime.now():%H:%M:%S}] Job: {args.get('input') or MEETINGS_AUDIO_DIR}")
+            stream = _ClientStream(conn)
+            with contextlib.redirect_stdout(stream), contextlib.redirect_stderr(stream):
+                try:
+                    exit_code = transcribe_files(argparse.Namespace(**args))
+                except SystemExit as e:
+                    exit_code = e.code if isinstance(e.code, int) else 1
+                except Exception:
+                    traceback.print_exc()
+                    exit_code = 1
+            try:
+                _send_message(conn, {'type': 'exit', 'code': exit_code})
+            except OSError:
+                pass
+            print(f"[{datetime.now():%H:%M:%S}] Job finished (exit code {exit_code})")
+            busy.clear()
+            done.set()
     
-    # Generate markdown document
-    model_used = model_size or DEFAULT_MODEL
-    markdown = generate_transcript_markdown(
-        file_path, transcript_text, detected_language, duration,
-        model_used, diarization_segments is not None
-    )
+    socketserver.ThreadingUnixStreamServer.daemon_threads = True
+    old_umask = os.umask(0o077)  # only this user may submit jobs
+    try:
+        server = socketserver.ThreadingUnixStreamServer(str(DAEMON_SOCKET), Handler)
+    finally:
+        os.umask(old_umask)
     
-    # Save transcript
-    # Transcripts go to .research/meetings/transcripts/ with the same stem as the audio
-    output_path = MEETINGS_TRANSCRIPTS_DIR / file_path.with_suffix('.md').name
+    worker = threading.Thread(target=run_jobs, daemon=True)
+    worker.start()
+    print(f"Transcription daemon listening on {DAEMON_SOCKET}")
+    print(f"  Models unload after {idle_timeout:.0f}s idle. Stop with: --stop-daemon")
     try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(markdown)
-        print(f"\n✓ Transcript saved: {output_path}")
-        return True
-    except Exception as e:
-        print(f"Error: Failed to save transcript: {e}")
-        return False
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        jobs.put(None)
+        try:
+            DAEMON_SOCKET.unlink()
+        except OSError:
+            pass
+        print("Daemon stopped")
 
 
-def list_speakers():
-    """List all speakers in the database."""
-    speaker_db = load_speaker_database()
+def _connect_daemon() -> socket.socket:
+    """Connect to the daemon, or return None if none is listening."""
+    if not hasattr(socket, 'AF_UNIX') or not DAEMON_SOCKET.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(DAEMON_SOCKET))
+    except OSError:
+        conn.close()
+        return None
+    return conn
+
+
+def submit_to_daemon(args: argparse.Namespace) -> int:
+    """
+    Run a job on the daemon, streaming its output here.
     
-    if not speaker_db:
-        print("No speakers in database.")
-        print("Process audio files with diarization to build speaker profiles.")
+    Returns:
+        int: the job's exit code, or None if no daemon is running
+    """
+    conn = _connect_daemon()
+    if conn is None:
+        return None
+    
+    with conn:
+        _send_message(conn, {'args': vars(args)})
+        try:
+            for line in conn.makefile('r', encoding='utf-8'):
+                message = json.loads(line)
+                if message['type'] == 'output':
+                    sys.stdout.write(message['text'])
+                    sys.stdout.flush()
+                elif message['type'] == 'exit':
+                    return message['code']
+        except KeyboardInterrupt:
+            print("\nDetached; the daemon will finish the job in the background.")
+            return 130
+    print("Error: Lost connection to the transcription daemon")
+    return 1
+
+
+def stop_daemon():
+    """Ask a running daemon to shut down."""
+    conn = _connect_daemon()
+    if conn is None:
+        print("No transcription daemon is running.")
         return
+    with conn:
+        _send_message(conn, {'command': 'stop'})
+        conn.makefile('r').readline()
+    print("Transcription daemon stopped.")
+
+
+def transcribe_files(args: argparse.Namespace) -> int:
+    """
+    Run a transcription job described by parsed command-line arguments.
     
-    print(f"\nSpeaker Database ({len(speaker_db)} profiles):")
-    print("-" * 60)
+    Used both by the CLI and by the daemon, which runs jobs submitted by
+    clients with the same arguments.
     
-    named = [(n, p) for n, p in speaker_db.items() if not n.startswith('UNKNOWN_')]
-    unknown = [(n, p) for n, p in speaker_db.items() if n.startswith('UNKNOWN_')]
+    Returns:
+        int: process exit code
+    """
+    # Determine input files
+    if args.input is None:
+        # Default to .research/meetings/audio/ directory
+        input_path = MEETINGS_AUDIO_DIR
+    else:
+        input_path = Path(args.input)
+        if not input_path.is_absolute():
+            input_path = Path.cwd() / input_path
     
-    for name, profile in sorted(named) + sorted(unknown):
-        samples = profile.get('sample_count', 1)
-        desc = profile.get('description', '')
-        print(f"  {name}")
-        print(f"    Samples: {samples}, Description: {desc[:50]}")
+    if not input_path.exists():
+        print(f"Error: Path not found: {input_path}")
+        return 1
     
-    if unknown:
-        print(f"\nTip: Rename unknown speakers with: --rename-speaker OLD_NAME NEW_NAME")
-
-
-def rename_speaker(old_name: str, new_name: str) -> bool:
-    """Rename a speaker in the database."""
-    speaker_db = load_speaker_database()
+    if input_path.is_file() and input_path.suffix.lower() not in AUDIO_EXTENSIONS:
+        print(f"Error: Not a supported audio file: {input_path}")
+        print(f"Supported formats: {', '.join(sorted(AUDIO_EXTENSIONS))}")
+        return 1
     
-    if old_name not in speaker_db:
-        print(f"Error: Speaker '{old_name}' not found.")
-        print(f"Available speakers: {', '.join(speaker_db.keys())}")
-        return False
+    # Queue the files in the job store, then run from the queue
+    store = JobStore()
+    if args.retry_failed:
+        print(f"Queued {store.retry_failed()} failed job(s) again")
     
-    if new_name in speaker_db:
-        print(f"Error: Speaker '{new_name}' already exists. Use --merge-speakers to combine.")
-        return False
+    if input_path.is_file():
+        # An explicitly named file always runs
+        audio_hash = store.enqueue(input_path, args.priority, force=True)
+        if audio_hash is None:
+            return 1
+        hashes = [audio_hash]
+        queued = [store.get(audio_hash)]
+    else:
+        # Directory - queue untranscribed audio, and run only those jobs:
+        # their files may have been queued by an earlier run (interrupted,
+        # retried), but other directories' queued jobs wait for their own run
+        hashes = [audio_hash for audio_hash in
+                  (store.enqueue(f, args.priority) for f in find_untranscribed_audio(input_path))
+                  if audio_hash is not None]
+        queued = [job for job in store.jobs('queued') if job['audio_hash'] in hashes]
+        
+        if not queued:
+            print(f"No untranscribed audio files found in: {input_path}")
+            print("(Audio files with existing .md transcripts are skipped)")
+            return 0
+        
+        print(f"Queued {len(queued)} audio file(s), longest first:")
+        for job in queued:
+            length = f" [{format_timestamp(job['duration'])}]" if job['duration'] else ""
+            priority = f" (priority {job['priority']})" if job['priority'] else ""
+            print(f"  - {Path(job['path']).name}{length}{priority}")
+        print()
     
-    speaker_db[new_name] = speaker_db.pop(old_name)
-    speaker_db[new_name]['description'] = f'Renamed from {old_name}'
-    save_speaker_database(speaker_db)
-    print(f"Renamed '{old_name}' to '{new_name}'")
-    return True
+    # Process files
+    model_size = args.model or DEFAULT_MODEL
+    language = args.language or DEFAULT_LANGUAGE
+    compute_type = args.compute_type or DEFAULT_COMPUTE_TYPE
+    enable_diarization = not args.no_diarization
+    enable_recognition = not args.no_recognition
+    concurrent = args.concurrent and enable_diarization
+    workers = max(1, min(args.workers, len(queued)))
+    if workers > 1:
+        # Cores are already divided between workers
+        concurrent = False
+    
+    # Print configuration
+    print("Configuration:")
+    print(f"  Model: {model_size}")
+    print(f"  Language: {language or 'auto-detect'}")
+    print(f"  Diarization: {'enabled' if enable_diarization else 'disabled'}")
+    if enable_diarization and args.multitrack:
+        print("  Multitrack: speakers taken from channels/tracks where possible")
+    if concurrent:
+        print("  Stages: transcription and diarization run concurrently")
+    if args.cascade:
+        print(f"  Cascade: weak segments re-decoded with {args.cascade}")
+    if args.batch_size:
+        print(f"  Batched decoding: {args.batch_size} chunks per batch")
+    if workers > 1:
+        print(f"  Workers: {workers}")
+    if enable_diarization and not DIARIZATION_AVAILABLE:
+        print("  (Note: pyannote.audio not installed, diarization unavailable"
+              f"{' except from tracks' if args.multitrack else ''})")
+    elif enable_diarization and not HF_TOKEN:
+        print("  (Note: HF_TOKEN not set, diarization unavailable)")
+    
+    # A model that can't load fails every file alike: stop, and keep the
+    # queue (and each job's attempts) for the next run
+    try:
+        if workers > 1:
+            success_count, failed = process_batch(
+                store, hashes, workers, model_size, language, compute_type,
+                enable_diarization, enable_recognition, use_cache=not args.no_cache,
+                batch_size=args.batch_size, cascade_model=args.cascade,
+                diarization_window=args.diarization_window,
+                multitrack=args.multitrack, profile=args.profile
+            )
+        else:
+            options = dict(model_size=model_size, language=language,
+                           compute_type=compute_type,
+                           enable_diarization=enable_diarization,
+                           enable_recognition=enable_recognition,
+                           concurrent=concurrent, asr_threads=args.asr_threads,
+                           use_cache=not args.no_cache, batch_size=args.batch_size,
+                           cascade_model=args.cascade,
+                           diarization_window=args.diarization_window,
+                           multitrack=args.multitrack, progress=sys.stderr.isatty())
+            success_count = 0
+            failed = []
+            eta_key = job_throughput_key(options)
+            while True:
+                job = store.claim(hashes)
+                if job is None:
+                    break
+                if len(queued) > 1:
+                    print_batch_eta(store, hashes, eta_key)
+                ok, stats = run_job(store, job, options, profile=args.profile)
+                if ok:
+                    success_count += 1
+                else:
+                    failed.append((Path(job['path']), stats.get('error', 'see log above')))
+    except ModelLoadError:
+        print("Stopped: no file can be transcribed until the model loads; "
+              "queued files are kept for the next run")
+        return 1
+    
+    print(f"\n{'='*60}")
+    print(f"Completed: {success_count}/{success_count + len(failed)} files transcribed successfully")
+    if failed:
+        print("Failed:")
+        for file_path, reason in failed:
+            print(f"  - {file_path.name}: {reason}")
+        print(f"(Failed files are retried on later runs, up to {MAX_JOB_ATTEMPTS} "
+              f"attempts; see --jobs)")
+    
+    if success_count > 0:
+        print("\nNext steps:")
+        print("  Run /summarize_meeting to extract action items from transcripts")
+    return 0
 
 
-def delete_speaker(name: str) -> bool:
-    """Delete a speaker from the database."""
-    speaker_db = load_speaker_database()
+def tune(args: argparse.Namespace) -> int:
+    """Run --tune with options from the command line."""
+    if args.tune:
+        clip = Path(args.tune)
+    else:
+        # Default reference: the newest recording
+        recordings = []
+        if MEETINGS_AUDIO_DIR.is_dir():
+            recordings = [p for p in MEETINGS_AUDIO_DIR.iterdir() if _is_audio_file(p)]
+        if not recordings:
+            print(f"Error: No recordings in {MEETINGS_AUDIO_DIR}; pass a reference clip: --tune CLIP")
+            return 1
+        clip = max(recordings, key=lambda p: p.stat().st_mtime)
+    if not clip.is_file():
+        print(f"Error: Path not found: {clip}")
+        return 1
     
-    if name not in speaker_db:
-        print(f"Error: Speaker '{name}' not found.")
-        return False
+    models = args.tune_models.split(',') if args.tune_models else [args.model or DEFAULT_MODEL]
+    best = tune_host(clip, models, args.language or DEFAULT_LANGUAGE, args.tune_seconds)
+    if best is None:
+        return 1
     
-    del speaker_db[name]
-    save_speaker_database(speaker_db)
-    print(f"Deleted speaker '{name}'")
-    return True
+    print(f"\nSaved to {HOST_PROFILE_FILE}; --compute-type auto (the default) now uses:")
+    for model_size, settings in best.items():
+        threads = f", {settings['cpu_threads']} threads" if settings['cpu_threads'] else ""
+        print(f"  {model_size}: {settings['device']} {settings['compute_type']}{threads} "
+              f"({1 / settings['rtf']:.1f}x real-time)")
+    return 0
+
+
+def stream(args: argparse.Namespace) -> int:
+    """Run --stream with options from the command line."""
+    if args.stream != '-' and not Path(args.stream).is_file():
+        print(f"Error: Path not found: {args.stream}")
+        return 1
+    if args.stream_output:
+        output_path = Path(args.stream_output)
+    elif args.stream == '-':
+        output_path = MEETINGS_TRANSCRIPTS_DIR / f"{datetime.now():%Y-%m-%d-%H%M}-live.md"
+    else:
+        # Next to where the finished recording's transcript will go
+        output_path = _transcript_path(Path(args.stream)).with_suffix('.live.md')
+    return stream_transcribe(args.stream, output_path, args.model or DEFAULT_MODEL,
+                             args.language or DEFAULT_LANGUAGE,
+                             args.compute_type or DEFAULT_COMPUTE_TYPE, args.asr_threads)
+
+
+def watch(args: argparse.Namespace) -> int:
+    """Run --watch mode with options from the command line."""
+    directory = Path(args.input) if args.input else MEETINGS_AUDIO_DIR
+    if not directory.is_dir():
+        print(f"Error: --watch needs a directory: {directory}")
+        return 1
+    options = dict(model_size=args.model or DEFAULT_MODEL,
+                   language=args.language or DEFAULT_LANGUAGE,
+                   compute_type=args.compute_type or DEFAULT_COMPUTE_TYPE,
+                   enable_diarization=not args.no_diarization,
+                   enable_recognition=not args.no_recognition,
+                   concurrent=args.concurrent and not args.no_diarization,
+                   asr_threads=args.asr_threads, use_cache=not args.no_cache,
+                   batch_size=args.batch_size, cascade_model=args.cascade,
+                   diarization_window=args.diarization_window,
+                   multitrack=args.multitrack, progress=sys.stderr.isatty())
+    return watch_directory(directory, options, args.settle, profile=args.profile)
 
 
 def main():
@@ -656,6 +4947,8 @@ Examples:
   %(prog)s --model large-v3 recording.m4a      # Use larger model for better accuracy
   %(prog)s --language ja recording.m4a         # Specify Japanese language
   %(prog)s --no-diarization recording.m4a      # Skip speaker identification
+  %(prog)s --model base --cascade large-v3 recording.m4a  # Large-model quality where base is unsure
+  %(prog)s --multitrack recording.wav          # One mic per channel: speakers from channels
 
 Model sizes (speed vs accuracy tradeoff):
   tiny   - Fastest, ~1GB RAM, good for quick drafts
@@ -679,6 +4972,11 @@ For 45 min audio on CPU: tiny ~15min, small ~1hr, large-v3 ~4-6hr
                         help=f'Whisper model size (default: {DEFAULT_MODEL})')
     parser.add_argument('--language', '-l', default=None,
                         help='Language code (e.g., en, ja, de). Default: auto-detect')
+    parser.add_argument('--cascade', default=None, metavar='MODEL',
+                        choices=['tiny', 'base', 'small', 'medium', 'large-v3', 'turbo'],
+                        help='Transcribe with --model first, then re-decode only the '
+                             'low-confidence segments with MODEL (e.g. --model tiny '
+                             '--cascade large-v3)')
     parser.add_argument('--compute-type', default=None,
                         choices=['auto', 'int8', 'float16', 'float32'],
                         help='Compute type for inference (default: auto)')
@@ -688,6 +4986,32 @@ For 45 min audio on CPU: tiny ~15min, small ~1hr, large-v3 ~4-6hr
                         help='Disable speaker diarization (faster)')
     parser.add_argument('--no-recognition', action='store_true',
                         help='Disable speaker recognition (still labels speakers)')
+    parser.add_argument('--diarization-window', type=float, default=DIARIZATION_WINDOW_SECONDS,
+                        metavar='SECONDS',
+                        help='Diarize recordings longer than this in windows to bound memory '
+                             f'(default: {DIARIZATION_WINDOW_SECONDS:.0f}; 0 = whole recording at once)')
+    parser.add_argument('--multitrack', action='store_true',
+                        help='Recordings have one mic or participant per channel/track: '
+                             'take speakers from the tracks and skip neural diarization '
+                             'unless they bleed into each other')
+    
+    # Performance options
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Run transcription and diarization at the same time')
+    parser.add_argument('--asr-threads', type=int, default=None, metavar='N',
+                        help='CPU threads for Whisper (with --concurrent, the rest go '
+                             'to diarization; default: half the cores)')
+    parser.add_argument('--workers', '-j', type=int, default=1, metavar='N',
+                        help='Transcribe a directory with N parallel worker processes')
+    parser.add_argument('--batch-size', type=int, default=None, metavar='N',
+                        help='Decode N speech chunks at once with batched inference '
+                             '(faster, especially for small/turbo models)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached transcription/diarization results')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print per-stage timings, real-time factor and peak memory '
+                             'for each file and append them as JSON lines to '
+                             '.research/logs/transcribe_metrics.jsonl')
     
     # Speaker database management
     parser.add_argument('--list-speakers', action='store_true',
@@ -697,6 +5021,80 @@ For 45 min audio on CPU: tiny ~15min, small ~1hr, large-v3 ~4-6hr
     parser.add_argument('--delete-speaker', metavar='NAME',
                         help='Delete a speaker from the database')
     
+    # Job queue
+    parser.add_argument('--jobs', nargs='?', const='', default=None, metavar='STATUS',
+                        choices=['', 'queued', 'running', 'done', 'failed'],
+                        help='Show transcription jobs (optionally only queued, running, '
+                             'done or failed)')
+    parser.add_argument('--priority', type=int, default=None, metavar='N',
+                        help='Priority for the files queued by this run (higher runs '
+                             'first; default: 0)')
+    parser.add_argument('--set-priority', nargs=2, metavar=('FILE', 'N'),
+                        help='Change the priority of a queued job (file name or hash)')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help=f'Queue failed jobs again, including those that failed '
+                             f'{MAX_JOB_ATTEMPTS} times')
+    
+    # Transcript search
+    parser.add_argument('--search', metavar='QUERY',
+                        help='Search all transcripts and show the best matching passages '
+                             '(FTS5 syntax: words, "exact phrase", OR, NOT, prefix*, '
+                             'speaker:name)')
+    parser.add_argument('--limit', type=int, default=10, metavar='N',
+                        help='Number of --search results (default: 10)')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Update the search index for transcripts added, edited or '
+                             'deleted outside this script')
+    
+    # Host tuning
+    parser.add_argument('--tune', nargs='?', const='', default=None, metavar='CLIP',
+                        help='Benchmark Whisper compute types and thread counts on this '
+                             'machine and save the fastest for --compute-type auto '
+                             '(default clip: the newest recording)')
+    parser.add_argument('--tune-models', default=None, metavar='MODEL[,MODEL]',
+                        help='Models to tune (default: --model)')
+    parser.add_argument('--tune-seconds', type=float, default=TUNE_CLIP_SECONDS, metavar='SECONDS',
+                        help=f'Audio used per --tune candidate (default: {TUNE_CLIP_SECONDS:.0f})')
+    
+    # Model store
+    parser.add_argument('--fetch-models', nargs='*', default=None, metavar='MODEL',
+                        help='Download Whisper MODELs (default: --model) and, with HF_TOKEN, '
+                             'the diarization models into .research/models/, from where '
+                             'they are loaded without network access')
+    parser.add_argument('--verify-models', action='store_true',
+                        help='Check the models in .research/models/ against their recorded '
+                             'SHA-256 sums')
+    
+    # Watch mode
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and transcribe new recordings as they appear '
+                             'in the directory')
+    parser.add_argument('--settle', type=float, default=5.0, metavar='SECONDS',
+                        help='With --watch, wait until a file has stopped changing for '
+                             'this long before transcribing it (default: 5)')
+    
+    # Live streaming
+    parser.add_argument('--stream', metavar='SOURCE',
+                        help='Transcribe a meeting while it is recorded: SOURCE is a recording '
+                             'that is still being written, or - for raw 16 kHz mono s16le PCM '
+                             'on stdin. Final lines are appended to the transcript as they '
+                             'are recognized')
+    parser.add_argument('--stream-output', metavar='FILE',
+                        help='Transcript file for --stream (default: <name>.live.md in '
+                             '.research/meetings/transcripts/)')
+    
+    # Daemon
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run a local daemon that keeps models loaded; later '
+                             'invocations submit their jobs to it')
+    parser.add_argument('--idle-timeout', type=float, default=DAEMON_IDLE_TIMEOUT, metavar='SECONDS',
+                        help=f'Unload daemon models after this long without jobs '
+                             f'(default: {DAEMON_IDLE_TIMEOUT:.0f})')
+    parser.add_argument('--stop-daemon', action='store_true',
+                        help='Stop a running daemon')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Transcribe in this process even if a daemon is running')
+    
     args = parser.parse_args()
     
     # Handle speaker database commands
@@ -712,69 +5110,79 @@ For 45 min audio on CPU: tiny ~15min, small ~1hr, large-v3 ~4-6hr
         delete_speaker(args.delete_speaker)
         return
     
-    # Determine input files
-    if args.input is None:
-        # Default to .research/meetings/audio/ directory
-        input_path = MEETINGS_AUDIO_DIR
-    else:
-        input_path = Path(args.input)
-        if not input_path.is_absolute():
-            input_path = Path.cwd() / input_path
+    # Handle job queue commands
+    if args.jobs is not None:
+        list_jobs(args.jobs or None)
+        return
     
-    if not input_path.exists():
-        print(f"Error: Path not found: {input_path}")
-        sys.exit(1)
+    if args.set_priority:
+        name, priority = args.set_priority
+        try:
+            priority = int(priority)
+        except ValueError:
+            parser.error(f"--set-priority: N must be an integer, got '{priority}'")
+        if not set_job_priority(name, priority):
+            sys.exit(1)
+        return
     
-    # Collect files to process
-    if input_path.is_file():
-        if input_path.suffix.lower() not in AUDIO_EXTENSIONS:
-            print(f"Error: Not a supported audio file: {input_path}")
-            print(f"Supported formats: {', '.join(sorted(AUDIO_EXTENSIONS))}")
+    # Handle transcript search
+    if args.search is not None:
+        if not search_transcripts(args.search, args.limit):
             sys.exit(1)
-        files_to_process = [input_path]
-    else:
-        # Directory - find untranscribed audio
-        files_to_process = find_untranscribed_audio(input_path)
-        
-        if not files_to_process:
-            print(f"No untranscribed audio files found in: {input_path}")
-            print("(Audio files with existing .md transcripts are skipped)")
-            return
-        
-        print(f"Found {len(files_to_process)} untranscribed audio file(s):")
-        for f in files_to_process:
-            print(f"  - {f.name}")
-        print()
+        return
     
-    # Process files
-    model_size = args.model or DEFAULT_MODEL
-    language = args.language or DEFAULT_LANGUAGE
-    compute_type = args.compute_type or DEFAULT_COMPUTE_TYPE
-    enable_diarization = not args.no_diarization
-    enable_recognition = not args.no_recognition
+    if args.reindex:
+        reindex_transcripts()
+        return
     
-    # Print configuration
-    print("Configuration:")
-    print(f"  Model: {model_size}")
-    print(f"  Language: {language or 'auto-detect'}")
-    print(f"  Diarization: {'enabled' if enable_diarization else 'disabled'}")
-    if enable_diarization and not DIARIZATION_AVAILABLE:
-        print("  (Note: pyannote.audio not installed, diarization unavailable)")
-    elif enable_diarization and not HF_TOKEN:
-        print("  (Note: HF_TOKEN not set, diarization unavailable)")
+    if args.tune is not None:
+        sys.exit(tune(args))
     
-    success_count = 0
-    for file_path in files_to_process:
-        if process_file(file_path, model_size, language, compute_type,
-                       enable_diarization, enable_recognition):
-            success_count += 1
+    if args.fetch_models is not None:
+        if not fetch_models(args.fetch_models or [args.model or DEFAULT_MODEL]):
+            sys.exit(1)
+        return
     
-    print(f"\n{'='*60}")
-    print(f"Completed: {success_count}/{len(files_to_process)} files transcribed successfully")
+    if args.verify_models:
+        if not verify_models():
+            sys.exit(1)
+        return
     
-    if success_count > 0:
-        print("\nNext steps:")
-        print("  Run /summarize_meeting to extract action items from transcripts")
+    if args.daemon:
+        serve_daemon(args.idle_timeout)
+        return
+    
+    if args.stop_daemon:
+        stop_daemon()
+        return
+    
+    if args.cascade and args.cascade == (args.model or DEFAULT_MODEL):
+        print(f"Warning: --cascade {args.cascade} is the same as the first-pass model; ignoring it")
+        args.cascade = None
+    
+    unsupported = batched_decoding_error() if args.batch_size else None
+    if unsupported:
+        print(f"Error: {unsupported}")
+        sys.exit(1)
+    
+    # Relative paths belong to this process's working directory, not the daemon's
+    if args.input is not None:
+        args.input = str(Path(args.input).absolute())
+    
+    if args.watch:
+        sys.exit(watch(args))
+    
+    if args.stream is not None:
+        sys.exit(stream(args))
+    
+    # Hand the job to a running daemon (parallel workers load their own models)
+    exit_code = None
+    if not args.no_daemon and args.workers <= 1:
+        exit_code = submit_to_daemon(args)
+    if exit_code is None:
+        exit_code = transcribe_files(args)
+    if exit_code:
+        sys.exit(exit_code)
 
 
 if __name__ == "__main__":